@@ -0,0 +1,66 @@
+"""
+Compares the installed JSON decoders on synthetic Synthea-shaped bundles.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_decoders [--patients N] [--encounters N] [--noise N]
+
+For each decoder in oneview_app.json_decoders it reports throughput when
+decoding whole bundles (the "json" reader) and when decoding only the entries
+the parsers keep (the "filtered" reader, many small documents).
+"""
+import argparse
+import time
+
+from benchmarks.synthetic_bundles import make_patient_bundle_bytes
+from oneview_app.fhir_parser import MEMBERS_BY_RESOURCE_TYPE, PARSED_RESOURCE_TYPES
+from oneview_app.fhir_stream import read_bundle_filtered
+from oneview_app.json_decoders import available_decoders, get_decoder
+
+
+def decode_whole(payloads, loads):
+    for payload in payloads:
+        loads(payload)
+
+
+def decode_filtered(payloads, loads):
+    for payload in payloads:
+        read_bundle_filtered(payload, keep_types=PARSED_RESOURCE_TYPES, loads=loads, member_types=MEMBERS_BY_RESOURCE_TYPE)
+
+
+MODES = [
+    ("whole bundle", decode_whole),
+    ("filtered", decode_filtered),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--encounters", type=int, default=40)
+    parser.add_argument("--noise", type=int, default=12, help="Observation/Claim/EOB entries per encounter")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = [
+        make_patient_bundle_bytes(i, encounters=args.encounters, noise_per_encounter=args.noise)
+        for i in range(args.patients)
+    ]
+    total_bytes = sum(len(p) for p in payloads)
+    print(f"{args.patients} bundles, {total_bytes / 1e6:.1f} MB total; decoders: {', '.join(available_decoders())}")
+    print(f"{'mode':<14}{'decoder':<10}{'best s':>10}{'MB/s':>10}")
+
+    for mode, bench in MODES:
+        for name in available_decoders():
+            loads = get_decoder(name)
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                bench(payloads, loads)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{mode:<14}{name:<10}{best:>10.3f}{total_bytes / 1e6 / best:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compares the hand-written .get() chains the parsers used before fhir_paths
+with the compiled path extractors that replaced them.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extractors [--patients N] [--encounters N] [--repeat N]
+
+Reports nanoseconds per resource for Encounter, Condition and
+MedicationRequest field extraction and for the full parse_fhir_bundle call.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic_bundles import make_patient_bundle
+from oneview_app import fhir_parser
+from oneview_app.fhir_parser import parse_fhir_bundle
+from oneview_app.fhir_paths import compile_record
+
+
+# The extraction code as it was written before the compiled paths (kept here
+# verbatim so the comparison stays meaningful after the parsers changed). Both
+# sides build the dict the parser builds, minus reference resolution. The
+# parsers' records have since gained fields (onset, periods, encounter class),
+# so the compiled side is timed on the same paths limited to the fields the
+# legacy code produces.
+
+def legacy_encounter_fields(encounter):
+    encounter_info = {
+        "date": encounter.get("period", {}).get("start") or encounter.get("period", {}).get("end"),
+        "type": None,
+    }
+    if encounter.get("type"):
+        encounter_type = encounter["type"][0]
+        if encounter_type.get("text"):
+            encounter_info["type"] = encounter_type["text"]
+        elif encounter_type.get("coding"):
+            encounter_info["type"] = encounter_type["coding"][0].get("display")
+    return encounter_info
+
+
+def legacy_condition_fields(condition):
+    condition_info = {"code": None, "description": None, "status": None, "category": None}
+    if condition.get("code", {}).get("coding"):
+        snomed_code = next((c.get("code") for c in condition["code"]["coding"] if c.get("system", "").startswith("http://snomed.info/sct")), None)
+        snomed_display = next((c.get("display") for c in condition["code"]["coding"] if c.get("system", "").startswith("http://snomed.info/sct")), None)
+        if snomed_code:
+            condition_info["code"] = snomed_code
+            condition_info["description"] = snomed_display or condition["code"].get("text")
+        else:
+            condition_info["code"] = condition["code"]["coding"][0].get("code")
+            condition_info["description"] = condition["code"]["coding"][0].get("display") or condition["code"].get("text")
+    elif condition.get("code", {}).get("text"):
+        condition_info["description"] = condition["code"]["text"]
+    if condition.get("clinicalStatus", {}).get("coding"):
+        condition_info["status"] = condition["clinicalStatus"]["coding"][0].get("code")
+    elif condition.get("verificationStatus", {}).get("coding"):
+        condition_info["status"] = condition["verificationStatus"]["coding"][0].get("code")
+    if condition.get("category"):
+        category = condition["category"][0]
+        if category.get("coding"):
+            condition_info["category"] = category["coding"][0].get("code")
+        elif category.get("text"):
+            condition_info["category"] = category.get("text")
+    return condition_info
+
+
+def legacy_medication_fields(med_request):
+    med_info = {
+        "name": None,
+        "authored_on": med_request.get("authoredOn"),
+        "dosage": med_request.get("dosageInstruction", [{}])[0].get("text"),
+        "status": med_request.get("status"),
+    }
+    med_codeable_concept = med_request.get("medicationCodeableConcept")
+    if med_codeable_concept:
+        med_info["name"] = med_codeable_concept.get("text")
+        if not med_info["name"] and med_codeable_concept.get("coding"):
+            med_info["name"] = med_codeable_concept["coding"][0].get("display")
+    return med_info
+
+
+def legacy_subset(record, names):
+    """Compiles the paths of record (a compile_record extractor) for the given field names only."""
+    return compile_record({name: record.fields[name] for name in names})
+
+
+compiled_encounter_fields = legacy_subset(fhir_parser.ENCOUNTER_FIELDS, ("date", "type"))
+compiled_medication_fields = legacy_subset(fhir_parser.MEDICATION_REQUEST_FIELDS, ("name", "authored_on", "dosage", "status"))
+_condition_fields = legacy_subset(fhir_parser.CONDITION_FIELDS, ("snomed_coding", "first_coding", "text", "status", "category"))
+
+
+def compiled_condition_fields(condition):
+    # parse_diagnoses' handling of the extracted fields, minus onset/abatement
+    fields = _condition_fields(condition)
+    condition_info = {"code": None, "description": fields["text"], "status": fields["status"], "category": fields["category"] or None}
+    coding = fields["snomed_coding"]
+    if not (coding and coding.get("code")):
+        coding = fields["first_coding"]
+    if coding:
+        condition_info["code"] = coding.get("code")
+        condition_info["description"] = coding.get("display") or fields["text"]
+    return condition_info
+
+
+CASES = [
+    ("Encounter", legacy_encounter_fields, compiled_encounter_fields),
+    ("Condition", legacy_condition_fields, compiled_condition_fields),
+    ("MedicationRequest", legacy_medication_fields, compiled_medication_fields),
+]
+
+
+def best_ns_per_item(function, items, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / max(1, len(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--encounters", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bundles = [make_patient_bundle(i, encounters=args.encounters, noise_per_encounter=0) for i in range(args.patients)]
+    resources_by_type = {}
+    for bundle in bundles:
+        for entry in bundle["entry"]:
+            resource = entry["resource"]
+            resources_by_type.setdefault(resource["resourceType"], []).append(resource)
+
+    print(f"{'resource':<20}{'count':>8}{'before ns':>12}{'after ns':>12}{'speedup':>10}")
+    for resource_type, legacy, compiled in CASES:
+        resources = resources_by_type.get(resource_type, [])
+        for resource in resources:
+            expected, actual = legacy(resource), compiled(resource)
+            assert expected == actual, resource.get("id")
+        before = best_ns_per_item(legacy, resources, args.repeat)
+        after = best_ns_per_item(compiled, resources, args.repeat)
+        print(f"{resource_type:<20}{len(resources):>8}{before:>12.0f}{after:>12.0f}{before / after:>9.2f}x")
+
+    per_bundle = best_ns_per_item(parse_fhir_bundle, bundles, args.repeat)
+    print(f"parse_fhir_bundle: {per_bundle / 1e3:.1f} us per bundle")
+
+
+if __name__ == "__main__":
+    main()
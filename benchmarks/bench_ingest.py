@@ -0,0 +1,129 @@
+"""
+Compares bundle decode paths on synthetic Synthea-shaped bundles.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ingest [--patients N] [--encounters N] [--noise N] [--on-disk]
+
+For each reader it reports the best wall time, the number of bytes handed to
+the JSON decoder and the peak traced memory while decoding one bundle.
+
+With --on-disk the bundles are written to a temporary data directory and each
+load_all_patients_data reader runs in a fresh process, reporting the
+IngestReport counters: bytes copied out of the files and peak RSS.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_bundles import make_patient_bundle_bytes
+from oneview_app.fhir_parser import MEMBERS_BY_RESOURCE_TYPE, PARSED_RESOURCE_TYPES, parse_fhir_bundle
+from oneview_app.fhir_stream import BundleStream
+
+
+def bench_json_load(payloads):
+    decoded = 0
+    for payload in payloads:
+        bundle_data = json.load(io.BytesIO(payload))
+        decoded += len(payload)
+        parse_fhir_bundle(bundle_data)
+    return decoded
+
+
+def bench_filtered(payloads):
+    decoded = 0
+    for payload in payloads:
+        stream = BundleStream.from_buffer(payload, keep_types=PARSED_RESOURCE_TYPES, member_types=MEMBERS_BY_RESOURCE_TYPE)
+        bundle_data = {"entry": list(stream)}
+        decoded += stream.stats["bytes_decoded"]
+        parse_fhir_bundle(bundle_data)
+    return decoded
+
+
+def bench_stream(payloads):
+    decoded = 0
+    for payload in payloads:
+        stream = BundleStream(io.BytesIO(payload), keep_types=PARSED_RESOURCE_TYPES, member_types=MEMBERS_BY_RESOURCE_TYPE)
+        bundle_data = {"entry": list(stream)}
+        decoded += stream.stats["bytes_decoded"]
+        parse_fhir_bundle(bundle_data)
+    return decoded
+
+
+READERS = [
+    ("json.load", bench_json_load),
+    ("filtered", bench_filtered),
+    ("stream", bench_stream),
+]
+
+# Runs in a child process so every reader starts from the same RSS
+_INGEST_CHILD = """
+import json, sys
+from oneview_app.fhir_parser import load_all_patients_data
+from oneview_app.ingest_report import IngestReport
+report = IngestReport()
+load_all_patients_data(sys.argv[1], reader=sys.argv[2], report=report)
+print(json.dumps(report.as_dict()))
+"""
+
+
+def run_on_disk(payloads, readers=("json", "filtered", "stream", "mmap")):
+    with tempfile.TemporaryDirectory(prefix="bench-ingest-") as data_directory:
+        for n, payload in enumerate(payloads):
+            with open(os.path.join(data_directory, f"patient-{n}.json"), "wb") as f:
+                f.write(payload)
+        print(f"{'reader':<12}{'s':>8}{'MB on disk':>12}{'MB copied':>12}{'peak RSS MB':>13}")
+        for reader in readers:
+            output = subprocess.run(
+                [sys.executable, "-c", _INGEST_CHILD, data_directory, reader],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            report = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{reader:<12}{report['elapsed']:>8.2f}{report['bytes_on_disk'] / 1e6:>12.1f}"
+                f"{report['bytes_copied'] / 1e6:>12.1f}{report['peak_rss_kb'] / 1024:>13.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--encounters", type=int, default=40)
+    parser.add_argument("--noise", type=int, default=12, help="Observation/Claim/EOB entries per encounter")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--on-disk", action="store_true", help="Report copies and peak RSS per load_all_patients_data reader")
+    args = parser.parse_args()
+
+    payloads = [
+        make_patient_bundle_bytes(i, encounters=args.encounters, noise_per_encounter=args.noise)
+        for i in range(args.patients)
+    ]
+    total_bytes = sum(len(p) for p in payloads)
+    print(f"{args.patients} bundles, {total_bytes / 1e6:.1f} MB total")
+    if args.on_disk:
+        run_on_disk(payloads)
+        return
+    print(f"{'reader':<12}{'best s':>10}{'MB decoded':>14}{'% decoded':>12}{'peak MB':>10}")
+
+    for name, bench in READERS:
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            decoded = bench(payloads)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        tracemalloc.start()
+        bench(payloads[:1])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<12}{best:>10.3f}{decoded / 1e6:>14.2f}{100.0 * decoded / total_bytes:>11.1f}%{peak / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import json
+import random
+
+# Synthetic Synthea-shaped patient bundles for the benchmarks.
+# Real Synthea output is dominated by Observation, Claim and ExplanationOfBenefit
+# entries; noise_per_encounter controls how many of those each encounter gets.
+
+FIRST_NAMES = ["Walter", "Jesse", "Skyler", "Hank", "Marie", "Saul", "Gus", "Mike", "Lydia", "Todd"]
+FAMILY_NAMES = ["White", "Pinkman", "Schrader", "Goodman", "Fring", "Ehrmantraut", "Quayle", "Alquist"]
+ENCOUNTER_TYPES = ["General examination of patient (procedure)", "Encounter for check up (procedure)", "Emergency room admission (procedure)"]
+CONDITIONS = [("44054006", "Diabetes"), ("59621000", "Essential hypertension"), ("195662009", "Acute viral pharyngitis (disorder)")]
+MEDICATIONS = ["Metformin hydrochloride 500 MG Oral Tablet", "lisinopril 10 MG Oral Tablet", "Acetaminophen 325 MG Oral Tablet"]
+
+
+def _entry(resource):
+    return {"fullUrl": f"urn:uuid:{resource['id']}", "resource": resource, "request": {"method": "POST", "url": resource["resourceType"]}}
+
+
+def make_patient_bundle(index, encounters=40, noise_per_encounter=12, seed=0):
+    """Builds one patient bundle as a dict."""
+    rng = random.Random(seed * 100003 + index)
+    patient_id = f"bench-patient-{index}"
+    entries = [_entry({
+        "resourceType": "Patient",
+        "id": patient_id,
+        "name": [{"use": "official", "given": [rng.choice(FIRST_NAMES)], "family": rng.choice(FAMILY_NAMES)}],
+        "gender": rng.choice(["male", "female"]),
+        "birthDate": f"{rng.randint(1930, 2015)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "telecom": [{"system": "phone", "value": f"555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}", "use": "home"}],
+        "address": [{"line": [f"{rng.randint(1, 999)} Main St"], "city": "Boston", "state": "MA", "postalCode": "02101", "country": "US"}],
+    })]
+    entries.append(_entry({
+        "resourceType": "Coverage",
+        "id": f"{patient_id}-coverage",
+        "type": {"coding": [{"code": "health"}]},
+        "payor": [{"display": rng.choice(["Medicare", "Medicaid", "Blue Cross Blue Shield", "Aetna"])}],
+    }))
+    for n in range(encounters):
+        encounter_id = f"{patient_id}-enc-{n}"
+        year = rng.randint(1990, 2024)
+        start = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T09:00:00-05:00"
+        entries.append(_entry({
+            "resourceType": "Encounter",
+            "id": encounter_id,
+            "status": "finished",
+            "class": {"system": "http://terminology.hl7.org/CodeSystem/v3-ActCode", "code": rng.choice(["AMB", "IMP", "EMER"])},
+            "type": [{"coding": [{"system": "http://snomed.info/sct", "code": "162673000", "display": rng.choice(ENCOUNTER_TYPES)}], "text": rng.choice(ENCOUNTER_TYPES)}],
+            "subject": {"reference": f"urn:uuid:{patient_id}"},
+            "participant": [{"type": [{"coding": [{"code": "PPRF"}]}], "individual": {"reference": "Practitioner?identifier=http://hl7.org/fhir/sid/us-npi|9999", "display": "Dr. Bench Mark"}}],
+            "period": {"start": start, "end": start.replace("T09", "T10")},
+            "serviceProvider": {"reference": "Organization?identifier=https://github.com/synthetichealth/synthea|bench", "display": "BENCH HOSPITAL"},
+        }))
+        if n % 5 == 0:
+            code, display = rng.choice(CONDITIONS)
+            entries.append(_entry({
+                "resourceType": "Condition",
+                "id": f"{encounter_id}-cond",
+                "clinicalStatus": {"coding": [{"code": rng.choice(["active", "resolved"])}]},
+                "category": [{"coding": [{"code": "encounter-diagnosis"}]}],
+                "code": {"coding": [{"system": "http://snomed.info/sct", "code": code, "display": display}], "text": display},
+                "subject": {"reference": f"urn:uuid:{patient_id}"},
+                "encounter": {"reference": f"urn:uuid:{encounter_id}"},
+                "onsetDateTime": start,
+            }))
+        if n % 4 == 0:
+            med = rng.choice(MEDICATIONS)
+            entries.append(_entry({
+                "resourceType": "MedicationRequest",
+                "id": f"{encounter_id}-medreq",
+                "status": rng.choice(["active", "stopped"]),
+                "intent": "order",
+                "medicationCodeableConcept": {"coding": [{"system": "http://www.nlm.nih.gov/research/umls/rxnorm", "display": med}], "text": med},
+                "subject": {"reference": f"urn:uuid:{patient_id}"},
+                "authoredOn": start,
+                "requester": {"display": "Dr. Bench Mark"},
+                "dosageInstruction": [{"text": "Take one tablet daily"}],
+            }))
+        for k in range(noise_per_encounter):
+            noise_type = ("Observation", "Claim", "ExplanationOfBenefit")[k % 3]
+            entries.append(_entry({
+                "resourceType": noise_type,
+                "id": f"{encounter_id}-{noise_type.lower()}-{k}",
+                "status": "final",
+                "code": {"coding": [{"system": "http://loinc.org", "code": f"{rng.randint(1000, 99999)}-{rng.randint(0, 9)}", "display": "Synthetic measurement"}]},
+                "subject": {"reference": f"urn:uuid:{patient_id}"},
+                "encounter": {"reference": f"urn:uuid:{encounter_id}"},
+                "effectiveDateTime": start,
+                "valueQuantity": {"value": round(rng.uniform(0, 200), 2), "unit": "mg/dL", "system": "http://unitsofmeasure.org"},
+                "item": [{"sequence": i, "net": {"value": round(rng.uniform(0, 500), 2), "currency": "USD"}} for i in range(3)],
+            }))
+    return {"resourceType": "Bundle", "type": "transaction", "entry": entries}
+
+
+def make_patient_bundle_bytes(index, **kwargs):
+    """Builds one patient bundle serialized the way Synthea writes it."""
+    return json.dumps(make_patient_bundle(index, **kwargs), indent=2).encode("utf-8")
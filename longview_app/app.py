@@ -1,6 +1,10 @@
 import logging # Import logging
-from flask import Flask, render_template, request
+import threading
+from flask import Flask, jsonify, render_template, request
 from longview_app.fhir_parser import load_all_patients_data
+from oneview_app.patient_search import PatientSearchIndex
+from longview_app.timeline import DEFAULT_WINDOW, MAX_WINDOW, PatientTimeline
+from oneview_app.encounter_index import encounter_timestamp
 from datetime import datetime
 
 # Basic Logging Configuration
@@ -10,19 +14,65 @@ logger = logging.getLogger(__name__) # Get a logger for this module
 app = Flask(__name__)
 logger.info("OneView application starting...")
 
-# Load all patient data when the application starts
-all_patients_data = load_all_patients_data()
-if not all_patients_data:
-    logger.warning("No patient data was loaded. Patient search and detail view will not work.")
-else:
-    logger.info(f"Successfully loaded {len(all_patients_data)} patient records.")
+# The patient record fields this view reads (the keys longview's parser produces)
+PATIENT_FIELDS = (
+    "patient_id", "full_name", "dob", "gender", "insurance", "pcp_name", "contact_phone",
+    "address_full", "marital_status", "preferred_language", "recent_encounters", "diagnoses", "medications",
+)
+
+# Patient data is loaded on the first request, unless use_patients() has handed
+# this app a dataset already (oneview_app.combined shares OneView's)
+all_patients_data = None
+patients_by_id = {}
+search_index = PatientSearchIndex([])
+# Per-patient event streams (encounters, condition onsets/abatements, medication
+# starts), built and sorted the first time a patient's timeline is asked for
+timelines = {}
+# Held while the first request loads the data, so concurrent first requests load it once
+_load_lock = threading.Lock()
+
+def use_patients(patients, by_id=None, index=None):
+    """
+    Serves an already-parsed patient list. Records may carry more fields than
+    PATIENT_FIELDS; by_id (a patient_id -> record map) and index (a
+    PatientSearchIndex over patients), if given, are shared rather than rebuilt.
+    """
+    global all_patients_data, patients_by_id, search_index, timelines
+    patients_by_id = by_id if by_id is not None else {patient.get('patient_id'): patient for patient in patients}
+    search_index = index if index is not None else PatientSearchIndex(patients)
+    timelines = {}
+    # Set last: a request that sees the data also sees its lookups
+    all_patients_data = patients
+    logger.info(f"Serving {len(patients)} patient records.")
+
+@app.before_request
+def ensure_patient_data():
+    if all_patients_data is not None:
+        return
+    with _load_lock:
+        if all_patients_data is None:
+            patients = load_all_patients_data()
+            if not patients:
+                logger.warning("No patient data was loaded. Patient search and detail view will not work.")
+            use_patients(patients)
+
+def project_patient(patient):
+    """This view's slice of a patient record (PATIENT_FIELDS); the nested lists are shared, not copied."""
+    return {field: patient.get(field) for field in PATIENT_FIELDS}
 
 def get_patient_by_id(patient_id):
     """Helper function to find a patient by their ID."""
-    for patient in all_patients_data:
-        if patient.get('patient_id') == patient_id:
-            return patient
-    return None
+    return patients_by_id.get(patient_id)
+
+def get_timeline(patient_id):
+    """The patient's merged timeline, built on first use; None for an unknown patient."""
+    timeline = timelines.get(patient_id)
+    if timeline is None:
+        patient = get_patient_by_id(patient_id)
+        if patient is None:
+            return None
+        timeline = timelines[patient_id] = PatientTimeline(patient)
+    return timeline
 
 def calculate_age(dob_str):
     """Calculate age from DOB string (YYYY-MM-DD)."""
@@ -41,6 +91,7 @@ def index():
     search_query_display = ""
     selected_patient_details = None
     patient_age = None
+    timeline_events = []
 
     # Check if a specific patient is being requested via GET parameter
     patient_id_from_query = request.args.get('patient_id')
@@ -49,9 +100,12 @@ def index():
 
     if patient_id_from_query:
         logger.info(f"Viewing details for patient ID: {patient_id_from_query}")
-        selected_patient_details = get_patient_by_id(patient_id_from_query)
-        if selected_patient_details:
+        patient = get_patient_by_id(patient_id_from_query)
+        if patient:
+            # A copy: the encounter sort below must not reorder a shared record
+            selected_patient_details = project_patient(patient)
             patient_age = calculate_age(selected_patient_details.get('dob'))
+            timeline_events = get_timeline(patient_id_from_query).before(limit=DEFAULT_WINDOW)[::-1] # Newest first
             search_results = [] 
             search_query_display = ""
 
@@ -74,7 +128,9 @@ def index():
                         # If parsing fails, treat as an "unknown" date
                         return datetime.max if sort_order_param == 'asc' else datetime.min
                 
-                selected_patient_details['recent_encounters'].sort(
+                # Sort a new list: a shared dataset's encounter lists are indexed by position elsewhere
+                selected_patient_details['recent_encounters'] = sorted(
+                    selected_patient_details['recent_encounters'],
                     key=get_date_key,
                     reverse=(sort_order_param == 'desc')
                 )
@@ -85,14 +141,8 @@ def index():
         logger.info(f"Search performed with query: '{search_query}'")
 
         if search_query:
-            for patient in all_patients_data:
-                if patient.get('patient_id') == search_query:
-                    search_results.append(patient)
-                    continue
-                patient_name = patient.get('full_name', '')
-                if search_query.lower() in patient_name.lower():
-                    search_results.append(patient)
-                    continue
+            # Exact patient ID or case-insensitive name substring, from the trigram index
+            search_results = search_index.search(text=search_query)
         # If POST but empty query, search_results remains empty
 
     return render_template('index.html', 
@@ -101,9 +151,52 @@ def index():
                            num_results=len(search_results),
                            selected_patient=selected_patient_details,
                            patient_age=patient_age,
+                           timeline_events=timeline_events,
                            current_sort_by=sort_by_param,
                            current_sort_order=sort_order_param)
 
+@app.route('/patients/<patient_id>/timeline', methods=['GET'])
+def patient_timeline(patient_id):
+    """
+    A window of a patient's merged timeline, oldest first:
+    ?from=2010-01-01&to=2015-12-31 (events between two dates),
+    ?after=<cursor> / ?before=<cursor> (the next/previous events; the latest without either),
+    with limit events at most (default 50). next/prev cursors continue the window.
+    """
+    timeline = get_timeline(patient_id)
+    if timeline is None:
+        return jsonify({"error": f"Unknown patient: {patient_id}"}), 404
+    limit = max(1, min(request.args.get('limit', DEFAULT_WINDOW, type=int), MAX_WINDOW))
+    date_from, date_to = request.args.get('from'), request.args.get('to')
+    try:
+        if date_from or date_to:
+            start = encounter_timestamp(date_from) if date_from else None
+            end = encounter_timestamp(date_to, end_of_day=True) if date_to else None
+            if (date_from and start is None) or (date_to and end is None):
+                return jsonify({"error": "from/to must be FHIR dates or dateTimes"}), 400
+            # One extra event tells whether the window continues
+            events = timeline.between(start, end, limit + 1)
+            more_after, more_before = len(events) > limit, None
+            events = events[:limit]
+        elif request.args.get('after'):
+            events = timeline.after(request.args['after'], limit + 1)
+            more_after, more_before = len(events) > limit, True
+            events = events[:limit]
+        else:
+            events = timeline.before(request.args.get('before'), limit + 1)
+            more_after, more_before = bool(request.args.get('before')), len(events) > limit
+            events = events[-limit:]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "patient_id": patient_id,
+        "total_events": len(timeline),
+        "undated_events": timeline.undated,
+        "events": events,
+        "next_cursor": events[-1]["cursor"] if events and more_after else None,
+        "prev_cursor": events[0]["cursor"] if events and more_before is not False else None,
+    })
+
 if __name__ == '__main__':
     # Note: Flask's development server's default logging might override basicConfig in some cases.
     # For production, a more robust logging setup (e.g., with Gunicorn) is recommended.
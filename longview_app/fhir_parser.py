@@ -142,6 +142,8 @@ def parse_diagnoses(condition_resources):
             "description": None,
             "status": None,
             "category": None,
+            "onset": condition.get("onsetDateTime") or condition.get("onsetPeriod", {}).get("start"),
+            "abatement": condition.get("abatementDateTime") or condition.get("abatementPeriod", {}).get("end"),
         }
 
         # Code and Description
@@ -89,6 +89,8 @@ MOCK_PATIENT_BUNDLE_FULL = {
                 "id": "condition-2",
                 "clinicalStatus": {"coding": [{"code": "resolved"}]},
                 "category": [{"text": "Problem List Item"}], # Using text for category
+                "onsetPeriod": {"start": "2021-02-01"},
+                "abatementDateTime": "2021-03-15",
                 "code": {"text": "Sprained Ankle"},
             }
         }
@@ -189,6 +191,8 @@ class TestFhirParser(unittest.TestCase):
         self.assertEqual(diag2["description"], "Sprained Ankle")
         self.assertEqual(diag2["status"], "resolved")
         self.assertEqual(diag2["category"], "Problem List Item")
+        self.assertEqual((diag2["onset"], diag2["abatement"]), ("2021-02-01", "2021-03-15"))
+        self.assertIsNone(diag1["onset"])
 
 
     def test_parse_patient_minimal(self):
@@ -0,0 +1,131 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from longview_app import app as app_module
+from longview_app.timeline import PatientTimeline
+from oneview_app.encounter_index import encounter_timestamp
+
+MOCK_TIMELINE_PATIENT = {
+    "patient_id": "patient-001",
+    "full_name": "Walter White",
+    "recent_encounters": [
+        {"date": "2022-10-20T09:00:00Z", "type": "Consultation", "facility": "Albuquerque General"},
+        {"date": "2008-01-15T10:00:00Z", "type": "Checkup"},
+    ],
+    "diagnoses": [
+        {"code": "J44.9", "description": "COPD", "status": "resolved", "onset": "2008-01-15T10:00:00Z", "abatement": "2010-05-01"},
+        {"code": "C34", "description": "Lung cancer", "status": "active", "onset": "2008-06-01", "abatement": None},
+    ],
+    "medications": [
+        {"name": "Albuterol", "authored_on": "2008-01-15T10:00:00Z", "status": "stopped"},
+        {"name": "Cisplatin", "authored_on": "2008-07-01", "status": "completed"},
+        {"name": "Lost prescription", "authored_on": "Invalid Date String", "status": "stopped"},
+    ],
+}
+
+
+def _titles(events):
+    return [event["title"] for event in events]
+
+
+class TestPatientTimeline(unittest.TestCase):
+
+    def setUp(self):
+        self.timeline = PatientTimeline(MOCK_TIMELINE_PATIENT)
+
+    def test_merges_streams_in_time_order(self):
+        self.assertEqual((len(self.timeline), self.timeline.undated), (7, 1))
+        self.assertEqual(_titles(self.timeline.after(limit=10)), [
+            "Checkup", "Diagnosed: COPD", "Started: Albuterol",  # Same instant: stream order
+            "Diagnosed: Lung cancer", "Started: Cisplatin", "Resolved: COPD", "Consultation",
+        ])
+
+    def test_between_dates(self):
+        events = self.timeline.between(encounter_timestamp("2008-06-01"), encounter_timestamp("2010-05-01", end_of_day=True))
+        self.assertEqual(_titles(events), ["Diagnosed: Lung cancer", "Started: Cisplatin", "Resolved: COPD"])
+
+    def test_cursors_page_both_ways(self):
+        latest = self.timeline.before(limit=2)
+        self.assertEqual(_titles(latest), ["Resolved: COPD", "Consultation"])
+        earlier = self.timeline.before(latest[0]["cursor"], limit=3)
+        self.assertEqual(_titles(earlier), ["Started: Albuterol", "Diagnosed: Lung cancer", "Started: Cisplatin"])
+        self.assertEqual(_titles(self.timeline.after(earlier[0]["cursor"], limit=2)), ["Diagnosed: Lung cancer", "Started: Cisplatin"])
+
+    def test_bad_cursor(self):
+        with self.assertRaises(ValueError):
+            self.timeline.after("yesterday")
+
+
+class TestTimelineRoute(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = (app_module.all_patients_data, app_module.patients_by_id, app_module.search_index, app_module.timelines)
+        app_module.use_patients([MOCK_TIMELINE_PATIENT])
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.all_patients_data, app_module.patients_by_id, app_module.search_index, app_module.timelines = self._originals
+
+    def test_window_endpoint(self):
+        data = self.client.get('/patients/patient-001/timeline?limit=2').get_json()
+        self.assertEqual(_titles(data["events"]), ["Resolved: COPD", "Consultation"])
+        self.assertIsNone(data["next_cursor"])
+        data = self.client.get(f'/patients/patient-001/timeline?before={data["prev_cursor"]}&limit=10').get_json()
+        self.assertEqual(len(data["events"]), 5)
+        data = self.client.get('/patients/patient-001/timeline?from=2008-01-01&to=2008-12-31&limit=4').get_json()
+        self.assertEqual(len(data["events"]), 4)
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/patients/nobody/timeline').status_code, 404)
+        self.assertNotIn("nobody", app_module.timelines)
+        self.assertEqual(self.client.get('/patients/patient-001/timeline?from=someday').status_code, 400)
+        self.assertEqual(self.client.get('/patients/patient-001/timeline?after=bad').status_code, 400)
+
+    def test_data_is_loaded_on_first_request_unless_shared(self):
+        app_module.all_patients_data = None
+        with mock.patch.object(app_module, "load_all_patients_data", return_value=[MOCK_TIMELINE_PATIENT]) as load:
+            self.client.get('/patients/patient-001/timeline')
+            self.client.get('/patients/patient-001/timeline')
+        load.assert_called_once_with()
+        app_module.use_patients([MOCK_TIMELINE_PATIENT])
+        with mock.patch.object(app_module, "load_all_patients_data") as load:
+            self.client.get('/patients/patient-001/timeline')
+        load.assert_not_called()
+
+    def test_concurrent_first_requests_load_once(self):
+        app_module.all_patients_data = None
+        started = threading.Barrier(4)
+
+        def slow_load():
+            time.sleep(0.05)
+            return [MOCK_TIMELINE_PATIENT]
+
+        def first_request():
+            started.wait()
+            app_module.ensure_patient_data()
+
+        with mock.patch.object(app_module, "load_all_patients_data", side_effect=slow_load) as load:
+            threads = [threading.Thread(target=first_request) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        load.assert_called_once_with()
+        self.assertIn("patient-001", app_module.patients_by_id)
+
+    def test_timelines_are_built_on_first_use(self):
+        self.assertEqual(app_module.timelines, {})
+        self.client.get('/patients/patient-001/timeline')
+        self.assertEqual(list(app_module.timelines), ["patient-001"])
+
+    def test_detail_page_shows_timeline(self):
+        response = self.client.get('/?patient_id=patient-001')
+        self.assertIn(b"Longitudinal Timeline", response.data)
+        self.assertIn(b"Started: Cisplatin", response.data)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,142 @@
+import heapq
+from bisect import bisect_left
+from itertools import islice
+from oneview_app.encounter_index import encounter_timestamp
+
+# Unified longitudinal timeline per patient.
+#
+# A patient's history comes from four event streams: encounters, condition
+# onsets, condition abatements and medication starts. Each stream is sorted
+# once, when the timeline is built, by a (timestamp, stream, position) key,
+# which is unique, so it also serves as a stable cursor. A window ("events
+# between A and B", "the 50 before/after this cursor") bisects each stream and
+# lazily k-way merges (heapq.merge) only from those positions, stopping after
+# the requested number of events. The full merged history is never built.
+
+DEFAULT_WINDOW = 50
+MAX_WINDOW = 500
+
+# Stream name -> (records of a patient, date of a record, title, detail).
+# The stream's position in this dict orders same-instant events.
+EVENT_STREAMS = {
+    "encounter": (
+        lambda p: p.get("recent_encounters"),
+        lambda e: e.get("date"),
+        lambda e: e.get("type") or "Encounter",
+        lambda e: " / ".join(part for part in (e.get("facility"), e.get("provider"), e.get("primary_diagnosis_text")) if part),
+    ),
+    "condition_onset": (
+        lambda p: p.get("diagnoses"),
+        lambda d: d.get("onset"),
+        lambda d: f"Diagnosed: {d.get('description') or 'Unknown condition'}",
+        lambda d: f"Code: {d.get('code') or 'N/A'}, Status: {d.get('status') or 'N/A'}",
+    ),
+    "condition_abatement": (
+        lambda p: p.get("diagnoses"),
+        lambda d: d.get("abatement"),
+        lambda d: f"Resolved: {d.get('description') or 'Unknown condition'}",
+        lambda d: f"Code: {d.get('code') or 'N/A'}",
+    ),
+    "medication_start": (
+        lambda p: p.get("medications"),
+        lambda m: m.get("authored_on"),
+        lambda m: f"Started: {m.get('name') or 'Unknown Medication'}",
+        lambda m: " / ".join(part for part in (m.get("dosage"), m.get("prescriber"), m.get("status")) if part),
+    ),
+}
+_STREAM_NAMES = list(EVENT_STREAMS)
+
+
+def format_cursor(key):
+    return f"{key[0]}.{key[1]}.{key[2]}"
+
+
+def parse_cursor(cursor):
+    """Turns a cursor string back into its (timestamp, stream, position) key; raises ValueError if malformed."""
+    parts = str(cursor).split(".")
+    if len(parts) != 3:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return tuple(int(part) for part in parts)
+
+
+class PatientTimeline:
+    """One patient's event streams, each sorted once when the timeline is built."""
+
+    def __init__(self, patient):
+        self._keys = []     # Per stream: sorted (timestamp, stream rank, position) keys
+        self._records = []  # Per stream: the records in the same order
+        self.undated = 0    # Events whose date is missing or unreadable
+        for rank, (name, (records_of, date_of, _, _)) in enumerate(EVENT_STREAMS.items()):
+            dated = []
+            for record in records_of(patient) or []:
+                date_str = date_of(record)
+                if not date_str:
+                    continue  # Nothing to place, e.g. a condition that has not abated
+                timestamp = encounter_timestamp(date_str)
+                if timestamp is None:
+                    self.undated += 1
+                    continue
+                dated.append((timestamp, record))
+            dated.sort(key=lambda item: item[0])
+            self._keys.append([(timestamp, rank, n) for n, (timestamp, _) in enumerate(dated)])
+            self._records.append([record for _, record in dated])
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys)
+
+    def _event(self, key):
+        timestamp, rank, n = key
+        name = _STREAM_NAMES[rank]
+        _, date_of, title_of, detail_of = EVENT_STREAMS[name]
+        record = self._records[rank][n]
+        return {
+            "date": date_of(record),
+            "kind": name,
+            "title": title_of(record),
+            "detail": detail_of(record),
+            "cursor": format_cursor(key),
+        }
+
+    def _forward(self, start_key):
+        """Lazily merged keys >= start_key, oldest first."""
+        return heapq.merge(*(islice(keys, bisect_left(keys, start_key), None) for keys in self._keys))
+
+    def _backward(self, end_key):
+        """Lazily merged keys < end_key, newest first."""
+        return heapq.merge(
+            *(map(keys.__getitem__, range(bisect_left(keys, end_key) - 1, -1, -1)) for keys in self._keys),
+            reverse=True,
+        )
+
+    def between(self, start=None, end=None, limit=MAX_WINDOW):
+        """Events with start <= timestamp <= end (either may be None), oldest first, at most limit."""
+        start_key = (start, -1, -1) if start is not None else (float("-inf"),)
+        keys = self._forward(start_key)
+        if end is not None:
+            keys = _until(keys, end)
+        return [self._event(key) for key in islice(keys, limit)]
+
+    def after(self, cursor=None, limit=DEFAULT_WINDOW):
+        """The limit events after cursor (from the beginning without one), oldest first."""
+        start_key = (float("-inf"),) if cursor is None else _successor(parse_cursor(cursor))
+        return [self._event(key) for key in islice(self._forward(start_key), limit)]
+
+    def before(self, cursor=None, limit=DEFAULT_WINDOW):
+        """The limit events before cursor (the latest ones without one), oldest first."""
+        end_key = (float("inf"),) if cursor is None else parse_cursor(cursor)
+        events = [self._event(key) for key in islice(self._backward(end_key), limit)]
+        events.reverse()
+        return events
+
+
+def _successor(key):
+    """The smallest key sorting after key (positions are ints, so one more position)."""
+    return (key[0], key[1], key[2] + 1)
+
+
+def _until(keys, end):
+    """Stops a sorted key stream at the first key past end, so the merge is not drained."""
+    for key in keys:
+        if key[0] > end:
+            return
+        yield key
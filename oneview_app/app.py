@@ -1,7 +1,16 @@
 import logging # Import logging
-from flask import Flask, render_template, request
+from flask import Flask, jsonify, render_template, request
+from oneview_app.clinical_text_index import ClinicalTextIndex
+from oneview_app.cohort_index import INDEXED_FIELDS, CohortIndex, intersect_postings
+from oneview_app.condition_index import ConditionIntervalIndex
+from oneview_app.demographics import DobArray, age_from_key, dob_key
+from oneview_app.derived_fields import DERIVED_FIELD_NAMES
+from oneview_app.encounter_index import CODED_COLUMNS, EncounterStore, EncounterTimeIndex, encounter_timestamp, iso_timestamp
 from oneview_app.fhir_parser import load_all_patients_data
-from datetime import datetime
+from oneview_app.patient_search import PatientSearchIndex
+from oneview_app.population_aggregates import AGE_BANDS, PopulationAggregates
+from oneview_app.provider_index import DEFAULT_PAGE_SIZE, ProviderIndex
+from oneview_app.readmissions import readmission_report
 
 # Basic Logging Configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -17,28 +26,84 @@ if not all_patients_data:
 else:
     logger.info(f"Successfully loaded {len(all_patients_data)} patient records.")
 
+# Inverted indexes for cohort queries, built once over the loaded patients
+cohort_index = CohortIndex(all_patients_data)
+# Packed dates of birth, for age filters computed over the whole population at once
+dob_array = DobArray(all_patients_data)
+# Per-field indexes for the search form (name/ID, DOB, gender, phone)
+search_index = PatientSearchIndex(all_patients_data)
+# Full-text index over diagnoses, medications and encounter text; kept across reloads
+clinical_text_index = ClinicalTextIndex(all_patients_data)
+# Dashboard counts (insurance, PCP, gender, top conditions); kept across reloads.
+# Age bands come from dob_array per request, so they follow the date
+population_aggregates = PopulationAggregates(all_patients_data)
+# Provider panels and facility rosters with last-visit dates
+provider_index = ProviderIndex(all_patients_data)
+# Every encounter in the population as columns, grouped by patient
+encounter_store = EncounterStore(all_patients_data)
+# The store's dated encounters sorted by time, for date-range queries
+encounter_index = EncounterTimeIndex(all_patients_data, encounter_store)
+# Condition onset/abatement intervals, for "active as of" queries
+condition_index = ConditionIntervalIndex(all_patients_data)
+# 30-day readmissions: population summary and per-patient flags for the detail page.
+# Computed inline; the scan is one sort per inpatient, cheap next to the load itself
+readmissions = readmission_report(all_patients_data, workers=1)
+readmissions_by_id = {entry['patient_id']: entry for entry in readmissions['patients']}
+# Index hits carry patient IDs; this turns them back into patient records
+patients_by_id = {patient.get('patient_id'): patient for patient in all_patients_data}
+# Called with (patients, patients_by_id, search_index) after every reload (other views sharing the dataset)
+reload_listeners = []
+
+def reload_patient_data():
+    """
+    Reloads the patient data from disk. Position-based indexes are rebuilt;
+    the full-text index and dashboard aggregates are updated only for
+    patients that changed.
+    """
+    global all_patients_data, cohort_index, dob_array, search_index, provider_index, encounter_store, encounter_index, condition_index, patients_by_id
+    global readmissions, readmissions_by_id
+    patients = load_all_patients_data()
+    all_patients_data = patients
+    patients_by_id = {patient.get('patient_id'): patient for patient in patients}
+    cohort_index = CohortIndex(patients)
+    dob_array = DobArray(patients)
+    search_index = PatientSearchIndex(patients)
+    provider_index = ProviderIndex(patients)
+    encounter_store = EncounterStore(patients)
+    encounter_index = EncounterTimeIndex(patients, encounter_store)
+    condition_index = ConditionIntervalIndex(patients)
+    readmissions = readmission_report(patients, workers=1)
+    readmissions_by_id = {entry['patient_id']: entry for entry in readmissions['patients']}
+    changes = clinical_text_index.update(patients)
+    aggregate_changes = population_aggregates.update(patients)
+    for listener in reload_listeners:
+        listener(patients, patients_by_id, search_index)
+    logger.info(f"Reloaded {len(patients)} patient records; clinical text index changes: {changes}, dashboard changes: {aggregate_changes}")
+    return {"patients": len(patients), "clinical_text_index": changes, "population_aggregates": aggregate_changes}
+
+# Labels for the structured search fields in the "No patients found" message
+SEARCH_FIELD_LABELS = {"dob": "DOB", "gender": "Gender", "phone": "Phone"}
+# Query parameters /cohort accepts; anything else is an error, not a silently dropped filter
+COHORT_PARAMETERS = (
+    set(INDEXED_FIELDS) | {f"{field}_contains" for field in INDEXED_FIELDS}
+    | {"dob_from", "dob_to", "age_min", "age_max"}
+)
+
 def get_patient_by_id(patient_id):
     """Helper function to find a patient by their ID."""
-    for patient in all_patients_data:
-        if patient.get('patient_id') == patient_id:
-            return patient
-    return None
+    return patients_by_id.get(patient_id)
 
 def calculate_age(dob_str):
     """Calculate age from DOB string (YYYY-MM-DD)."""
-    if not dob_str:
-        return None
-    try:
-        dob = datetime.strptime(dob_str, "%Y-%m-%d")
-        today = datetime.today()
-        return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-    except ValueError:
-        return None # Invalid date format
+    return age_from_key(dob_key(dob_str)) # None for a missing or invalid date
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     search_results = []
     search_query_display = ""
+    search_fields = {"dob": "", "gender": "", "phone": ""}
+    search_description = ""
+    fuzzy_match = False
     selected_patient_details = None
     patient_age = None
 
@@ -57,53 +122,323 @@ def index():
 
             # Sort recent encounters
             if sort_by_param == 'date' and selected_patient_details.get('recent_encounters'):
-                def get_date_key(encounter):
-                    # Handles potential missing dates or varying formats for robustness.
-                    # Returns a datetime object for comparison or a min/max datetime to push unparseable dates to one end.
-                    date_str = encounter.get('date')
-                    if not date_str:
-                        # If sort order is ascending, push None dates to the end, else to the beginning.
-                        return datetime.max if sort_order_param == 'asc' else datetime.min
-                    try:
-                        # Attempt to parse different common FHIR date/datetime formats
-                        if 'T' in date_str:
-                            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                        else:
-                            return datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        # If parsing fails, treat as an "unknown" date
-                        return datetime.max if sort_order_param == 'asc' else datetime.min
-                
-                selected_patient_details['recent_encounters'].sort(
-                    key=get_date_key,
-                    reverse=(sort_order_param == 'desc')
-                )
+                # The columnar store already holds each patient's encounters in time order
+                store, doc = encounter_store, encounter_store.positions_by_id.get(patient_id_from_query)
+                if doc is None or store.patients[doc] is not selected_patient_details:
+                    store, doc = EncounterStore([selected_patient_details]), 0
+                # Copy the record: the indexes point into the stored encounter lists
+                selected_patient_details = dict(selected_patient_details)
+                selected_patient_details['recent_encounters'] = store.patient_encounters(doc, descending=(sort_order_param == 'desc'))
 
     elif request.method == 'POST':
         search_query = request.form.get('search_query', '').strip()
         search_query_display = search_query
-        logger.info(f"Search performed with query: '{search_query}'")
-
-        if search_query:
-            for patient in all_patients_data:
-                if patient.get('patient_id') == search_query:
-                    search_results.append(patient)
-                    continue
-                patient_name = patient.get('full_name', '')
-                if search_query.lower() in patient_name.lower():
-                    search_results.append(patient)
-                    continue
+        search_fields = {field: request.form.get(f'search_{field}', '').strip() for field in search_fields}
+        description_parts = [search_query] if search_query else []
+        description_parts += [f"{SEARCH_FIELD_LABELS[field]} {value}" for field, value in search_fields.items() if value]
+        search_description = ", ".join(description_parts)
+        logger.info(f"Search performed with query: '{search_query}' and fields {search_fields}")
+
+        # Patient ID or name substring, ANDed with any DOB/gender/phone given;
+        # the index planner starts from the most selective field
+        if search_query or any(search_fields.values()):
+            search_results = search_index.search(
+                text=search_query or None,
+                dob=search_fields["dob"] or None,
+                gender=search_fields["gender"] or None,
+                phone=search_fields["phone"] or None,
+            )
+            if not search_results and search_query:
+                # Nothing matched exactly: retry the name allowing for typos and sound-alikes
+                search_results = search_index.search(
+                    text=search_query,
+                    dob=search_fields["dob"] or None,
+                    gender=search_fields["gender"] or None,
+                    phone=search_fields["phone"] or None,
+                    fuzzy=True,
+                )
+                fuzzy_match = bool(search_results)
         # If POST but empty query, search_results remains empty
 
     return render_template('index.html', 
                            patients=search_results, 
                            search_query=search_query_display,
+                           search_fields=search_fields,
+                           search_description=search_description,
+                           fuzzy_match=fuzzy_match,
                            num_results=len(search_results),
                            selected_patient=selected_patient_details,
                            patient_age=patient_age,
+                           readmission=readmissions_by_id.get(selected_patient_details.get('patient_id')) if selected_patient_details else None,
                            current_sort_by=sort_by_param,
                            current_sort_order=sort_order_param)
 
+@app.route('/cohort', methods=['GET'])
+def cohort():
+    """
+    Cohort query over the inverted indexes. Every INDEXED_FIELDS name is a query
+    parameter (repeat it to OR values; <field>_contains matches part of a value),
+    plus dob_from/dob_to and age_min/age_max (whole years, inclusive), e.g.
+    /cohort?active_diagnosis_code=44054006&active_medication_contains=metformin&insurance=Medicaid&age_min=65
+    Any other parameter is rejected with 400 rather than ignored.
+    """
+    unknown = sorted(set(request.args) - COHORT_PARAMETERS)
+    if unknown:
+        return jsonify({"error": f"Unknown cohort parameter(s): {', '.join(unknown)}"}), 400
+    for name in ('age_min', 'age_max'):
+        if request.args.get(name) and request.args.get(name, type=int) is None:
+            return jsonify({"error": f"Invalid {name}: {request.args.get(name)!r}"}), 400
+    criteria = {}
+    for field in INDEXED_FIELDS:
+        values = request.args.getlist(field)
+        for text in request.args.getlist(f"{field}_contains"):
+            # An unmatched fragment must still narrow the cohort, so keep it as an impossible value
+            values.extend(cohort_index.keys_containing(field, text) or [text])
+        if values:
+            criteria[field] = values
+    positions = cohort_index.query_positions(
+        dob_from=request.args.get('dob_from'),
+        dob_to=request.args.get('dob_to'),
+        **criteria
+    )
+    age_min = request.args.get('age_min', type=int)
+    age_max = request.args.get('age_max', type=int)
+    if age_min is not None or age_max is not None:
+        positions = intersect_postings([positions, dob_array.positions_in_age_range(age_min, age_max)])
+    patients = [cohort_index.patients[doc] for doc in positions]
+    logger.info(f"Cohort query {dict(request.args)} matched {len(patients)} patients")
+    return jsonify({
+        "count": len(patients),
+        "patients": [
+            {key: patient.get(key) for key in ("patient_id", "full_name", "dob", "gender", "insurance", "pcp_name") + DERIVED_FIELD_NAMES}
+            for patient in patients
+        ],
+    })
+
+@app.route('/clinical_search', methods=['GET'])
+def clinical_search():
+    """
+    Ranked full-text search over diagnoses, medications and encounter text,
+    e.g. /clinical_search?q=asthma or /clinical_search?q=asth*&limit=50
+    """
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 20, type=int)
+    hits = clinical_text_index.search(query, limit=max(1, min(limit, 500))) if query else []
+    logger.info(f"Clinical search '{query}' returned {len(hits)} hits")
+    return jsonify({
+        "query": query,
+        "count": len(hits),
+        "hits": [
+            {
+                "patient_id": patient_id,
+                "full_name": (patients_by_id.get(patient_id) or {}).get("full_name"),
+                "score": round(score, 4),
+                "matches": [{"field": field, "text": text} for field, text in matches],
+            }
+            for patient_id, score, matches in hits
+        ],
+    })
+
+def _roster_page(roster, name, kind):
+    """Renders one page of a provider panel or facility roster as JSON."""
+    sort = request.args.get('sort', 'recency')
+    order = request.args.get('order', 'desc')
+    if sort not in ('recency', 'name') or order not in ('asc', 'desc'):
+        return jsonify({"error": "sort must be recency or name, order asc or desc"}), 400
+    result = roster.page(
+        name,
+        page=request.args.get('page', 1, type=int),
+        per_page=request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int),
+        sort=sort,
+        order=order,
+    )
+    if result is None:
+        logger.warning(f"No {kind} named '{name}'")
+        return jsonify({"error": f"Unknown {kind}: {name}"}), 404
+    return jsonify(result)
+
+@app.route('/providers', methods=['GET'])
+def providers():
+    """Providers with the size of their panel, largest first."""
+    return jsonify([{"name": name, "patients": count} for name, count in provider_index.providers.names()])
+
+@app.route('/providers/<path:name>/panel', methods=['GET'])
+def provider_panel(name):
+    """A provider's patients (assigned PCP or seen by them) with the last visit, newest first."""
+    return _roster_page(provider_index.providers, name, "provider")
+
+@app.route('/facilities', methods=['GET'])
+def facilities():
+    """Facilities with the number of patients seen there, largest first."""
+    return jsonify([{"name": name, "patients": count} for name, count in provider_index.facilities.names()])
+
+@app.route('/facilities/<path:name>/roster', methods=['GET'])
+def facility_roster(name):
+    """Everyone seen at a facility with their last visit there, newest first."""
+    return _roster_page(provider_index.facilities, name, "facility")
+
+@app.route('/encounters', methods=['GET'])
+def encounters():
+    """
+    Encounters across all patients in a date range, oldest first, e.g.
+    /encounters?days=7 or /encounters?from=2023-03-01&to=2023-03-31&facility=Albuquerque%20General
+    (type=... and provider=... filter on encounter type and provider; limit caps the listed encounters, not the count).
+    """
+    last_days = request.args.get('days', type=int)
+    if request.args.get('days') and last_days is None:
+        return jsonify({"error": f"Invalid days: {request.args.get('days')!r}"}), 400
+    try:
+        hits = encounter_index.query_dates(
+            date_from=request.args.get('from'),
+            date_to=request.args.get('to'),
+            last_days=last_days,
+            encounter_type=request.args.get('type'),
+            facility=request.args.get('facility'),
+            provider=request.args.get('provider'),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(request.args.get('limit', 1000, type=int), 10000))
+    logger.info(f"Encounter range query {dict(request.args)} matched {len(hits)} encounters")
+    return jsonify({
+        "count": len(hits),
+        "patient_count": len({id(patient) for patient, _ in hits}),
+        "encounters": [
+            {
+                "patient_id": patient.get("patient_id"),
+                "full_name": patient.get("full_name"),
+                **{key: encounter.get(key) for key in ("date", "type", "facility", "provider")},
+            }
+            for patient, encounter in hits[:limit]
+        ],
+    })
+
+@app.route('/encounters/summary', methods=['GET'])
+def encounters_summary():
+    """
+    Encounter counts across all patients grouped by type, facility or provider, e.g.
+    /encounters/summary?by=facility&from=2023-01-01&to=2023-12-31&type=Emergency
+    (type/facility/provider filter before grouping).
+    """
+    by = request.args.get('by', 'type')
+    if by not in CODED_COLUMNS:
+        return jsonify({"error": f"by must be one of {', '.join(CODED_COLUMNS)}"}), 400
+    start = encounter_timestamp(request.args.get('from'))
+    end = encounter_timestamp(request.args.get('to'), end_of_day=True)
+    for name, value in (('from', start), ('to', end)):
+        if request.args.get(name) and value is None:
+            return jsonify({"error": f"Invalid date: {request.args.get(name)!r}"}), 400
+    rows = encounter_store.rows_where(start, end, **{column: request.args.get(column) for column in CODED_COLUMNS})
+    logger.info(f"Encounter summary {dict(request.args)} covered {len(rows)} encounters")
+    return jsonify({
+        "by": by,
+        "count": len(rows),
+        "counts": [{"value": value, "encounters": count} for value, count in encounter_store.counts(by, rows)],
+    })
+
+@app.route('/conditions/active', methods=['GET'])
+def active_conditions():
+    """
+    Conditions active on a date, or at any time in a range, for everyone or one patient, e.g.
+    /conditions/active?date=2020-01-01 or /conditions/active?date=2020-01-01&to=2020-12-31&patient_id=...
+    (code=... keeps only one diagnosis code).
+    """
+    date = request.args.get('date')
+    if not date:
+        return jsonify({"error": "date is required"}), 400
+    try:
+        hits = condition_index.active_between(date, request.args.get('to'), request.args.get('patient_id'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    code = request.args.get('code')
+    if code:
+        hits = [(patient, condition) for patient, condition in hits if condition.get('code') == code]
+    logger.info(f"Active condition query {dict(request.args)} matched {len(hits)} conditions")
+    return jsonify({
+        "count": len(hits),
+        "patient_count": len({id(patient) for patient, _ in hits}),
+        "conditions": [
+            {
+                "patient_id": patient.get("patient_id"),
+                "full_name": patient.get("full_name"),
+                **{key: condition.get(key) for key in ("code", "description", "status", "onset", "abatement")},
+            }
+            for patient, condition in hits
+        ],
+    })
+
+@app.route('/readmissions', methods=['GET'])
+def readmission_summary():
+    """30-day readmission summary (overall and by discharge month) and the readmitted patients."""
+    return jsonify({
+        "summary": readmissions["summary"],
+        "patients": [entry for entry in readmissions["patients"] if entry["readmitted"]],
+    })
+
+# Points returned for a chart when the request does not say
+DEFAULT_CHART_POINTS = 300
+
+@app.route('/patients/<patient_id>/observations', methods=['GET'])
+def patient_observations(patient_id):
+    """The observation codes recorded for a patient, with their number of points and latest value."""
+    patient = patients_by_id.get(patient_id)
+    if patient is None:
+        return jsonify({"error": f"Unknown patient: {patient_id}"}), 404
+    series_list = sorted((patient.get('observations') or {}).values(), key=lambda s: (s.display or s.code).casefold())
+    return jsonify([
+        {
+            "code": series.code,
+            "display": series.display,
+            "unit": series.unit,
+            "points": len(series),
+            "first": iso_timestamp(series.timestamps[0]),
+            "last": iso_timestamp(series.timestamps[-1]),
+            "latest_value": series.values[-1],
+        }
+        for series in series_list if len(series)
+    ])
+
+@app.route('/patients/<patient_id>/observations/<code>', methods=['GET'])
+def observation_series(patient_id, code):
+    """
+    One observation code of a patient, downsampled with LTTB to at most points
+    values, e.g. /patients/<id>/observations/4548-4?points=200&from=2010-01-01
+    """
+    patient = patients_by_id.get(patient_id)
+    series = (patient.get('observations') or {}).get(code) if patient else None
+    if series is None:
+        return jsonify({"error": f"No observations with code {code} for patient {patient_id}"}), 404
+    date_from, date_to = request.args.get('from'), request.args.get('to')
+    start = encounter_timestamp(date_from) if date_from else None
+    end = encounter_timestamp(date_to, end_of_day=True) if date_to else None
+    if (date_from and start is None) or (date_to and end is None):
+        return jsonify({"error": "from/to must be FHIR dates or dateTimes"}), 400
+    points = max(2, min(request.args.get('points', DEFAULT_CHART_POINTS, type=int), 5000))
+    lo, hi = series.window(start, end)
+    return jsonify({
+        "code": series.code,
+        "display": series.display,
+        "unit": series.unit,
+        "total_points": hi - lo,
+        "points": [[iso_timestamp(timestamp), value] for timestamp, value in series.downsample(points, start, end)],
+    })
+
+@app.route('/dashboard', methods=['GET'])
+def dashboard():
+    """Population dashboard, read from the aggregates maintained at ingest and today's age bands."""
+    return render_template('dashboard.html', summary=population_aggregates.summary(age_band_counts=dob_array.age_band_counts(AGE_BANDS)))
+
+@app.route('/dashboard.json', methods=['GET'])
+def dashboard_json():
+    """The dashboard counts as JSON; top=N sets how many conditions are listed."""
+    top = max(1, min(request.args.get('top', 10, type=int), 100))
+    return jsonify(population_aggregates.summary(top_conditions=top, age_band_counts=dob_array.age_band_counts(AGE_BANDS)))
+
+@app.route('/reload', methods=['POST'])
+def reload_data():
+    """Reloads patient data from the data directory and refreshes the indexes."""
+    return jsonify(reload_patient_data())
+
 if __name__ == '__main__':
     # Note: Flask's development server's default logging might override basicConfig in some cases.
     # For production, a more robust logging setup (e.g., with Gunicorn) is recommended.
@@ -0,0 +1,27 @@
+from concurrent.futures import ProcessPoolExecutor
+
+# Shared plumbing for the population batch jobs (polypharmacy, readmissions).
+#
+# A job is a module-level function taking a list of patients and returning a
+# list of results. The patients are cut to the fields the job reads, so
+# workers do not pickle whole records, and split into chunks that are handed
+# to a process pool.
+
+# Patients per task handed to a worker process
+CHUNK_SIZE = 500
+
+
+def map_patient_chunks(job, patients, fields, *args, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Runs job(chunk, *args) over chunks of patients, in parallel when workers
+    != 1 (None means one per CPU), and returns the concatenated results in
+    patient order.
+    """
+    slim = [{key: patient.get(key) for key in fields} for patient in patients]
+    chunks = [slim[i:i + chunk_size] for i in range(0, len(slim), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [job(chunk, *args) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(job, chunks, *([arg] * len(chunks) for arg in args)))
+    return [item for result in results for item in result]
@@ -0,0 +1,112 @@
+import gzip
+import io
+import logging
+import mmap
+import os
+import tarfile
+
+# Bundle sources for load_all_patients_data.
+#
+# Synthea output may sit in the data directory as plain .json bundles, as
+# individually gzipped .json.gz bundles, or as .tar / .tar.gz archives of either.
+# Archives are opened in tarfile's streaming mode, so members are decompressed
+# one at a time while they are read and nothing is extracted to disk.
+# Plain on-disk bundles can also be memory-mapped (map_bundle_file) so the
+# decoder reads the page cache directly instead of a copy of the file.
+
+BUNDLE_SUFFIXES = (".json", ".json.gz")
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+
+
+def is_bundle_name(name):
+    """True if the name looks like a single FHIR bundle file."""
+    return name.endswith(BUNDLE_SUFFIXES)
+
+
+def is_archive_name(name):
+    """True if the name looks like a tar archive of bundle files."""
+    return name.endswith(ARCHIVE_SUFFIXES)
+
+
+def is_bundle_source(name):
+    """True if load_all_patients_data should read this directory entry."""
+    return is_bundle_name(name) or is_archive_name(name)
+
+
+def scan_bundle_sources(data_directory):
+    """
+    Lists the bundle sources of data_directory in one os.scandir pass.
+    Returns (name, size in bytes) pairs in directory order.
+    """
+    sources = []
+    with os.scandir(data_directory) as entries:
+        for entry in entries:
+            if is_bundle_source(entry.name) and entry.is_file():
+                sources.append((entry.name, entry.stat().st_size))
+    return sources
+
+
+def map_bundle_file(fp):
+    """
+    Returns the contents of fp as a read-only mmap when it is a plain file on
+    disk, otherwise (gzip streams, archive members, empty files) as bytes read
+    from it. The caller closes the mmap once it is done with it.
+    """
+    if isinstance(getattr(fp, "raw", None), io.FileIO):
+        try:
+            if os.fstat(fp.fileno()).st_size:
+                return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Falling back to read() for {getattr(fp, 'name', fp)}: {e}")
+    return fp.read()
+
+
+def decompressed_stream(name, fp):
+    """Wraps fp in a streaming gzip reader when name ends in .gz."""
+    if name.endswith(".gz"):
+        return gzip.GzipFile(filename=name, mode="rb", fileobj=fp)
+    return fp
+
+
+def iter_archive_bundles(archive_path, label=None, member_filter=None):
+    """
+    Yields (name, binary file object) for each bundle inside a tar archive;
+    with member_filter, only for members whose name it accepts.
+    """
+    label = label or os.path.basename(archive_path)
+    try:
+        with tarfile.open(archive_path, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or not is_bundle_name(member.name):
+                    continue
+                if member_filter is not None and not member_filter(member.name):
+                    continue
+                member_file = archive.extractfile(member)
+                # In streaming mode the member is only readable until the next one is requested
+                with decompressed_stream(member.name, member_file) as fp:
+                    yield f"{label}:{member.name}", fp
+    except (tarfile.TarError, OSError, EOFError) as e:
+        logging.error(f"Error reading archive {archive_path}: {e}")
+
+
+def iter_bundle_files(data_directory, filenames, member_filter=None):
+    """
+    Yields (name, binary file object) for every bundle found in filenames,
+    which are entries of data_directory. Archives yield one item per member
+    (only members accepted by member_filter, if given).
+    Each file object is only valid until the next item is requested.
+    """
+    for filename in filenames:
+        filepath = os.path.join(data_directory, filename)
+        if is_archive_name(filename):
+            yield from iter_archive_bundles(filepath, label=filename, member_filter=member_filter)
+            continue
+        if not is_bundle_name(filename):
+            continue
+        try:
+            raw_file = open(filepath, "rb")
+        except OSError as e:
+            logging.error(f"IOError opening file {filepath}: {e}")
+            continue
+        with raw_file, decompressed_stream(filename, raw_file) as fp:
+            yield filename, fp
@@ -0,0 +1,170 @@
+import math
+import re
+from bisect import bisect_left, insort
+
+# Full-text index over the clinical text of parsed patients.
+#
+# Each patient is one document made of their diagnosis descriptions,
+# medication names, encounter types and encounter primary diagnosis texts.
+# Terms map to {patient_id: weighted term frequency}; a sorted vocabulary
+# answers prefix queries ("asth*") with a bisect. Hits are ranked with
+# tf-idf. Documents are keyed by patient_id and fingerprinted, so update()
+# after a data reload only re-indexes the patients whose text changed.
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+MIN_TERM_LENGTH = 2
+
+# Where a term appears changes how much it says about the patient
+FIELD_WEIGHTS = {
+    "diagnosis": 3.0,
+    "primary_diagnosis": 2.0,
+    "medication": 2.0,
+    "encounter_type": 1.0,
+}
+
+
+def tokenize(text):
+    """Lower-case alphanumeric terms of at least MIN_TERM_LENGTH characters."""
+    return [t for t in _TOKEN_RE.findall(str(text).casefold()) if len(t) >= MIN_TERM_LENGTH]
+
+
+def clinical_texts(patient):
+    """Returns the (field, text) pairs of a patient that the index covers, without duplicates."""
+    texts = []
+    for diagnosis in patient.get("diagnoses") or []:
+        texts.append(("diagnosis", diagnosis.get("description")))
+    for medication in patient.get("medications") or []:
+        texts.append(("medication", medication.get("name")))
+    for encounter in patient.get("recent_encounters") or []:
+        texts.append(("encounter_type", encounter.get("type")))
+        texts.append(("primary_diagnosis", encounter.get("primary_diagnosis_text")))
+    seen = set()
+    unique = []
+    for field, text in texts:
+        if text and (field, text) not in seen:
+            seen.add((field, text))
+            unique.append((field, text))
+    return unique
+
+
+class ClinicalTextIndex:
+    """Incrementally maintained inverted index with prefix search and ranked hits."""
+
+    def __init__(self, patients=()):
+        self._postings = {}      # term -> {patient_id: weight}
+        self._terms = []         # Sorted vocabulary, for prefix lookups
+        self._documents = {}     # patient_id -> (fingerprint, {term: weight}, [(field, text)])
+        if patients:
+            self.update(patients)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _document(self, patient):
+        texts = clinical_texts(patient)
+        weights = {}
+        for field, text in texts:
+            for term in tokenize(text):
+                weights[term] = weights.get(term, 0.0) + FIELD_WEIGHTS[field]
+        return hash(tuple(texts)), weights, texts
+
+    def _add(self, patient_id, document):
+        self._documents[patient_id] = document
+        for term, weight in document[1].items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                insort(self._terms, term)
+            posting[patient_id] = weight
+
+    def _remove(self, patient_id):
+        _, weights, _ = self._documents.pop(patient_id)
+        for term in weights:
+            posting = self._postings[term]
+            del posting[patient_id]
+            if not posting:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def update(self, patients):
+        """
+        Brings the index in line with a (re)loaded patient list. Only patients
+        that are new, gone or whose clinical text changed are touched.
+        Returns counts of added, updated, removed and unchanged patients.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        present = set()
+        for patient in patients:
+            patient_id = patient.get("patient_id")
+            if not patient_id:
+                continue
+            present.add(patient_id)
+            document = self._document(patient)
+            current = self._documents.get(patient_id)
+            if current is not None and current[0] == document[0]:
+                counts["unchanged"] += 1
+                continue
+            if current is not None:
+                self._remove(patient_id)
+                counts["updated"] += 1
+            else:
+                counts["added"] += 1
+            self._add(patient_id, document)
+        for patient_id in [p for p in self._documents if p not in present]:
+            self._remove(patient_id)
+            counts["removed"] += 1
+        return counts
+
+    def expand(self, term, prefix=False):
+        """Returns the indexed terms a query term stands for (itself, or every term it prefixes)."""
+        if not prefix:
+            return [term] if term in self._postings else []
+        # Terms are [0-9a-z], so every term with this prefix sorts before prefix + "~"
+        start = bisect_left(self._terms, term)
+        end = bisect_left(self._terms, term + "~", start)
+        return self._terms[start:end]
+
+    def search(self, query, limit=20):
+        """
+        Returns up to limit (patient_id, score, matching texts) hits, best first.
+        Every query term must match; a term ending in * matches as a prefix.
+        """
+        scores = None
+        matched_terms = set()
+        for raw in query.split():
+            prefix = raw.endswith("*")
+            pieces = _TOKEN_RE.findall(raw.casefold())
+            # No indexed term is shorter than MIN_TERM_LENGTH, but a short prefix ("a*") still matches
+            terms = [
+                t for n, t in enumerate(pieces)
+                if len(t) >= MIN_TERM_LENGTH or (prefix and n == len(pieces) - 1)
+            ]
+            if not terms:
+                continue
+            for n, term in enumerate(terms):
+                # Only the last piece of "asth*" or "covid-19*" is a prefix
+                expanded = self.expand(term, prefix and n == len(terms) - 1)
+                term_scores = {}
+                for indexed in expanded:
+                    posting = self._postings[indexed]
+                    idf = math.log(1 + len(self._documents) / len(posting))
+                    for patient_id, weight in posting.items():
+                        term_scores[patient_id] = max(term_scores.get(patient_id, 0.0), weight * idf)
+                matched_terms.update(expanded)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {p: s + term_scores[p] for p, s in scores.items() if p in term_scores}
+                if not scores:
+                    return []
+        if not scores:
+            return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(patient_id, score, self._matching_texts(patient_id, matched_terms)) for patient_id, score in ranked]
+
+    def _matching_texts(self, patient_id, terms):
+        return [
+            (field, text)
+            for field, text in self._documents[patient_id][2]
+            if any(t in terms for t in tokenize(text))
+        ]
@@ -0,0 +1,128 @@
+from bisect import bisect_left, bisect_right
+
+# Inverted indexes for cohort queries over parsed patients.
+#
+# Patients are numbered by their position in all_patients_data. Each indexed
+# field maps a normalized value to a posting list: the sorted positions of the
+# patients that have it. A query ANDs fields by intersecting posting lists,
+# shortest first, galloping through the longer lists with bisect, so its cost
+# follows the size of the smallest list rather than the number of patients.
+# Several values for one field are ORed by merging their lists.
+
+ACTIVE_STATUSES = frozenset(["active", "recurrence", "relapse"])
+
+# Field name -> function returning the values a patient is indexed under
+INDEXED_FIELDS = {
+    "diagnosis_code": lambda p: [d.get("code") for d in p.get("diagnoses") or []],
+    "active_diagnosis_code": lambda p: [d.get("code") for d in p.get("diagnoses") or [] if d.get("status") in ACTIVE_STATUSES],
+    "medication": lambda p: [m.get("name") for m in p.get("medications") or []],
+    "active_medication": lambda p: [m.get("name") for m in p.get("medications") or [] if m.get("status") == "active"],
+    "insurance": lambda p: [p.get("insurance")],
+    "pcp_name": lambda p: [p.get("pcp_name")],
+    "gender": lambda p: [p.get("gender")],
+    "dob": lambda p: [p.get("dob")],
+    # Derived at ingest (see derived_fields)
+    "active_condition_count": lambda p: [str(p["active_condition_count"])] if p.get("active_condition_count") is not None else [],
+    "active_medication_count": lambda p: [str(p["active_medication_count"])] if p.get("active_medication_count") is not None else [],
+}
+
+
+def normalize_value(value):
+    """Index keys are compared case- and whitespace-insensitively."""
+    return " ".join(str(value).split()).casefold()
+
+
+def intersect_postings(postings):
+    """Intersects sorted posting lists, starting from the shortest one."""
+    if not postings:
+        return []
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        if not result:
+            break
+        matched = []
+        lo = 0
+        for doc in result:
+            lo = bisect_left(other, doc, lo)
+            if lo == len(other):
+                break
+            if other[lo] == doc:
+                matched.append(doc)
+        result = matched
+    return list(result)
+
+
+def union_postings(postings):
+    """Merges sorted posting lists into one sorted list without duplicates."""
+    if len(postings) == 1:
+        return list(postings[0])
+    return sorted(set().union(*postings))
+
+
+class CohortIndex:
+    """
+    Posting-list indexes over a list of parsed patients, built once at ingest.
+    query() answers AND/OR questions such as "active diabetics on metformin
+    with plan X" without scanning the patients.
+    """
+
+    def __init__(self, patients):
+        self.patients = patients
+        self._postings = {field: {} for field in INDEXED_FIELDS}
+        for doc, patient in enumerate(patients):
+            for field, values_of in INDEXED_FIELDS.items():
+                postings = self._postings[field]
+                for value in values_of(patient):
+                    if not value:
+                        continue
+                    posting = postings.setdefault(normalize_value(value), [])
+                    if not posting or posting[-1] != doc:  # A patient appears once per key
+                        posting.append(doc)
+        # Sorted keys make DOB ranges a bisect; ISO dates sort chronologically
+        self._sorted_dobs = sorted(self._postings["dob"])
+
+    def __len__(self):
+        return len(self.patients)
+
+    def values(self, field):
+        """Returns the normalized keys of a field, e.g. to offer them in a UI."""
+        return sorted(self._postings[field])
+
+    def keys_containing(self, field, text):
+        """Returns the keys of a field containing text (scans the vocabulary, not the patients)."""
+        needle = normalize_value(text)
+        return [key for key in self._postings[field] if needle in key]
+
+    def postings(self, field, values):
+        """Returns the sorted patient positions having any of values in field."""
+        if field not in self._postings:
+            raise ValueError(f"Unknown cohort field {field!r} (expected one of: {', '.join(INDEXED_FIELDS)})")
+        if isinstance(values, str):
+            values = [values]
+        index = self._postings[field]
+        found = [index[key] for key in (normalize_value(v) for v in values) if key in index]
+        return union_postings(found) if found else []
+
+    def dob_postings(self, dob_from=None, dob_to=None):
+        """Returns the sorted positions of patients born between dob_from and dob_to (inclusive, YYYY-MM-DD)."""
+        lo = bisect_left(self._sorted_dobs, dob_from) if dob_from else 0
+        hi = bisect_right(self._sorted_dobs, dob_to) if dob_to else len(self._sorted_dobs)
+        index = self._postings["dob"]
+        return union_postings([index[key] for key in self._sorted_dobs[lo:hi]]) if hi > lo else []
+
+    def query_positions(self, dob_from=None, dob_to=None, **criteria):
+        """
+        Returns the positions of patients matching every criterion. Each keyword
+        is an INDEXED_FIELDS name with a value or a list of values (ORed).
+        """
+        postings = [self.postings(field, values) for field, values in criteria.items() if values]
+        if dob_from or dob_to:
+            postings.append(self.dob_postings(dob_from, dob_to))
+        if not postings:
+            return list(range(len(self.patients)))
+        return intersect_postings(postings)
+
+    def query(self, dob_from=None, dob_to=None, **criteria):
+        """Returns the patients matching every criterion (see query_positions), in load order."""
+        return [self.patients[doc] for doc in self.query_positions(dob_from, dob_to, **criteria)]
@@ -0,0 +1,44 @@
+"""
+Serves OneView and LongView from one process over a single parsed dataset.
+
+OneView loads and indexes the data directory as usual. LongView loads
+nothing: it is handed OneView's patient list, patient_id lookup and search
+index, and projects each record onto the fields it reads
+(longview_app.app.PATIENT_FIELDS) as it renders it. Its timelines are built per patient on first use from the
+same nested encounter, diagnosis and medication lists, so no record is stored
+twice. A OneView reload passes the new dataset to LongView as well.
+
+    python -m oneview_app.combined [--host 127.0.0.1] [--port 5000]
+
+OneView is mounted at / and LongView at /longview. For a WSGI server, use
+oneview_app.combined:application.
+"""
+import argparse
+import logging
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.serving import run_simple
+from oneview_app import app as oneview
+from longview_app import app as longview
+
+logger = logging.getLogger(__name__)
+
+LONGVIEW_PREFIX = "/longview"
+
+
+longview.use_patients(oneview.all_patients_data, oneview.patients_by_id, oneview.search_index)
+oneview.reload_listeners.append(longview.use_patients)
+
+application = DispatcherMiddleware(oneview.app, {LONGVIEW_PREFIX: longview.app})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args(argv)
+    logger.info(f"Serving OneView at / and LongView at {LONGVIEW_PREFIX} over {len(oneview.all_patients_data)} shared patient records")
+    run_simple(args.host, args.port, application)
+
+
+if __name__ == '__main__':
+    main()
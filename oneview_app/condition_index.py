@@ -0,0 +1,164 @@
+from oneview_app.cohort_index import ACTIVE_STATUSES
+from oneview_app.encounter_index import encounter_timestamp
+
+# "Which conditions were active on date X?" for one patient or the population.
+#
+# A condition is active over the half-open interval [onset, abatement). A
+# missing onset means "since before the record starts"; a missing abatement
+# means "still going" when the clinical status is active, and the condition
+# counts only on its onset day otherwise (resolved with no end on record).
+# Intervals live in a centered interval tree: each node keeps the intervals
+# containing its center sorted by start and by end, so a point or range query
+# walks one root-to-leaf path and reads only the intervals it returns,
+# O(log n + k). The population tree is built at ingest; per-patient trees are
+# built on first use.
+
+OPEN_START = -(2 ** 62)
+OPEN_END = 2 ** 62
+_DAY = 24 * 60 * 60
+
+
+def condition_interval(condition):
+    """Returns the (start, end) timestamps a condition is active over, or None if it never is."""
+    onset = condition.get("onset")
+    start = encounter_timestamp(onset) if onset else OPEN_START
+    if start is None:
+        return None  # An onset we cannot read says nothing reliable about when it applies
+    abatement = condition.get("abatement")
+    if abatement:
+        end = encounter_timestamp(abatement)
+        if end is None:
+            return None
+    elif condition.get("status") in ACTIVE_STATUSES:
+        end = OPEN_END
+    elif start != OPEN_START:
+        end = start + _DAY
+    else:
+        return None
+    return (start, end) if end > start else None
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+
+class IntervalTree:
+    """Static centered interval tree over (start, end, payload) triples, intervals half-open."""
+
+    def __init__(self, intervals):
+        intervals = [interval for interval in intervals if interval[1] > interval[0]]
+        self._size = len(intervals)
+        self._root = self._build(intervals)
+
+    def __len__(self):
+        return self._size
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end - 1))
+        node = _Node()
+        node.center = endpoints[len(endpoints) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] <= node.center:
+                left.append(interval)
+            elif interval[0] > node.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        node.by_start = sorted(here, key=lambda interval: interval[0])
+        node.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def overlapping(self, start, end):
+        """Returns the payloads of intervals overlapping [start, end] (start <= end; a point when equal)."""
+        found = []
+        node = self._root
+        stack = []
+        while node is not None or stack:
+            if node is None:
+                node = stack.pop()
+            if end < node.center:
+                # Every interval here ends after center > end: only the start decides
+                for interval in node.by_start:
+                    if interval[0] > end:
+                        break
+                    found.append(interval[2])
+                node = node.left
+            elif start >= node.center:
+                # Every interval here starts at or before center <= start: only the end decides
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    found.append(interval[2])
+                node = node.right
+            else:
+                found.extend(interval[2] for interval in node.by_start)
+                if node.right is not None:
+                    stack.append(node.right)
+                node = node.left
+        return found
+
+
+class ConditionIntervalIndex:
+    """Active-as-of queries over the conditions of a list of parsed patients."""
+
+    def __init__(self, patients):
+        self.patients = patients
+        self._positions = {}          # patient_id -> position in patients
+        self._patient_intervals = {}  # position -> [(start, end, (position, n))]
+        intervals = []
+        for doc, patient in enumerate(patients):
+            if patient.get("patient_id"):
+                self._positions[patient["patient_id"]] = doc
+            own = []
+            for n, condition in enumerate(patient.get("diagnoses") or []):
+                interval = condition_interval(condition)
+                if interval is not None:
+                    own.append((interval[0], interval[1], (doc, n)))
+            if own:
+                self._patient_intervals[doc] = own
+                intervals.extend(own)
+        self._tree = IntervalTree(intervals)
+        self._patient_trees = {}
+
+    def __len__(self):
+        return len(self._tree)
+
+    def _tree_for(self, patient_id):
+        if patient_id is None:
+            return self._tree
+        doc = self._positions.get(patient_id)
+        if doc is None:
+            return None
+        tree = self._patient_trees.get(doc)
+        if tree is None:
+            tree = self._patient_trees[doc] = IntervalTree(self._patient_intervals.get(doc, []))
+        return tree
+
+    def active_between(self, date_from, date_to=None, patient_id=None):
+        """
+        Returns (patient, condition) pairs active at any time between date_from
+        and date_to (FHIR dates or dateTimes; a date covers its whole day), for
+        one patient or everyone, in patient order.
+        Raises ValueError for a date that does not parse.
+        """
+        date_to = date_to or date_from
+        start = encounter_timestamp(date_from)
+        end = encounter_timestamp(date_to, end_of_day=True)
+        if start is None or end is None:
+            raise ValueError(f"Invalid date: {(date_from if start is None else date_to)!r}")
+        if end < start:
+            raise ValueError("The end date is before the start date")
+        tree = self._tree_for(patient_id)
+        if tree is None:
+            return []
+        positions = sorted(tree.overlapping(start, end))
+        return [(self.patients[doc], self.patients[doc]["diagnoses"][n]) for doc, n in positions]
+
+    def active_on(self, date, patient_id=None):
+        """Conditions active on date (a point in time, or any time that day for a plain date)."""
+        return self.active_between(date, date, patient_id)
@@ -0,0 +1,111 @@
+from array import array
+from bisect import bisect_right
+from datetime import date
+
+# Population-wide age computations over packed date-of-birth integers.
+#
+# Each DOB is stored once at ingest as a YYYYMMDD integer (1959-09-07 ->
+# 19590907; 0 when missing or unreadable). With both dates in that form, an
+# age in whole years is (today - dob) // 10000. That is exact across leap
+# days and needs no calendar logic, so it vectorizes. "Aged between a and b"
+# becomes a comparison against two integer cutoffs. NumPy is used when
+# installed; otherwise the same arithmetic runs over the stdlib array.
+# The known keys are also kept sorted, so counting one age band is two
+# bisections against that day's cutoffs rather than a pass over the population.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UNKNOWN_DOB = 0
+
+
+def dob_key(dob_str):
+    """Packs a YYYY-MM-DD date of birth as a YYYYMMDD integer, or UNKNOWN_DOB if it does not parse."""
+    try:
+        parsed = date.fromisoformat((dob_str or "")[:10])
+    except ValueError:
+        return UNKNOWN_DOB
+    return parsed.year * 10000 + parsed.month * 100 + parsed.day
+
+
+def today_key(today=None):
+    today = today or date.today()
+    return today.year * 10000 + today.month * 100 + today.day
+
+
+def age_from_key(key, today=None):
+    """Age in whole years for a dob_key, or None for UNKNOWN_DOB or a future date."""
+    if key == UNKNOWN_DOB:
+        return None
+    age = (today_key(today) - key) // 10000
+    return age if age >= 0 else None
+
+
+def _dob_cutoffs(min_age, max_age, today=None):
+    """
+    Returns (latest, earliest) dob_keys for ages min_age..max_age: a DOB is in
+    range when earliest < dob <= latest. earliest is None when max_age is.
+    """
+    now = today_key(today)
+    # age >= min_age  <=>  dob <= now - min_age years;  age <= max_age  <=>  dob > now - (max_age + 1) years
+    latest = now - 10000 * (min_age or 0)
+    earliest = now - 10000 * (max_age + 1) if max_age is not None else None
+    return latest, earliest
+
+
+class DobArray:
+    """Packed DOBs of a list of parsed patients, by position in that list."""
+
+    def __init__(self, patients, use_numpy=None):
+        self.keys = array('q', (dob_key(patient.get("dob")) for patient in patients))
+        self.sorted_keys = array('q', sorted(key for key in self.keys if key != UNKNOWN_DOB))
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy and numpy is not None
+        # Zero-copy view of the same buffer
+        self._vector = numpy.frombuffer(self.keys, dtype=numpy.int64) if self.use_numpy else None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _age_vector(self, today):
+        ages = (today_key(today) - self._vector) // 10000
+        ages[(self._vector == UNKNOWN_DOB) | (ages < 0)] = -1
+        return ages
+
+    def ages(self, today=None):
+        """Age of every patient in one batch; -1 where the DOB is unknown or in the future."""
+        if self._vector is not None:
+            return self._age_vector(today).tolist()
+        now = today_key(today)
+        return [(now - key) // 10000 if key != UNKNOWN_DOB and key <= now else -1 for key in self.keys]
+
+    def age_band_counts(self, bands, today=None):
+        """
+        Histogram of ages over bands, a sequence of (label, lowest age, highest
+        age or None). Unknown DOBs and ages outside every band are counted
+        under None. Each band is two bisections of sorted_keys.
+        """
+        counts = dict.fromkeys([band[0] for band in bands] + [None], 0)
+        for label, lowest, highest in bands:
+            latest, earliest = _dob_cutoffs(lowest, highest, today)
+            below = bisect_right(self.sorted_keys, earliest) if earliest is not None else 0
+            counts[label] += bisect_right(self.sorted_keys, latest) - below
+        counts[None] = len(self.keys) - sum(counts.values())
+        return counts
+
+    def positions_in_age_range(self, min_age=None, max_age=None, today=None):
+        """
+        Sorted positions of patients aged min_age..max_age (inclusive, either may
+        be None), ready to intersect with cohort posting lists.
+        """
+        latest, earliest = _dob_cutoffs(min_age, max_age, today)
+        if self._vector is not None:
+            keep = (self._vector != UNKNOWN_DOB) & (self._vector <= latest)
+            if earliest is not None:
+                keep &= self._vector > earliest
+            return numpy.flatnonzero(keep).tolist()
+        return [
+            doc for doc, key in enumerate(self.keys)
+            if key != UNKNOWN_DOB and key <= latest and (earliest is None or key > earliest)
+        ]
@@ -0,0 +1,65 @@
+from oneview_app.cohort_index import ACTIVE_STATUSES
+from oneview_app.encounter_index import encounter_timestamp
+
+# Derived per-patient fields, computed at ingest.
+#
+# parse_fhir_bundle runs this stage on each patient as soon as the patient is
+# parsed. The stage reads the already-parsed encounters, diagnoses and
+# medications once and stores the results on the patient record, so the
+# detail page and cohort queries read a key instead of rescanning lists. A
+# reload re-parses each bundle and so recomputes the fields of exactly the
+# patients it loads; there is no separate pass over the population.
+
+# Encounter types that count as a wellness visit (Synthea uses the first three)
+WELLNESS_TYPE_KEYWORDS = (
+    "general examination",
+    "well child",
+    "check up",
+    "checkup",
+    "wellness",
+    "annual physical",
+    "preventive",
+)
+
+DERIVED_FIELD_NAMES = ("last_wellness_visit", "last_encounter_date", "active_condition_count", "active_medication_count")
+
+
+def is_wellness_visit(encounter):
+    encounter_type = (encounter.get("type") or "").casefold()
+    return any(keyword in encounter_type for keyword in WELLNESS_TYPE_KEYWORDS)
+
+
+def derive_fields(patient):
+    """Returns the derived fields of a parsed patient (see DERIVED_FIELD_NAMES)."""
+    last_encounter = last_wellness = None  # (timestamp, date string)
+    for encounter in patient.get("recent_encounters") or []:
+        timestamp = encounter_timestamp(encounter.get("date"))
+        if timestamp is None:
+            continue
+        if last_encounter is None or timestamp > last_encounter[0]:
+            last_encounter = (timestamp, encounter["date"])
+        if is_wellness_visit(encounter) and (last_wellness is None or timestamp > last_wellness[0]):
+            last_wellness = (timestamp, encounter["date"])
+    # The same condition or drug can be recorded more than once; count each once
+    active_conditions = {
+        d.get("code") or d.get("description")
+        for d in patient.get("diagnoses") or []
+        if d.get("status") in ACTIVE_STATUSES
+    }
+    active_medications = {
+        m.get("name")
+        for m in patient.get("medications") or []
+        if m.get("status") == "active"
+    }
+    return {
+        "last_wellness_visit": last_wellness[1] if last_wellness else None,
+        "last_encounter_date": last_encounter[1] if last_encounter else None,
+        "active_condition_count": len(active_conditions - {None}),
+        "active_medication_count": len(active_medications - {None}),
+    }
+
+
+def apply_derived_fields(patient):
+    """The ingest stage: stores the derived fields on the patient record and returns it."""
+    patient.update(derive_fields(patient))
+    return patient
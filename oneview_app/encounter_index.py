@@ -0,0 +1,266 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from oneview_app.cohort_index import normalize_value
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Population-wide encounter data in columns.
+#
+# EncounterStore holds every encounter as one row of parallel arrays (struct
+# of arrays): a packed integer timestamp (seconds since the epoch, UTC), the
+# patient's position in all_patients_data, the encounter's position in that
+# patient's recent_encounters, and small integer codes for type, facility and
+# provider. Rows are grouped by patient and sorted by time within each
+# patient, with undated encounters last; offsets[doc]:offsets[doc + 1] are a
+# patient's rows. A filter over the population compares ints in flat arrays
+# instead of walking nested dicts, and date strings are parsed once at ingest.
+# With NumPy installed, rows_where() and counts() run as vectorized
+# comparisons over zero-copy views of the columns; without it they fall back
+# to loops over the same arrays.
+#
+# EncounterTimeIndex is a time-sorted permutation of the store's dated rows.
+# A date range query is two binary searches over its timestamps plus a slice.
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encounter_timestamp(date_str, end_of_day=False):
+    """
+    Seconds since the epoch for a FHIR date or dateTime, or None if it does not
+    parse. Dates without a time are midnight UTC; with end_of_day they are the
+    last second of that day, so "to=2023-03-31" covers the whole day.
+    """
+    if not date_str:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(date_str).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    seconds = int((parsed - _EPOCH).total_seconds())
+    if end_of_day and 'T' not in str(date_str):
+        seconds += 24 * 60 * 60 - 1
+    return seconds
+
+
+def iso_timestamp(timestamp):
+    """Formats epoch seconds as an ISO 8601 UTC dateTime ("2023-03-15T10:00:00Z")."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class _Vocabulary:
+    """Interns normalized strings as small integer codes; code 0 means no value."""
+
+    def __init__(self):
+        self._codes = {}
+        self._values = [None]  # Code -> first value seen for it
+
+    def code(self, value, add=False):
+        if not value:
+            return 0
+        key = normalize_value(value)
+        code = self._codes.get(key)
+        if code is None and add:
+            code = self._codes[key] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def value(self, code):
+        return self._values[code]
+
+
+# Undated encounters sort after every dated one
+NO_TIMESTAMP = 2 ** 63 - 1
+CODED_COLUMNS = ("type", "facility", "provider")
+
+
+class EncounterStore:
+    """Every encounter of a list of parsed patients as columns, grouped by patient."""
+
+    def __init__(self, patients, use_numpy=None):
+        self.patients = patients
+        self.vocabularies = {column: _Vocabulary() for column in CODED_COLUMNS}
+        self.timestamps = array('q')
+        self.patient_positions = array('l')
+        self.encounter_positions = array('l')
+        self.codes = {column: array('q') for column in CODED_COLUMNS}
+        self.offsets = array('l', [0])
+        self.positions_by_id = {patient.get("patient_id"): doc for doc, patient in enumerate(patients)}
+        for doc, patient in enumerate(patients):
+            encounters = patient.get("recent_encounters") or []
+            rows = []
+            for n, encounter in enumerate(encounters):
+                timestamp = encounter_timestamp(encounter.get("date"))
+                rows.append((NO_TIMESTAMP if timestamp is None else timestamp, n))
+            rows.sort()
+            for timestamp, n in rows:
+                self.timestamps.append(timestamp)
+                self.patient_positions.append(doc)
+                self.encounter_positions.append(n)
+                for column in CODED_COLUMNS:
+                    self.codes[column].append(self.vocabularies[column].code(encounters[n].get(column), add=True))
+            self.offsets.append(len(self.timestamps))
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy and numpy is not None
+        # Zero-copy views of the finished columns (the arrays never grow after this)
+        self._timestamp_vector = numpy.frombuffer(self.timestamps, dtype=numpy.int64) if self.use_numpy else None
+        self._code_vectors = {
+            column: numpy.frombuffer(codes, dtype=numpy.int64) for column, codes in self.codes.items()
+        } if self.use_numpy else None
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def patient_encounters(self, doc, descending=False):
+        """
+        A patient's encounters oldest first, or newest first when descending.
+        Undated encounters come last either way, in recorded order (reversed
+        when descending).
+        """
+        lo, hi = self.offsets[doc], self.offsets[doc + 1]
+        split = bisect_left(self.timestamps, NO_TIMESTAMP, lo, hi)
+        dated, undated = self.encounter_positions[lo:split], self.encounter_positions[split:hi]
+        if descending:
+            dated, undated = dated[::-1], undated[::-1]
+        encounters = self.patients[doc]["recent_encounters"]
+        return [encounters[n] for n in chain(dated, undated)]
+
+    def rows_where(self, start=None, end=None, **values):
+        """
+        Row numbers of encounters with start <= timestamp <= end (either bound
+        may be None; undated encounters only match when both are) whose coded
+        columns equal the given values, matched case-insensitively, e.g.
+        rows_where(facility="Albuquerque General", type="Emergency").
+        Raises ValueError for a column that is not in CODED_COLUMNS.
+        """
+        codes = {}
+        for column, value in values.items():
+            if column not in self.codes:
+                raise ValueError(f"Unknown encounter column: {column}")
+            if not value:
+                continue
+            code = self.vocabularies[column].code(value)
+            if code is None:
+                return []
+            codes[column] = code
+        lo = start if start is not None else -NO_TIMESTAMP
+        hi = end if end is not None else NO_TIMESTAMP - 1
+        by_time = start is not None or end is not None
+        if self._code_vectors is not None:
+            keep = numpy.ones(len(self.timestamps), dtype=bool)
+            for column, code in codes.items():
+                keep &= self._code_vectors[column] == code
+            if by_time:
+                keep &= (self._timestamp_vector >= lo) & (self._timestamp_vector <= hi)
+            return numpy.flatnonzero(keep).tolist()
+        rows = None
+        for column, code in codes.items():
+            column_codes = self.codes[column]
+            if rows is None:
+                rows = [row for row, row_code in enumerate(column_codes) if row_code == code]
+            else:
+                rows = [row for row in rows if column_codes[row] == code]
+        if by_time:
+            timestamps = self.timestamps
+            if rows is None:
+                rows = [row for row, timestamp in enumerate(timestamps) if lo <= timestamp <= hi]
+            else:
+                rows = [row for row in rows if lo <= timestamps[row] <= hi]
+        return list(range(len(self.timestamps))) if rows is None else rows
+
+    def counts(self, column, rows=None):
+        """
+        (value, encounters) pairs for a coded column over rows (default: all),
+        largest first and then in order of first appearance; uncoded rows are skipped.
+        """
+        if column not in self.codes:
+            raise ValueError(f"Unknown encounter column: {column}")
+        vocabulary = self.vocabularies[column]
+        if self._code_vectors is not None:
+            vector = self._code_vectors[column]
+            per_code = numpy.bincount(vector if rows is None else vector[numpy.asarray(rows, dtype=numpy.int64)])
+            counts = {code: int(count) for code, count in enumerate(per_code.tolist()) if count}
+        else:
+            codes = self.codes[column]
+            counts = Counter(codes if rows is None else map(codes.__getitem__, rows))
+        ranked = sorted((item for item in counts.items() if item[0]), key=lambda item: (-item[1], item[0]))
+        return [(vocabulary.value(code), count) for code, count in ranked]
+
+    def encounters(self, rows):
+        """Returns the (patient, encounter) pair of each row."""
+        return [
+            (self.patients[self.patient_positions[row]],
+             self.patients[self.patient_positions[row]]["recent_encounters"][self.encounter_positions[row]])
+            for row in rows
+        ]
+
+
+class EncounterTimeIndex:
+    """Time-sorted view of the dated rows of an EncounterStore."""
+
+    def __init__(self, patients, store=None):
+        self.store = store if store is not None else EncounterStore(patients)
+        self.patients = self.store.patients
+        # A stable sort keeps patients, then encounters, in order within a timestamp
+        rows = [row for row, timestamp in enumerate(self.store.timestamps) if timestamp != NO_TIMESTAMP]
+        rows.sort(key=self.store.timestamps.__getitem__)
+        self.rows = array('l', rows)
+        self.timestamps = array('q', map(self.store.timestamps.__getitem__, rows))
+        self.patient_positions = array('l', map(self.store.patient_positions.__getitem__, rows))
+        self.encounter_positions = array('l', map(self.store.encounter_positions.__getitem__, rows))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def range_rows(self, start=None, end=None, encounter_type=None, facility=None, provider=None):
+        """
+        Returns the row numbers of encounters with start <= timestamp <= end
+        (either bound may be None), oldest first, optionally restricted to an
+        encounter type, facility and/or provider (matched case-insensitively).
+        """
+        lo = bisect_left(self.timestamps, start) if start is not None else 0
+        hi = bisect_left(self.timestamps, end + 1) if end is not None else len(self.timestamps)
+        rows = range(lo, hi)
+        for column, value in (("type", encounter_type), ("facility", facility), ("provider", provider)):
+            if value:
+                code = self.store.vocabularies[column].code(value)
+                if code is None:
+                    return []
+                codes, store_rows = self.store.codes[column], self.rows
+                rows = [row for row in rows if codes[store_rows[row]] == code]
+        return list(rows)
+
+    def query(self, start=None, end=None, encounter_type=None, facility=None, provider=None):
+        """Returns (patient, encounter) pairs in the range, oldest first (see range_rows)."""
+        return [
+            (self.patients[self.patient_positions[row]],
+             self.patients[self.patient_positions[row]]["recent_encounters"][self.encounter_positions[row]])
+            for row in self.range_rows(start, end, encounter_type, facility, provider)
+        ]
+
+    def query_dates(self, date_from=None, date_to=None, last_days=None, now=None, **filters):
+        """
+        Like query(), with the range given as FHIR date strings (date_to covers
+        its whole day) or as the last N days up to now.
+        Raises ValueError for a date that does not parse.
+        """
+        start = end = None
+        if last_days is not None:
+            now = now or datetime.now(timezone.utc)
+            start = int((now - timedelta(days=last_days) - _EPOCH).total_seconds())
+            end = int((now - _EPOCH).total_seconds())
+        if date_from:
+            start = encounter_timestamp(date_from)
+            if start is None:
+                raise ValueError(f"Invalid date: {date_from!r}")
+        if date_to:
+            end = encounter_timestamp(date_to, end_of_day=True)
+            if end is None:
+                raise ValueError(f"Invalid date: {date_to!r}")
+        return self.query(start, end, **filters)
@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import zlib
+from oneview_app.bundle_sources import decompressed_stream
+from oneview_app.fhir_references import ReferenceTable
+
+# FHIR Bulk Data ($export) ingest.
+#
+# A bulk export is a directory of NDJSON files, one resource per line and
+# usually one file (or a numbered series of files) per resource type. The files
+# are streamed line by line and resources are joined to their Patient through
+# subject/patient/beneficiary references. When the export is larger than the
+# memory budget, lines are first partitioned by patient id into temporary spill
+# files and each partition is joined on its own, so only one partition's
+# resources are ever decoded at the same time. Spilled lines are routed on the
+# patient reference read from the raw bytes and written behind that key, so
+# each one is decoded once, when its partition is joined.
+
+NDJSON_SUFFIXES = (".ndjson", ".ndjson.gz")
+NDJSON_PARTITION_BYTES = 32 * 1024 * 1024  # Raw NDJSON bytes joined in memory at once
+NDJSON_MAX_PARTITIONS = 256
+
+PATIENT_RESOURCE_TYPE = "Patient"
+MEDICATION_RESOURCE_TYPE = "Medication"
+PATIENT_REFERENCE_FIELDS = ("subject", "patient", "beneficiary")
+
+_FILE_TYPE_RE = re.compile(r"^([A-Z][A-Za-z]+)")
+_LINE_TYPE_RE = re.compile(rb'"resourceType"\s*:\s*"([A-Za-z]+)"')
+_LINE_ID_RE = re.compile(rb'"id"\s*:\s*"([^"\\]*)"')
+_LINE_REFERENCE_RE = re.compile(
+    rb'"(?:' + b"|".join(f.encode("ascii") for f in PATIENT_REFERENCE_FIELDS) + rb')"\s*:\s*\{[^{}]*?"reference"\s*:\s*"([^"\\]*)"'
+)
+_SPILL_KEY_SEPARATOR = b"\t"
+
+
+def is_ndjson_name(name):
+    """True if the name looks like a Bulk Data NDJSON file."""
+    return name.endswith(NDJSON_SUFFIXES)
+
+
+def ndjson_file_resource_type(filename):
+    """Returns the resource type a bulk export file is named after (Patient.000.ndjson -> Patient), if any."""
+    match = _FILE_TYPE_RE.match(filename)
+    return match.group(1) if match else None
+
+
+def _reference_patient_id(reference):
+    if reference.startswith("urn:uuid:"):
+        return reference[len("urn:uuid:"):]
+    if reference.startswith(PATIENT_RESOURCE_TYPE + "/"):
+        return reference.rsplit("/", 1)[1]
+    return None
+
+
+def patient_reference_id(resource):
+    """Returns the id of the Patient a resource belongs to, from Type/id or urn:uuid: references."""
+    if resource.get("resourceType") == PATIENT_RESOURCE_TYPE:
+        return resource.get("id")
+    for field in PATIENT_REFERENCE_FIELDS:
+        reference = (resource.get(field) or {}).get("reference")
+        if not reference:
+            continue
+        patient_id = _reference_patient_id(reference)
+        if patient_id is not None:
+            return patient_id
+    return None
+
+
+def line_patient_reference_id(line, resource_type):
+    """
+    Returns patient_reference_id for a raw NDJSON line without decoding it, or
+    None when the bytes alone are not conclusive (contained resources, several
+    candidate ids or references, escaped strings) and the line must be decoded.
+    """
+    if b'"contained"' in line:
+        return None
+    if resource_type == PATIENT_RESOURCE_TYPE:
+        matches = _LINE_ID_RE.findall(line)
+    else:
+        matches = _LINE_REFERENCE_RE.findall(line)
+    if len(matches) != 1:
+        return None
+    value = matches[0].decode("utf-8")
+    return value if resource_type == PATIENT_RESOURCE_TYPE else _reference_patient_id(value)
+
+
+def ndjson_filenames(export_directory):
+    """Returns the sorted names of the NDJSON files in a bulk export directory."""
+    return sorted(name for name in os.listdir(export_directory) if is_ndjson_name(name))
+
+
+def _iter_typed_lines(export_directory, filenames, keep_types):
+    for filename in filenames:
+        file_type = ndjson_file_resource_type(filename)
+        if file_type is not None and file_type not in keep_types:
+            continue
+        filepath = os.path.join(export_directory, filename)
+        try:
+            with open(filepath, "rb") as raw_file, decompressed_stream(filename, raw_file) as fp:
+                for line_number, line in enumerate(fp, 1):
+                    match = _LINE_TYPE_RE.search(line)
+                    if match is None:
+                        if line.strip():
+                            logging.warning(f"No resourceType on line {line_number} of {filepath}")
+                        continue
+                    resource_type = match.group(1).decode("ascii")
+                    if resource_type in keep_types:
+                        yield resource_type, line
+        except OSError as e:
+            logging.error(f"IOError reading NDJSON file {filepath}: {e}")
+
+
+def iter_ndjson_lines(export_directory, keep_types, filenames=None):
+    """
+    Yields the raw bytes of every line whose resourceType is in keep_types.
+    Files named after a resource type outside keep_types are not opened.
+    filenames, from ndjson_filenames, saves listing the directory again.
+    """
+    if filenames is None:
+        filenames = ndjson_filenames(export_directory)
+    for _, line in _iter_typed_lines(export_directory, filenames, keep_types):
+        yield line
+
+
+class _PatientGroups:
+    """Groups decoded resources by patient id, preserving file order within each patient."""
+
+    def __init__(self):
+        self.patients = {}
+        self.resources = {}
+
+    def add(self, resource, patient_id):
+        if resource.get("resourceType") == PATIENT_RESOURCE_TYPE:
+            self.patients[patient_id] = resource
+        else:
+            self.resources.setdefault(patient_id, []).append(resource)
+
+    def bundles(self, medications):
+        orphaned = set(self.resources) - set(self.patients)
+        if orphaned:
+            logging.warning(f"Resources reference {len(orphaned)} patient(s) missing from the export")
+        for patient_id, patient in self.patients.items():
+            resources = self.resources.get(patient_id, [])
+            entries = [{"fullUrl": f"{PATIENT_RESOURCE_TYPE}/{patient_id}", "resource": patient}]
+            entries.extend(
+                {"fullUrl": f"{r.get('resourceType')}/{r.get('id')}", "resource": r} for r in resources
+            )
+            # Medication is a shared catalog; attach only what this patient's requests point at
+            attached = {}
+            for r in resources:
+                medication = medications.resolve((r.get("medicationReference") or {}).get("reference"))
+                if medication is not None:
+                    attached.setdefault(f"{MEDICATION_RESOURCE_TYPE}/{medication.get('id')}", medication)
+            entries.extend({"fullUrl": url, "resource": medication} for url, medication in attached.items())
+            yield {"resourceType": "Bundle", "id": f"ndjson-{patient_id}", "type": "collection", "entry": entries}
+
+
+def iter_ndjson_patient_bundles(export_directory, keep_types, partition_bytes=NDJSON_PARTITION_BYTES, loads=json.loads, filenames=None):
+    """
+    Joins a Bulk Data NDJSON export by patient and yields one bundle dict per
+    Patient, shaped like a Synthea patient bundle so parse_fhir_bundle can read it.
+    Lines are decoded from bytes with loads (see json_decoders). filenames, from
+    ndjson_filenames, saves listing the directory again.
+    """
+    keep_types = frozenset(keep_types) | {PATIENT_RESOURCE_TYPE}
+    if filenames is None:
+        filenames = ndjson_filenames(export_directory)
+    kept_bytes = sum(
+        os.path.getsize(os.path.join(export_directory, filename))
+        for filename in filenames if ndjson_file_resource_type(filename) in keep_types | {None}
+    )
+    partitions = min(NDJSON_MAX_PARTITIONS, max(1, -(-kept_bytes // partition_bytes)))
+
+    medications = ReferenceTable()
+
+    def route(resource):
+        if resource.get("resourceType") == MEDICATION_RESOURCE_TYPE:
+            medications.add(resource)
+            return None
+        patient_id = patient_reference_id(resource)
+        if patient_id is None:
+            logging.warning(f"No patient reference on {resource.get('resourceType')} {resource.get('id', 'N/A')}")
+        return patient_id
+
+    if partitions == 1:
+        groups = _PatientGroups()
+        for _, line in _iter_typed_lines(export_directory, filenames, keep_types):
+            resource = loads(line)
+            patient_id = route(resource)
+            if patient_id is not None:
+                groups.add(resource, patient_id)
+        yield from groups.bundles(medications)
+        return
+
+    logging.info(f"Partitioning {kept_bytes} bytes of NDJSON into {partitions} spill files")
+    with tempfile.TemporaryDirectory(prefix="ndjson-join-") as spill_directory:
+        spill_paths = [os.path.join(spill_directory, f"part-{n}.ndjson") for n in range(partitions)]
+        spill_files = [open(path, "wb") for path in spill_paths]
+        try:
+            for resource_type, line in _iter_typed_lines(export_directory, filenames, keep_types):
+                patient_id = None
+                if resource_type != MEDICATION_RESOURCE_TYPE:
+                    patient_id = line_patient_reference_id(line, resource_type)
+                if patient_id is None:
+                    # Medications and lines the bytes do not settle are decoded here
+                    patient_id = route(loads(line))
+                    if patient_id is None:
+                        continue
+                key = patient_id.encode("utf-8")
+                spill = spill_files[zlib.crc32(key) % partitions]
+                spill.write(key + _SPILL_KEY_SEPARATOR + (line if line.endswith(b"\n") else line + b"\n"))
+        finally:
+            for spill in spill_files:
+                spill.close()
+
+        for path in spill_paths:
+            groups = _PatientGroups()
+            with open(path, "rb") as spill:
+                for record in spill:
+                    key, _, line = record.partition(_SPILL_KEY_SEPARATOR)
+                    groups.add(loads(line), key.decode("utf-8"))
+            yield from groups.bundles(medications)
@@ -1,7 +1,18 @@
 import json
+import mmap
 import os
 import logging # Import logging
 from datetime import datetime
+from oneview_app.fhir_stream import read_bundle_stream, read_bundle_filtered
+from oneview_app.bundle_sources import is_archive_name, iter_bundle_files, map_bundle_file, scan_bundle_sources
+from oneview_app.derived_fields import apply_derived_fields
+from oneview_app.encounter_index import encounter_timestamp
+from oneview_app.fhir_ndjson import iter_ndjson_lines, iter_ndjson_patient_bundles, ndjson_filenames
+from oneview_app.fhir_paths import compile_path, compile_record, top_level_members
+from oneview_app.ingest_report import IngestReport
+from oneview_app.observation_series import ObservationSeries
+from oneview_app.json_decoders import AUTO_DECODER, get_decoder
+from oneview_app.fhir_references import BundleResolver, ReferenceTable, SHARED_RESOURCE_TYPES, is_shared_bundle_name
 
 # Configure basic logging for the parser module (or use root logger if configured elsewhere)
 # This is a simple configuration. In a larger app, you might configure logging at the app level.
@@ -15,9 +26,66 @@ ENCOUNTER_RESOURCE_TYPE = "Encounter"
 CONDITION_RESOURCE_TYPE = "Condition"
 MEDICATION_REQUEST_RESOURCE_TYPE = "MedicationRequest" # New constant
 MEDICATION_RESOURCE_TYPE = "Medication" # New constant
+OBSERVATION_RESOURCE_TYPE = "Observation"
 PCP_CODE = "PCP"  # Primary Care Provider code
 PRIMARY_CARE_PHYSICIAN_CODE = "primaryCarePhysician"
 
+# Compiled field extractors used by the parse_* functions (see fhir_paths for the syntax)
+PATIENT_NAME_GIVEN = compile_path("name[0].given")
+PATIENT_NAME_FAMILY = compile_path("name[0].family")
+HOME_ADDRESS = compile_path("address[use=home] | address[0]")
+MARITAL_STATUS_NAME = compile_path("maritalStatus.text | maritalStatus.coding[0].display")
+PREFERRED_COMMUNICATION = compile_path("communication[preferred=true] | communication[0]")
+LANGUAGE_NAME = compile_path("language.text | language.coding[0].display")
+COVERAGE_TYPE_CODE = compile_path("type.coding[0].code")
+PAYOR_NAME = compile_path("payor[0].display | payor[0].identifier.value")
+CONTACT_PHONE = compile_path("telecom[system=phone][use=home,mobile].value")
+DIAGNOSIS_USE_CODE = compile_path("use.coding[0].code")
+MEDICATION_CODE_NAME = compile_path("code.text | code.coding[0].display")
+SUPPLY_DURATION = compile_path("dispenseRequest.expectedSupplyDuration")
+ENCOUNTER_FIELDS = compile_record({
+    "date": "period.start | period.end",
+    "end": "period.end",
+    "encounter_class": "class.code | class[0].coding[0].code", # R4 Coding, R5 list of CodeableConcept
+    "type": "type[0].text | type[0].coding[0].display", # Assuming first type is primary
+})
+CONDITION_FIELDS = compile_record({
+    "snomed_coding": "code.coding[system^=http://snomed.info/sct]",
+    "first_coding": "code.coding[0]",
+    "text": "code.text",
+    "status": "clinicalStatus.coding[0].code | verificationStatus.coding[0].code",
+    "category": "category[0].coding[0].code | category[0].text", # Assuming first category is primary
+    "onset": "onsetDateTime | onsetPeriod.start",
+    "abatement": "abatementDateTime | abatementPeriod.end",
+})
+MEDICATION_REQUEST_FIELDS = compile_record({
+    "name": "medicationCodeableConcept.text | medicationCodeableConcept.coding[0].display",
+    "authored_on": "authoredOn",
+    "dosage": "dosageInstruction[0].text", # First dosage instruction text
+    "status": "status",
+    "period_start": "dispenseRequest.validityPeriod.start",
+    "period_end": "dispenseRequest.validityPeriod.end",
+})
+
+# One measurement: the Observation itself or one of its components (e.g. systolic/diastolic)
+MEASUREMENT_FIELDS = compile_record({
+    "loinc_coding": "code.coding[system=http://loinc.org]",
+    "first_coding": "code.coding[0]",
+    "text": "code.text",
+    "value": "valueQuantity.value",
+    "unit": "valueQuantity.unit | valueQuantity.code",
+})
+OBSERVATION_EFFECTIVE = compile_path("effectiveDateTime | effectivePeriod.start | issued")
+
+# Days per UCUM (code) or plain-text (unit) time unit in a Duration
+DURATION_UNIT_DAYS = {
+    "h": 1 / 24, "hour": 1 / 24, "hours": 1 / 24,
+    "d": 1, "day": 1, "days": 1,
+    "wk": 7, "week": 7, "weeks": 7,
+    "mo": 30, "month": 30, "months": 30,
+    "a": 365, "year": 365, "years": 365,
+}
+
 # Define the path to the FHIR data directory
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data", "synthea_sample_data_fhir_latest")
 
@@ -29,13 +97,23 @@ def get_resource_entries(bundle_data, resource_type):
         if entry.get("resource", {}).get("resourceType") == resource_type
     ]
 
+def reference_display(reference_data, references=None):
+    """Returns a reference's inline display, falling back to resolving it through references."""
+    if not reference_data:
+        return None
+    if reference_data.get("display"):
+        return reference_data["display"]
+    if references is not None:
+        return references.display_name(reference_data.get("reference"))
+    return None
+
 def parse_patient_name(patient_resource):
     """Parses the patient's full name."""
     if not patient_resource or not patient_resource.get("name"):
         return None
-    name_data = patient_resource["name"][0]  # Assuming the first name entry is primary
-    given_names = " ".join(name_data.get("given", []))
-    family_name = name_data.get("family", "")
+    # Assuming the first name entry is primary
+    given_names = " ".join(PATIENT_NAME_GIVEN(patient_resource) or [])
+    family_name = PATIENT_NAME_FAMILY(patient_resource) or ""
     return f"{given_names} {family_name}".strip()
 
 def parse_patient_dob(patient_resource):
@@ -48,18 +126,10 @@ def parse_patient_gender(patient_resource):
 
 def parse_address(patient_resource):
     """Parses the patient's home address."""
-    if not patient_resource or not patient_resource.get("address"):
+    if not patient_resource:
         return None
-    
-    home_address = None
-    for addr in patient_resource.get("address", []):
-        if addr.get("use") == "home":
-            home_address = addr
-            break
-    
-    if not home_address: # If no 'home' address, take the first one available
-        home_address = patient_resource.get("address", [])[0] if patient_resource.get("address") else None
 
+    home_address = HOME_ADDRESS(patient_resource) # If no 'home' address, take the first one available
     if not home_address:
         return None
 
@@ -74,45 +144,15 @@ def parse_address(patient_resource):
 
 def parse_marital_status(patient_resource):
     """Parses the patient's marital status."""
-    marital_status_data = patient_resource.get("maritalStatus")
-    if not marital_status_data:
-        return None
-    
-    if marital_status_data.get("text"):
-        return marital_status_data["text"]
-    if marital_status_data.get("coding"):
-        coding = marital_status_data["coding"][0] # Assuming first coding is primary
-        if coding.get("display"):
-            return coding["display"]
-        # Could add fallback to code if display is missing, but usually display is preferred for readability
-    return None
+    # Assuming first coding is primary; display is preferred over code for readability
+    return MARITAL_STATUS_NAME(patient_resource) or None
 
 def parse_preferred_language(patient_resource):
     """Parses the patient's preferred language."""
-    communications = patient_resource.get("communication", [])
-    if not communications:
-        return None
-
-    preferred_comm = None
-    for comm in communications:
-        if comm.get("preferred") is True:
-            preferred_comm = comm
-            break
-    
-    if not preferred_comm and communications: # If no 'preferred', take the first one
-        preferred_comm = communications[0]
-
-    if not preferred_comm or not preferred_comm.get("language"):
+    preferred_comm = PREFERRED_COMMUNICATION(patient_resource) # If no 'preferred', take the first one
+    if not preferred_comm:
         return None
-        
-    language_data = preferred_comm["language"]
-    if language_data.get("text"):
-        return language_data["text"]
-    if language_data.get("coding"):
-        coding = language_data["coding"][0] # Assuming first coding is primary
-        if coding.get("display"):
-            return coding["display"]
-    return None
+    return LANGUAGE_NAME(preferred_comm) or None
 
 def parse_insurance_info(coverage_resources):
     """Parses insurance information, prioritizing 'display' over 'identifier'."""
@@ -121,21 +161,14 @@ def parse_insurance_info(coverage_resources):
     # Assumption: Prioritize coverage entries that look like health insurance
     # This is a heuristic and might need refinement.
     for coverage in coverage_resources:
-        if coverage.get("type", {}).get("coding", [{}])[0].get("code") in ["health", "PPO", "HMO"]:
-            payor = coverage.get("payor", [{}])[0] # Assuming the first payor is relevant
-            if payor.get("display"):
-                return payor["display"]
-            if payor.get("identifier", {}).get("value"):
-                return payor["identifier"]["value"]
+        if COVERAGE_TYPE_CODE(coverage) in ["health", "PPO", "HMO"]:
+            payor_name = PAYOR_NAME(coverage) # Assuming the first payor is relevant
+            if payor_name:
+                return payor_name
     # Fallback to the first coverage entry if no clear primary is found
-    payor = coverage_resources[0].get("payor", [{}])[0]
-    if payor.get("display"):
-        return payor["display"]
-    if payor.get("identifier", {}).get("value"):
-        return payor["identifier"]["value"]
-    return None
+    return PAYOR_NAME(coverage_resources[0]) or None
 
-def parse_pcp_name(patient_resource, encounter_resources):
+def parse_pcp_name(patient_resource, encounter_resources, references=None):
     """
     Parses the Primary Care Provider's name.
     Checks Encounters first, then Patient.generalPractitioner.
@@ -146,61 +179,51 @@ def parse_pcp_name(patient_resource, encounter_resources):
             for type_code in participant.get("type", []):
                 for coding in type_code.get("coding", []):
                     if coding.get("code") in [PCP_CODE, PRIMARY_CARE_PHYSICIAN_CODE]:
-                        if participant.get("individual", {}).get("display"):
-                            return participant["individual"]["display"]
+                        pcp_name = reference_display(participant.get("individual"), references)
+                        if pcp_name:
+                            return pcp_name
 
     # Check Patient.generalPractitioner
     general_practitioners = patient_resource.get("generalPractitioner", [])
-    if general_practitioners and general_practitioners[0].get("display"):
-        return general_practitioners[0]["display"]
+    if general_practitioners:
+        return reference_display(general_practitioners[0], references)
     return None
 
 def parse_contact_info(patient_resource):
     """Parses patient's phone contact information."""
-    for telecom in patient_resource.get("telecom", []):
-        if telecom.get("system") == "phone" and telecom.get("use") in ["home", "mobile"]:
-            return telecom.get("value")
-    return None
+    return CONTACT_PHONE(patient_resource)
 
-def parse_recent_encounters(encounter_resources):
+def parse_recent_encounters(encounter_resources, references=None):
     """Parses recent encounters/visits."""
     encounters_data = []
     for encounter in encounter_resources:
-        encounter_info = {
-            "date": encounter.get("period", {}).get("start") or encounter.get("period", {}).get("end"),
-            "type": None,
-            "facility": encounter.get("serviceProvider", {}).get("display"),
-            "provider": None,
-            "primary_diagnosis_text": None,
-        }
-
-        # Encounter Type
-        if encounter.get("type"):
-            encounter_type = encounter["type"][0] # Assuming first type is primary
-            if encounter_type.get("text"):
-                encounter_info["type"] = encounter_type["text"]
-            elif encounter_type.get("coding"):
-                encounter_info["type"] = encounter_type["coding"][0].get("display")
+        encounter_info = ENCOUNTER_FIELDS(encounter)
+        encounter_info["facility"] = reference_display(encounter.get("serviceProvider"), references)
+        encounter_info["provider"] = None
+        encounter_info["primary_diagnosis_text"] = None
 
         # Encounter Provider
         for participant in encounter.get("participant", []):
             # Assuming a practitioner participant is the provider
             if "Practitioner" in participant.get("individual", {}).get("reference", ""):
-                 if participant.get("individual", {}).get("display"):
-                    encounter_info["provider"] = participant["individual"]["display"]
+                provider_name = reference_display(participant["individual"], references)
+                if provider_name:
+                    encounter_info["provider"] = provider_name
                     break # Take the first practitioner found
 
         # Primary Diagnosis Text
         # Assumption: First diagnosis or one marked as 'primary' or 'chief complaint'
         for diagnosis_entry in encounter.get("diagnosis", []):
-            use_coding = diagnosis_entry.get("use", {}).get("coding", [{}])[0].get("code")
+            use_coding = DIAGNOSIS_USE_CODE(diagnosis_entry)
+            # Inline display, or the referenced Condition's code when the bundle holds it
+            diagnosis_text = reference_display(diagnosis_entry.get("condition"), references)
             if use_coding in ["primary", "chief-complaint", "CC", "admission", "AD"]: # Added more potential primary codes
-                if diagnosis_entry.get("condition", {}).get("display"):
-                    encounter_info["primary_diagnosis_text"] = diagnosis_entry["condition"]["display"]
+                if diagnosis_text:
+                    encounter_info["primary_diagnosis_text"] = diagnosis_text
                     break
             # Fallback if no 'use' is specified or matches primary indicators
-            if not encounter_info["primary_diagnosis_text"] and diagnosis_entry.get("condition", {}).get("display"):
-                 encounter_info["primary_diagnosis_text"] = diagnosis_entry["condition"]["display"]
+            if not encounter_info["primary_diagnosis_text"] and diagnosis_text:
+                 encounter_info["primary_diagnosis_text"] = diagnosis_text
 
 
         encounters_data.append(encounter_info)
@@ -210,85 +233,61 @@ def parse_diagnoses(condition_resources):
     """Parses diagnoses (conditions)."""
     diagnoses_data = []
     for condition in condition_resources:
+        fields = CONDITION_FIELDS(condition)
         condition_info = {
             "code": None,
-            "description": None,
-            "status": None,
-            "category": None,
+            "description": fields["text"],
+            "status": fields["status"],
+            "category": fields["category"] or None,
+            "onset": fields["onset"],
+            "abatement": fields["abatement"],
         }
 
         # Code and Description
-        if condition.get("code", {}).get("coding"):
-            # Prefer SNOMED CT codes if available
-            snomed_code = next((c.get("code") for c in condition["code"]["coding"] if c.get("system", "").startswith("http://snomed.info/sct")), None)
-            snomed_display = next((c.get("display") for c in condition["code"]["coding"] if c.get("system", "").startswith("http://snomed.info/sct")), None)
-            if snomed_code:
-                condition_info["code"] = snomed_code
-                condition_info["description"] = snomed_display or condition["code"].get("text")
-            else: # Fallback to the first coding available
-                condition_info["code"] = condition["code"]["coding"][0].get("code")
-                condition_info["description"] = condition["code"]["coding"][0].get("display") or condition["code"].get("text")
-        elif condition.get("code", {}).get("text"):
-             condition_info["description"] = condition["code"]["text"]
-
-
-        # Status
-        if condition.get("clinicalStatus", {}).get("coding"):
-            condition_info["status"] = condition["clinicalStatus"]["coding"][0].get("code")
-        elif condition.get("verificationStatus", {}).get("coding"):
-            condition_info["status"] = condition["verificationStatus"]["coding"][0].get("code")
-
-        # Category
-        if condition.get("category"):
-            category = condition["category"][0] # Assuming first category is primary
-            if category.get("coding"):
-                condition_info["category"] = category["coding"][0].get("code")
-            elif category.get("text"):
-                 condition_info["category"] = category.get("text")
+        # Prefer SNOMED CT codes if available, else fall back to the first coding available
+        coding = fields["snomed_coding"]
+        if not (coding and coding.get("code")):
+            coding = fields["first_coding"]
+        if coding:
+            condition_info["code"] = coding.get("code")
+            condition_info["description"] = coding.get("display") or fields["text"]
 
         diagnoses_data.append(condition_info)
     return diagnoses_data
 
-def parse_medications(bundle_data):
+def duration_days(duration):
+    """Converts a FHIR Duration ({"value": 30, "code": "d"}) to days, or None if it cannot be read."""
+    if not isinstance(duration, dict):
+        return None
+    value = duration.get("value")
+    per_day = DURATION_UNIT_DAYS.get(duration.get("code") or str(duration.get("unit") or "").lower())
+    if not isinstance(value, (int, float)) or per_day is None:
+        return None
+    return value * per_day
+
+def parse_medications(bundle_data, references=None):
     """Parses medication data from MedicationRequest and Medication resources."""
-    medication_resources = {}
-    for entry in bundle_data.get("entry", []):
-        resource = entry.get("resource", {})
-        if resource.get("resourceType") == MEDICATION_RESOURCE_TYPE:
-            # Use fullUrl if available and unique, otherwise resource id (urn:uuid:...)
-            med_id = entry.get("fullUrl") or f"urn:uuid:{resource.get('id')}"
-            if med_id: # Ensure there's an ID to map
-                 medication_resources[med_id] = resource
+    # Medication references (urn:uuid: or Medication/id) resolve through the bundle-wide resolver
+    resolver = BundleResolver.for_bundle(bundle_data, references)
 
     parsed_med_requests = []
-    med_request_entries = get_resource_entries(bundle_data, MEDICATION_REQUEST_RESOURCE_TYPE)
+    med_request_entries = resolver.resources_of_type(MEDICATION_REQUEST_RESOURCE_TYPE)
 
     for med_request in med_request_entries:
-        med_info = {
-            "name": None,
-            "authored_on": med_request.get("authoredOn"),
-            "prescriber": med_request.get("requester", {}).get("display"),
-            "dosage": med_request.get("dosageInstruction", [{}])[0].get("text"), # First dosage instruction text
-            "status": med_request.get("status")
-        }
+        med_info = MEDICATION_REQUEST_FIELDS(med_request) # Name is set here when a medicationCodeableConcept is inline
+        med_info["prescriber"] = reference_display(med_request.get("requester"), resolver)
+        med_info["supply_days"] = duration_days(SUPPLY_DURATION(med_request))
 
         # Medication Name
         med_codeable_concept = med_request.get("medicationCodeableConcept")
         med_reference = med_request.get("medicationReference")
 
-        if med_codeable_concept:
-            med_info["name"] = med_codeable_concept.get("text")
-            if not med_info["name"] and med_codeable_concept.get("coding"):
-                med_info["name"] = med_codeable_concept["coding"][0].get("display")
-        elif med_reference:
+        if not med_codeable_concept and med_reference:
             ref_str = med_reference.get("reference")
-            if ref_str in medication_resources:
-                linked_med_resource = medication_resources[ref_str]
-                if linked_med_resource.get("code", {}).get("text"):
-                    med_info["name"] = linked_med_resource["code"]["text"]
-                elif linked_med_resource.get("code", {}).get("coding"):
-                    med_info["name"] = linked_med_resource["code"]["coding"][0].get("display")
-                else:
+            linked_med_resource = resolver.resolve(ref_str, MEDICATION_RESOURCE_TYPE)
+            if linked_med_resource is not None:
+                med_info["name"] = MEDICATION_CODE_NAME(linked_med_resource)
+                if not med_info["name"]:
                     med_info["name"] = "Unknown (Name not found in referenced Medication)"
                     logging.warning(f"Medication name not found in referenced Medication resource: {ref_str} for MedicationRequest {med_request.get('id', 'N/A')}")
 
@@ -305,9 +304,80 @@ def parse_medications(bundle_data):
     return parsed_med_requests
 
 
-def parse_fhir_bundle(bundle_data):
-    """Parses a single FHIR patient bundle."""
-    patient_resource_list = get_resource_entries(bundle_data, PATIENT_RESOURCE_TYPE)
+def parse_observations(observation_resources):
+    """
+    Parses numeric Observations into {code: ObservationSeries}, one series per
+    LOINC code (or first coding). Components of panels such as blood pressure
+    become series of their own; non-numeric values and undated Observations are skipped.
+    """
+    points = {}   # code -> [(timestamp, value)]
+    labels = {}   # code -> (display, unit) as first seen
+    for observation in observation_resources:
+        timestamp = encounter_timestamp(OBSERVATION_EFFECTIVE(observation))
+        if timestamp is None:
+            continue
+        for measurement in [observation] + observation.get("component", []):
+            fields = MEASUREMENT_FIELDS(measurement)
+            value = fields["value"]
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            coding = fields["loinc_coding"] or fields["first_coding"]
+            if not (coding and coding.get("code")):
+                continue
+            code = coding["code"]
+            points.setdefault(code, []).append((timestamp, value))
+            labels.setdefault(code, (coding.get("display") or fields["text"], fields["unit"]))
+    return {
+        code: ObservationSeries.from_points(code, labels[code][0], labels[code][1], code_points)
+        for code, code_points in points.items()
+    }
+
+# Resource types read whole by each parse_* function used in parse_fhir_bundle.
+# The filtering readers keep exactly these types, so a new parser only needs
+# an entry here for its resources to survive the decode.
+RESOURCE_TYPES_BY_PARSER = {
+    parse_patient_name: (PATIENT_RESOURCE_TYPE,),
+    parse_patient_dob: (PATIENT_RESOURCE_TYPE,),
+    parse_patient_gender: (PATIENT_RESOURCE_TYPE,),
+    parse_insurance_info: (COVERAGE_RESOURCE_TYPE,),
+    parse_pcp_name: (PATIENT_RESOURCE_TYPE, ENCOUNTER_RESOURCE_TYPE),
+    parse_contact_info: (PATIENT_RESOURCE_TYPE,),
+    parse_address: (PATIENT_RESOURCE_TYPE,),
+    parse_marital_status: (PATIENT_RESOURCE_TYPE,),
+    parse_preferred_language: (PATIENT_RESOURCE_TYPE,),
+    parse_recent_encounters: (ENCOUNTER_RESOURCE_TYPE,),
+    parse_diagnoses: (CONDITION_RESOURCE_TYPE,),
+    parse_medications: (MEDICATION_REQUEST_RESOURCE_TYPE, MEDICATION_RESOURCE_TYPE),
+}
+
+# Resource types that parsers read only a few members of, with those members.
+# Observations make up most of a Synthea bundle, so the filtering readers
+# decode just these members of them rather than widening the kept types.
+MEMBERS_BY_RESOURCE_TYPE = {
+    OBSERVATION_RESOURCE_TYPE: top_level_members(OBSERVATION_EFFECTIVE.expression, *MEASUREMENT_FIELDS.fields.values())
+        | {"resourceType", "component"},  # parse_observations
+}
+
+def resource_types_for(parsers=None):
+    """Returns the resource types needed by the given parse_* functions (default: all of them)."""
+    if parsers is None:
+        parsers = RESOURCE_TYPES_BY_PARSER.keys()
+    return frozenset(
+        resource_type
+        for parser in parsers
+        for resource_type in RESOURCE_TYPES_BY_PARSER[parser]
+    )
+
+PARSED_RESOURCE_TYPES = resource_types_for()
+
+def parse_fhir_bundle(bundle_data, references=None):
+    """
+    Parses a single FHIR patient bundle. references is an optional ReferenceTable
+    used to name providers and facilities whose references carry no display.
+    """
+    # One index over the bundle serves every parser below
+    resolver = BundleResolver(bundle_data, shared=references)
+    patient_resource_list = resolver.resources_of_type(PATIENT_RESOURCE_TYPE)
     if not patient_resource_list:
         # Attempt to get a bundle ID for logging, if available
         bundle_id = bundle_data.get("id", "Unknown Bundle ID")
@@ -315,9 +385,9 @@ def parse_fhir_bundle(bundle_data):
         return None 
     patient_resource = patient_resource_list[0] # Assuming one patient per bundle
 
-    coverage_resources = get_resource_entries(bundle_data, COVERAGE_RESOURCE_TYPE)
-    encounter_resources = get_resource_entries(bundle_data, ENCOUNTER_RESOURCE_TYPE)
-    condition_resources = get_resource_entries(bundle_data, CONDITION_RESOURCE_TYPE)
+    coverage_resources = resolver.resources_of_type(COVERAGE_RESOURCE_TYPE)
+    encounter_resources = resolver.resources_of_type(ENCOUNTER_RESOURCE_TYPE)
+    condition_resources = resolver.resources_of_type(CONDITION_RESOURCE_TYPE)
     # Medication data is parsed from the whole bundle
     
     parsed_patient = {
@@ -326,27 +396,141 @@ def parse_fhir_bundle(bundle_data):
         "dob": parse_patient_dob(patient_resource),
         "gender": parse_patient_gender(patient_resource),
         "insurance": parse_insurance_info(coverage_resources),
-        "pcp_name": parse_pcp_name(patient_resource, encounter_resources),
+        "pcp_name": parse_pcp_name(patient_resource, encounter_resources, resolver),
         "contact_phone": parse_contact_info(patient_resource),
         "address_full": parse_address(patient_resource),
         "marital_status": parse_marital_status(patient_resource),
         "preferred_language": parse_preferred_language(patient_resource),
-        "recent_encounters": parse_recent_encounters(encounter_resources),
+        "recent_encounters": parse_recent_encounters(encounter_resources, resolver),
         "diagnoses": parse_diagnoses(condition_resources),
-        "medications": parse_medications(bundle_data), # Add parsed medications
+        "medications": parse_medications(bundle_data, resolver), # Add parsed medications
+        "observations": parse_observations(resolver.resources_of_type(OBSERVATION_RESOURCE_TYPE)),
     }
-    return parsed_patient
+    # Derived-field stage: last wellness visit, last encounter, active counts
+    return apply_derived_fields(parsed_patient)
+
+def read_bundle_json(fp, loads=json.loads, report=None):
+    """Reads a whole FHIR bundle from a binary file object, handing its bytes straight to loads."""
+    data = fp.read()
+    if report is not None:
+        report.add_copied(len(data))
+    return loads(data)
+
+def read_bundle_streaming(fp, loads=json.loads, report=None):
+    """Reads a FHIR bundle entry by entry, decoding only the resource types the parsers use."""
+    stats = {}
+    bundle_data = read_bundle_stream(fp, keep_types=PARSED_RESOURCE_TYPES, loads=loads, stats=stats, member_types=MEMBERS_BY_RESOURCE_TYPE)
+    if report is not None:
+        report.add_copied(stats["bytes_read"] + stats["bytes_decoded"])
+    return bundle_data
+
+def read_bundle_type_filtered(fp, loads=json.loads, report=None):
+    """Reads a FHIR bundle into memory and decodes only the entries the parsers use."""
+    data = fp.read()
+    stats = {}
+    bundle_data = read_bundle_filtered(data, keep_types=PARSED_RESOURCE_TYPES, loads=loads, stats=stats, member_types=MEMBERS_BY_RESOURCE_TYPE)
+    if report is not None:
+        report.add_copied(len(data) + stats["bytes_decoded"])
+    return bundle_data
+
+def read_bundle_mapped(fp, loads=json.loads, report=None):
+    """
+    Memory-maps a bundle file and decodes only the entries the parsers use
+    straight from the mapping, so the file itself is never copied. Compressed
+    files and archive members cannot be mapped and are read into memory instead.
+    """
+    data = map_bundle_file(fp)
+    stats = {}
+    try:
+        bundle_data = read_bundle_filtered(data, keep_types=PARSED_RESOURCE_TYPES, loads=loads, stats=stats, member_types=MEMBERS_BY_RESOURCE_TYPE)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    if report is not None:
+        copied = 0 if isinstance(data, mmap.mmap) else len(data)
+        report.add_copied(copied + stats["bytes_decoded"])
+    return bundle_data
+
+# Bundle readers selectable through load_all_patients_data(reader=...).
+# Each takes a binary file object, a loads(bytes) decoder from json_decoders
+# and an optional IngestReport to count the bytes it copies.
+BUNDLE_READERS = {
+    "json": read_bundle_json,
+    "stream": read_bundle_streaming,
+    "filtered": read_bundle_type_filtered,
+    "mmap": read_bundle_mapped,
+}
+
+def load_ndjson_patients_data(export_directory, loads=json.loads):
+    """
+    Loads patients from a FHIR Bulk Data export (one NDJSON file per resource type).
+    Resources are joined by their Patient reference and parsed like a patient bundle.
+    """
+    all_patients = []
+    try:
+        filenames = ndjson_filenames(export_directory)
+        references = ReferenceTable()
+        for line in iter_ndjson_lines(export_directory, SHARED_RESOURCE_TYPES, filenames):
+            references.add(loads(line))
+        keep_types = PARSED_RESOURCE_TYPES | MEMBERS_BY_RESOURCE_TYPE.keys()
+        for bundle_data in iter_ndjson_patient_bundles(export_directory, keep_types, loads=loads, filenames=filenames):
+            parsed_patient = parse_fhir_bundle(bundle_data, references)
+            if parsed_patient:
+                all_patients.append(parsed_patient)
+    except json.JSONDecodeError as e:
+        logging.error(f"Error decoding NDJSON in {export_directory}: {e}")
+    return all_patients
+
+def read_shared_bundle(fp, loads=json.loads):
+    """Reads only the Organization/Practitioner resources from a shared Synthea bundle."""
+    return read_bundle_stream(fp, keep_types=SHARED_RESOURCE_TYPES, loads=loads)
 
-def load_all_patients_data(data_directory=DATA_DIR):
-    """Loads and parses all patient FHIR JSON files from the specified directory."""
+def load_shared_references(data_directory, filenames, references=None, loads=json.loads):
+    """
+    Loads hospitalInformation/practitionerInformation bundles into a ReferenceTable,
+    including those inside archives. Synthea's patient files sort before the
+    lowercase shared ones, so archives get a pass of their own that reads only
+    the shared members; every patient then resolves against them.
+    """
+    references = references if references is not None else ReferenceTable()
+    sources = [n for n in filenames if is_shared_bundle_name(n) or is_archive_name(n)]
+    for filename, f in iter_bundle_files(data_directory, sources, member_filter=is_shared_bundle_name):
+        try:
+            added = references.add_bundle(read_shared_bundle(f, loads))
+            logging.info(f"Loaded {added} shared resources from {filename}")
+        except (IOError, json.JSONDecodeError) as e:
+            logging.error(f"Error reading shared bundle {filename}: {e}")
+    return references
+
+def load_all_patients_data(data_directory=DATA_DIR, reader="json", export_format="bundle", decoder=AUTO_DECODER, report=None):
+    """
+    Loads and parses all patient FHIR JSON files from the specified directory,
+    including gzipped .json.gz bundles and .tar/.tar.gz archives of bundles.
+    reader selects how each file is decoded (see BUNDLE_READERS); "stream" holds
+    only the decoded resources the parsers need, plus the entry being scanned,
+    rather than the whole file; "filtered" reads the whole file but only
+    decodes those resources, and "mmap" does the
+    same straight from a memory-mapped file without reading it into memory.
+    export_format="ndjson" reads a FHIR Bulk Data export instead of bundles.
+    decoder names the JSON backend (see json_decoders); "auto" uses the fastest
+    one installed, which is the stdlib json module when nothing else is.
+    report, an optional IngestReport, receives file/byte/peak RSS counters for
+    bundle ingest; a summary is logged either way.
+    """
+    read_bundle = BUNDLE_READERS[reader]
+    loads = get_decoder(decoder)
     all_patients = []
     if not os.path.exists(data_directory):
         logging.error(f"Data directory not found: {data_directory}")
         print(f"FIRST_JSON_FILE_ERROR: Directory not found: {data_directory}") # For capture
         return all_patients
 
-    files_in_directory = os.listdir(data_directory)
-    json_files = [f for f in files_in_directory if f.endswith(".json")]
+    if export_format == "ndjson":
+        return load_ndjson_patients_data(data_directory, loads)
+
+    # One scandir pass gives both the names and the sizes for the ingest report
+    bundle_sources = scan_bundle_sources(data_directory)
+    json_files = [name for name, _ in bundle_sources]
 
     if not json_files:
         logging.warning(f"No JSON files found in {data_directory}")
@@ -360,27 +544,37 @@ def load_all_patients_data(data_directory=DATA_DIR):
     # For the purpose of this tool, we'll let it continue so the function can be "used"
     # but in a real scenario, I'd add sys.exit() here.
 
-    for filename in files_in_directory: # Iterate normally after identifying the first
-        if filename.endswith(".json"):
-            filepath = os.path.join(data_directory, filename)
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    bundle_data = json.load(f)
-                
-                # Pass filename to parse_fhir_bundle for better logging context if needed,
-                # but for now, parse_fhir_bundle logs based on bundle_id.
-                parsed_patient = parse_fhir_bundle(bundle_data) 
-                if parsed_patient:
-                    all_patients.append(parsed_patient)
-
-            except FileNotFoundError:
-                logging.error(f"File not found: {filepath}")
-            except IOError as e:
-                logging.error(f"IOError reading file {filepath}: {e}")
-            except json.JSONDecodeError as e:
-                logging.error(f"Error decoding JSON from file {filepath}: {e}")
-            except Exception as e:
-                logging.error(f"Unexpected error processing file {filepath}: {e}", exc_info=True) # exc_info for traceback
+    report = report if report is not None else IngestReport()
+    report.files = len(bundle_sources)
+    report.bytes_on_disk = sum(size for _, size in bundle_sources)
+
+    # Shared hospital/practitioner bundles, in archives too, are read first so patient bundles can resolve against them
+    references = load_shared_references(data_directory, json_files, loads=loads)
+    patient_files = [f for f in json_files if not is_shared_bundle_name(f)]
+
+    # .json.gz bundles and .tar/.tar.gz archives are decompressed as they are read
+    for filename, f in iter_bundle_files(data_directory, patient_files, member_filter=lambda name: not is_shared_bundle_name(name)):
+        filepath = os.path.join(data_directory, filename)
+        try:
+            bundle_data = read_bundle(f, loads, report)
+            
+            # Pass filename to parse_fhir_bundle for better logging context if needed,
+            # but for now, parse_fhir_bundle logs based on bundle_id.
+            parsed_patient = parse_fhir_bundle(bundle_data, references) 
+            if parsed_patient:
+                all_patients.append(parsed_patient)
+
+        except FileNotFoundError:
+            logging.error(f"File not found: {filepath}")
+        except IOError as e:
+            logging.error(f"IOError reading file {filepath}: {e}")
+        except json.JSONDecodeError as e:
+            logging.error(f"Error decoding JSON from file {filepath}: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error processing file {filepath}: {e}", exc_info=True) # exc_info for traceback
+
+    report.finish(len(all_patients))
+    logging.info(report.summary())
     return all_patients
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+import re
+from itertools import count
+
+# Compiled field extractors for FHIR resources.
+#
+# A small FHIRPath-like language for the fields the parsers read:
+#
+#     type[0].coding[0].display              member access and list indexing
+#     telecom[system=phone][use=home,mobile]  first list item matching every filter
+#     code.coding[system^=http://snomed.info/sct]   ^= is a prefix match
+#     communication[preferred=true]           true/false compare against JSON booleans
+#     period.start | period.end               alternatives: first non-empty value wins
+#
+# compile_path() turns an expression into a plain Python function once, so a
+# lookup is a straight run of dict.get() calls with no throwaway {} / [{}]
+# defaults. Missing or malformed data yields None instead of raising.
+# compile_record() inlines several paths into one function returning a dict,
+# so a parser pays one call per resource rather than one per field, and a
+# prefix shared by several fields is looked up once.
+
+_STEP_RE = re.compile(r"\s*(?:\.?([A-Za-z_][A-Za-z0-9_]*)|\[(\d+)\]|\[([A-Za-z_][A-Za-z0-9_]*)(\^?=)([^\]]*)\])")
+
+_compiled_paths = {}
+
+
+class FhirPathError(ValueError):
+    """Raised for expressions compile_path cannot parse."""
+
+
+def _parse_literal(text):
+    if text == "true":
+        return True
+    if text == "false":
+        return False
+    return text
+
+
+def _parse_steps(expression):
+    """Splits one alternative into ("key", name), ("index", n) and ("filter", [conditions]) steps."""
+    steps = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _STEP_RE.match(expression, pos)
+        if match is None or match.end() == pos:
+            raise FhirPathError(f"Cannot parse FHIR path {expression!r} at offset {pos}")
+        key, index, filter_key, operator, filter_value = match.groups()
+        if key is not None:
+            steps.append(("key", key))
+        elif index is not None:
+            steps.append(("index", int(index)))
+        else:
+            condition = (filter_key, operator, [_parse_literal(v.strip()) for v in filter_value.split(",")])
+            if steps and steps[-1][0] == "filter":
+                steps[-1][1].append(condition)  # Consecutive filters must all match the same item
+            else:
+                steps.append(("filter", [condition]))
+        pos = match.end()
+    if not steps:
+        raise FhirPathError("Empty FHIR path")
+    return steps
+
+
+def _condition_source(condition):
+    key, operator, values = condition
+    if operator == "^=":
+        return " or ".join(f"str(item.get({key!r}) or '').startswith({v!r})" for v in values)
+    if len(values) == 1:
+        return f"item.get({key!r}) == {values[0]!r}"
+    return f"item.get({key!r}) in {tuple(values)!r}"
+
+
+def _step_source(step, source):
+    """Emits an expression applying one step to source, which is known to be a dict (key steps) or list."""
+    kind, argument = step
+    if kind == "key":
+        return f"{source}.get({argument!r})"
+    if kind == "index":
+        if argument == 0:
+            return f"{source}[0] if {source} else None"
+        return f"{source}[{argument}] if len({source}) > {argument} else None"
+    predicate = " and ".join(f"({_condition_source(c)})" for c in argument)
+    return f"next((item for item in {source} if item.__class__ is dict and {predicate}), None)"
+
+
+def _step_key(step):
+    kind, argument = step
+    if kind == "filter":
+        return kind, tuple((key, operator, tuple(values)) for key, operator, values in argument)
+    return step
+
+
+def _record_lines(expressions):
+    """
+    Emits statements that evaluate every path expression and returns them with
+    one variable name per path holding its value (None if absent).
+
+    The first alternatives of all paths are merged into one tree of steps, so a
+    prefix shared by several paths (period, type[0], code.coding, ...) is
+    looked up once. Later alternatives only run when the value so far is
+    empty, starting from the deepest value the tree already holds. Each step
+    only runs when the value before it is the dict or list it indexes, which
+    is checked up front instead of catching exceptions.
+    """
+    root = {}  # step key -> [step, children, variable]
+    names = (f"v{n}" for n in count())
+    parsed = [[_parse_steps(part) for part in expression.split("|")] for expression in expressions]
+    primary = []
+    for alternatives in parsed:
+        children = root
+        for step in alternatives[0]:
+            node = children.get(_step_key(step))
+            if node is None:
+                node = children[_step_key(step)] = [step, {}, next(names)]
+            children = node[1]
+        primary.append(node[2])
+
+    lines = []
+    variables = []
+
+    def emit_tree(children, source, indent):
+        # Key steps need a dict and index/filter steps a list: one type check
+        # per value covers all the steps taken from it
+        for container, kinds in (("dict", ("key",)), ("list", ("index", "filter"))):
+            steps = [child for child in children.values() if child[0][0] in kinds]
+            if not steps:
+                continue
+            lines.append(f"{indent}if {source}.__class__ is {container}:")
+            for step, grandchildren, variable in steps:
+                lines.append(f"{indent}    {variable} = {_step_source(step, source)}")
+                variables.append(variable)
+                if grandchildren:
+                    emit_tree(grandchildren, variable, indent + "    ")
+
+    emit_tree(root, "resource", "")
+    if variables:
+        # Steps whose container check failed leave their values at None
+        lines.insert(0, " = ".join(variables) + " = None")
+
+    values = []
+    for alternatives, value in zip(parsed, primary):
+        if len(alternatives) == 1:
+            values.append(value)
+            continue
+        result = None
+        for steps in alternatives[1:]:
+            # Reuse the longest prefix the tree has already looked up
+            source, children, depth = "resource", root, 0
+            while depth < len(steps) and _step_key(steps[depth]) in children:
+                _, children, source = children[_step_key(steps[depth])]
+                depth += 1
+            if depth == len(steps) and result is None:
+                value = f"{value} or {source}"  # Already in the tree: nothing to run
+                continue
+            if result is None:
+                result = next(names)
+                lines.append(f"{result} = {value}")
+            lines.append(f"if not {result}:")
+            if depth == len(steps):
+                lines.append(f"    {result} = {source}")
+                continue
+            lines.append(f"    {result} = None")
+            indent = "    "
+            for n, step in enumerate(steps[depth:], depth + 1):
+                container = "dict" if step[0] == "key" else "list"
+                target = result if n == len(steps) else next(names)
+                lines.append(f"{indent}if {source}.__class__ is {container}:")
+                lines.append(f"{indent}    {target} = {_step_source(step, source)}")
+                source, indent = target, indent + "    "
+        values.append(result or value)
+    return lines, values
+
+
+def _build_function(name, lines, label):
+    namespace = {}
+    source = "\n".join([f"def {name}(resource):"] + [f"    {line}" for line in lines])
+    exec(compile(source, f"<fhir_path {label}>", "exec"), namespace)
+    return namespace[name]
+
+
+def compile_path(expression):
+    """
+    Compiles a path expression into a function taking a resource (dict) and
+    returning the addressed value or None. Compiled functions are cached.
+    """
+    accessor = _compiled_paths.get(expression)
+    if accessor is not None:
+        return accessor
+    lines, (value,) = _record_lines([expression])
+    accessor = _build_function("accessor", lines + [f"return {value}"], expression)
+    accessor.__doc__ = f"Extracts {expression!r} from a FHIR resource."
+    accessor.expression = expression
+    _compiled_paths[expression] = accessor
+    return accessor
+
+
+def top_level_members(*expressions):
+    """Returns the names of the resource members the given path expressions start from."""
+    members = set()
+    for expression in expressions:
+        for part in expression.split("|"):
+            kind, argument = _parse_steps(part)[0]
+            if kind == "key":
+                members.add(argument)
+    return frozenset(members)
+
+
+def compile_record(fields):
+    """
+    Compiles a {field name: path expression} mapping into one function that
+    returns a new dict of every field for a resource. All paths run inline in a
+    single call and share their common prefixes, which is what makes
+    per-resource extraction cheap.
+    """
+    lines, values = _record_lines(fields.values())
+    items = ", ".join(f"{name!r}: {value}" for name, value in zip(fields, values))
+    lines.append(f"return {{{items}}}")
+    extractor = _build_function("extractor", lines, ", ".join(fields))
+    extractor.__doc__ = f"Extracts {', '.join(fields)} from a FHIR resource."
+    extractor.fields = dict(fields)
+    return extractor
@@ -0,0 +1,155 @@
+import logging
+import re
+
+# Shared reference table for Organization and Practitioner resources.
+#
+# Synthea writes hospitalInformation*.json and practitionerInformation*.json
+# next to the patient bundles. They hold no Patient, only the Organizations,
+# Locations and Practitioners that patient bundles point at through
+# serviceProvider, participant.individual and requester references. They are
+# loaded once into a ReferenceTable so those references can be resolved even
+# when a reference carries no inline display string.
+
+ORGANIZATION_RESOURCE_TYPE = "Organization"
+PRACTITIONER_RESOURCE_TYPE = "Practitioner"
+SHARED_RESOURCE_TYPES = frozenset([
+    ORGANIZATION_RESOURCE_TYPE,
+    PRACTITIONER_RESOURCE_TYPE,
+    "PractitionerRole",
+    "Location",
+])
+
+_SHARED_BUNDLE_NAME_RE = re.compile(r"(?:^|[/:])(?:hospitalInformation|practitionerInformation)[^/:]*\.json(?:\.gz)?$")
+
+
+def is_shared_bundle_name(name):
+    """True for Synthea's hospitalInformation*/practitionerInformation* bundles (also inside archives)."""
+    return _SHARED_BUNDLE_NAME_RE.search(name) is not None
+
+
+def format_practitioner_name(practitioner):
+    """Formats a Practitioner's first name entry the way Synthea displays it ("Dr. Given Family")."""
+    names = practitioner.get("name") or []
+    if not names:
+        return None
+    name = names[0]
+    if name.get("text"):
+        return name["text"]
+    parts = list(name.get("prefix", [])) + list(name.get("given", [])) + [name.get("family", "")]
+    return " ".join(p for p in parts if p) or None
+
+
+def resource_display_name(resource):
+    """Returns a human readable name for a referenced resource (Organization, Practitioner, Condition, ...)."""
+    if resource.get("resourceType") == PRACTITIONER_RESOURCE_TYPE:
+        return format_practitioner_name(resource)
+    if resource.get("name"):
+        return resource["name"]
+    code = resource.get("code") or {}
+    if code.get("text"):
+        return code["text"]
+    if code.get("coding"):
+        return code["coding"][0].get("display")
+    return None
+
+
+class ReferenceTable:
+    """
+    Resolves references to shared resources. Accepts the three forms found in
+    FHIR data: Type/id, urn:uuid:id (bundle fullUrl) and Synthea's conditional
+    Type?identifier=system|value references.
+    """
+
+    def __init__(self):
+        self._resources = {}
+
+    def __len__(self):
+        return len(self._resources)
+
+    def add(self, resource, full_url=None):
+        resource_type = resource.get("resourceType")
+        resource_id = resource.get("id")
+        if resource_id:
+            self._resources[f"{resource_type}/{resource_id}"] = resource
+            self._resources[f"urn:uuid:{resource_id}"] = resource
+        if full_url:
+            self._resources[full_url] = resource
+        for identifier in resource.get("identifier", []):
+            value = identifier.get("value")
+            if not value:
+                continue
+            self._resources[f"{resource_type}?identifier={value}"] = resource
+            if identifier.get("system"):
+                self._resources[f"{resource_type}?identifier={identifier['system']}|{value}"] = resource
+
+    def add_bundle(self, bundle_data):
+        """Adds every shared resource from a bundle; returns how many were added."""
+        added = 0
+        for entry in bundle_data.get("entry", []):
+            resource = entry.get("resource", {})
+            if resource.get("resourceType") in SHARED_RESOURCE_TYPES:
+                self.add(resource, entry.get("fullUrl"))
+                added += 1
+        return added
+
+    def resolve(self, reference):
+        """Returns the resource a reference string points at, or None."""
+        if not reference:
+            return None
+        resource = self._resources.get(reference)
+        if resource is None and "?identifier=" in reference and "|" in reference:
+            # Fall back to the identifier value alone when the system differs
+            resource_type, identifier = reference.split("?identifier=", 1)
+            resource = self._resources.get(f"{resource_type}?identifier={identifier.rsplit('|', 1)[1]}")
+        return resource
+
+    def display_name(self, reference):
+        """Returns the display name of the resource a reference string points at, or None."""
+        resource = self.resolve(reference)
+        if resource is None:
+            if reference:
+                logging.debug(f"Shared reference not found: {reference}")
+            return None
+        return resource_display_name(resource)
+
+
+class BundleResolver(ReferenceTable):
+    """
+    Reference index over one bundle, built in a single pass over its entries and
+    shared by every parse_* function. Resources are also grouped by type so no
+    parser has to rescan the bundle. References that do not resolve inside the
+    bundle fall back to the shared ReferenceTable, if one is given.
+    """
+
+    def __init__(self, bundle_data, shared=None):
+        super().__init__()
+        self.bundle_data = bundle_data
+        self.shared = shared
+        self._by_type = {}
+        for entry in bundle_data.get("entry", []):
+            resource = entry.get("resource", {})
+            self._by_type.setdefault(resource.get("resourceType"), []).append(resource)
+            self.add(resource, entry.get("fullUrl"))
+
+    @classmethod
+    def for_bundle(cls, bundle_data, references=None):
+        """Returns references if it already indexes bundle_data, otherwise builds a resolver on top of it."""
+        if isinstance(references, cls) and references.bundle_data is bundle_data:
+            return references
+        return cls(bundle_data, shared=references)
+
+    def resources_of_type(self, resource_type):
+        """Returns the bundle's resources of one type, in bundle order."""
+        return self._by_type.get(resource_type, [])
+
+    def resolve(self, reference, resource_type=None):
+        """
+        Returns the resource a reference points at, looking in the bundle first
+        and then in the shared table. With resource_type, other types are ignored.
+        """
+        resource = super().resolve(reference)
+        if resource is None and self.shared is not None:
+            resource = self.shared.resolve(reference)
+        if resource is not None and resource_type is not None and resource.get("resourceType") != resource_type:
+            return None
+        return resource
@@ -0,0 +1,393 @@
+import json
+import re
+
+# Streaming reader for FHIR Bundle files.
+#
+# json.load() materializes every entry of a bundle, including the thousands of
+# Claim and ExplanationOfBenefit resources the parsers never read.
+# BundleStream walks the bundle's entry[] array one element at a time, works out
+# each entry's resourceType straight from the raw bytes and only hands entries of
+# the requested types to the JSON decoder. Everything else is skipped while it is
+# being scanned, so only the entry currently being read (plus the entries that are
+# kept) is ever held in memory. Types whose parsers read only a few members, such
+# as Observation, can instead have just those members decoded.
+
+STREAM_CHUNK_SIZE = 64 * 1024
+RESOURCE_TYPE_LOOKAHEAD = 256  # Max bytes between a "resourceType" key and its value
+
+_STRUCTURAL_RE = re.compile(rb'[{}\[\]"]')
+_STRING_TAIL_RE = re.compile(rb'(?:[^"\\]|\\.)*"', re.DOTALL)  # From just after an opening quote
+
+
+_STRING_PATTERN = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+
+
+def _nested_content_pattern(max_depth):
+    """
+    Builds a regex pattern matching the inside of a JSON container: scalars,
+    complete strings and balanced nested containers up to max_depth levels.
+    Each piece can only be matched one way, so a failed match backtracks in
+    linear time.
+    """
+    plain = rb'[^"{}\[\]]*'
+    content = plain + rb'(?:' + _STRING_PATTERN + plain + rb')*'
+    for _ in range(max_depth):
+        content = plain + rb'(?:(?:' + _STRING_PATTERN + rb'|[\[{]' + content + rb'[\]}])' + plain + rb')*'
+    return content
+
+# Swallows everything up to the close of the current container in one C-level
+# match; only nesting deeper than this (or a buffer boundary) is handled in Python.
+_SKIP_NESTED_DEPTH = 12
+_SKIP_CONTENT_RE = re.compile(_nested_content_pattern(_SKIP_NESTED_DEPTH), re.DOTALL)
+# One "name": value member of an object held whole in memory, with its separator
+_MEMBER_RE = re.compile(
+    rb'[ \t\r\n]*(' + _STRING_PATTERN + rb')[ \t\r\n]*:[ \t\r\n]*('
+    + _STRING_PATTERN + rb'|[\[{]' + _nested_content_pattern(_SKIP_NESTED_DEPTH) + rb'[\]}]|[^,}\]\s]+'
+    + rb')[ \t\r\n]*(?:,|(?=}))',
+    re.DOTALL,
+)
+_OBJECT_END_RE = re.compile(rb'[ \t\r\n]*}')
+_SCALAR_END_RE = re.compile(rb'[,}\]\s]')
+_WHITESPACE_RE = re.compile(rb'[ \t\r\n]*')
+_TYPE_VALUE_RE = re.compile(rb'[ \t\r\n]*:[ \t\r\n]*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+
+_QUOTE = ord('"')
+_OPEN_BRACE = ord("{")
+_CLOSE_BRACE = ord("}")
+_OPEN_BRACKET = ord("[")
+_CLOSE_BRACKET = ord("]")
+_COMMA = ord(",")
+_COLON = ord(":")
+
+# Depth of the resource object's own members inside an entry: entry {=1, resource {=2
+_RESOURCE_MEMBER_DEPTH = 2
+
+
+def _member_spans(data, start):
+    """
+    Yields (raw quoted name, value start, value end) for each member of the
+    object whose opening brace is at data[start], one regex match per member.
+    Raises ValueError if the object cannot be followed that way.
+    """
+    pos = start + 1
+    while True:
+        match = _MEMBER_RE.match(data, pos)
+        if match is None:
+            break
+        yield match.group(1), match.start(2), match.end(2)
+        pos = match.end()
+    if _OBJECT_END_RE.match(data, pos) is None:
+        raise ValueError(f"Cannot follow the object at offset {start}")
+
+
+class BundleStream:
+    """
+    Iterates over the entries of a FHIR Bundle read from a binary file object.
+
+    Only entries whose resource.resourceType is in keep_types are decoded and
+    yielded (all entries are yielded when keep_types is None). member_types maps
+    further resource types to the resource members to keep: those entries are
+    yielded as {"resource": {...}} holding only these members, and nothing
+    else in them is decoded. Top-level Bundle members other than "entry" are
+    collected into bundle_fields as they are met. Each kept slice is decoded
+    with loads (json.loads unless given).
+    """
+
+    def __init__(self, fp, keep_types=None, chunk_size=STREAM_CHUNK_SIZE, loads=None, member_types=None):
+        self.keep_types = frozenset(keep_types) if keep_types is not None else None
+        # {resource type: {member name as the quoted bytes in the file: member name}}
+        self.member_types = {
+            resource_type: {json.dumps(member).encode("utf-8"): member for member in members}
+            for resource_type, members in (member_types or {}).items()
+        }
+        self.bundle_fields = {}
+        self.stats = {
+            "entries_seen": 0,
+            "entries_kept": 0,
+            "bytes_read": 0,
+            "bytes_decoded": 0,
+            "max_entry_bytes": 0,
+        }
+        self._fp = fp
+        self._loads = loads or json.loads  # Any loads(bytes) from json_decoders
+        self._chunk_size = chunk_size
+        self._buf = bytearray()
+        self._pos = 0
+        self._mark = None  # Buffer offset that must survive the next refill, if any
+        self._dropped = 0  # Bytes discarded from the front of the buffer so far
+        self._eof = False
+        self._resource_start = None  # Absolute offset of the last resource object the scan entered
+
+    @classmethod
+    def from_buffer(cls, data, keep_types=None, loads=None, member_types=None):
+        """
+        Builds a reader over bytes that are already in memory. Entries are
+        located by scanning the buffer and only the kept slices are decoded.
+        """
+        stream = cls(None, keep_types=keep_types, loads=loads, member_types=member_types)
+        stream._buf = data
+        stream._eof = True
+        stream.stats["bytes_read"] = len(data)
+        return stream
+
+    # --- Buffer management ---
+
+    def _fill(self):
+        """Reads the next chunk, discarding buffered bytes that are no longer needed."""
+        if self._eof:
+            return False
+        keep_from = self._pos if self._mark is None else min(self._mark, self._pos)
+        if keep_from:
+            del self._buf[:keep_from]
+            self._pos -= keep_from
+            if self._mark is not None:
+                self._mark -= keep_from
+            self._dropped += keep_from
+        data = self._fp.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            return False
+        self.stats["bytes_read"] += len(data)
+        self._buf += data
+        return True
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, "", self._dropped + self._pos)
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE_RE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def _peek(self):
+        self._skip_whitespace()
+        if self._pos >= len(self._buf):
+            raise self._error("Unexpected end of bundle")
+        return self._buf[self._pos]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise self._error(f"Expected {chr(char)!r}")
+        self._pos += 1
+
+    def _read_string(self):
+        """Advances past the string whose opening quote is at the current position; returns its start."""
+        while True:
+            match = _STRING_TAIL_RE.match(self._buf, self._pos + 1)
+            if match:
+                start = self._pos
+                self._pos = match.end()
+                return start
+            if not self._fill():
+                raise self._error("Unterminated string")
+
+    # --- Structural scanning ---
+
+    def _scan_value(self, on_member_string=None):
+        """
+        Advances past one JSON value starting at the current position.
+        While on_member_string is set, it is called with the start offset of
+        every string that is a direct member of the entry's resource object; it
+        returns True once it has seen what it needs. Everything else is skipped
+        by the regex engine a whole container at a time.
+        """
+        first = self._peek()
+        if first == _QUOTE:
+            self._read_string()
+            return
+        if first not in (_OPEN_BRACE, _OPEN_BRACKET):
+            # Scalar: runs until the next delimiter
+            while True:
+                match = _SCALAR_END_RE.search(self._buf, self._pos)
+                if match:
+                    self._pos = match.start()
+                    return
+                self._pos = len(self._buf)
+                if not self._fill():
+                    return
+
+        # Consume the opening bracket first: the skip regex only knows how to
+        # run to the close of a container it is already inside
+        self._pos += 1
+        depth = 1
+        while True:
+            if on_member_string is not None and depth <= _RESOURCE_MEMBER_DEPTH:
+                match = _STRUCTURAL_RE.search(self._buf, self._pos)
+                if match is None:
+                    self._pos = len(self._buf)
+                    if not self._fill():
+                        raise self._error("Unexpected end of bundle inside a value")
+                    continue
+                self._pos = match.start()
+                if self._buf[self._pos] == _QUOTE:
+                    string_start = self._read_string()
+                    if depth == _RESOURCE_MEMBER_DEPTH and on_member_string(string_start):
+                        on_member_string = None
+                    continue
+            else:
+                self._pos = _SKIP_CONTENT_RE.match(self._buf, self._pos).end()
+                if self._pos >= len(self._buf) or self._buf[self._pos] == _QUOTE:
+                    # End of buffer or a string cut off by it
+                    if not self._fill():
+                        raise self._error("Unexpected end of bundle inside a value")
+                    continue
+            char = self._buf[self._pos]
+            self._pos += 1
+            if char == _OPEN_BRACE or char == _OPEN_BRACKET:
+                depth += 1
+                if depth == _RESOURCE_MEMBER_DEPTH and on_member_string is not None:
+                    self._resource_start = self._dropped + self._pos - 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _decode_value(self):
+        """Scans and decodes one JSON value starting at the current position."""
+        self._skip_whitespace()
+        self._mark = self._pos
+        self._scan_value()
+        start, self._mark = self._mark, None
+        raw = self._buf[start:self._pos]
+        self.stats["bytes_decoded"] += len(raw)
+        return self._loads(raw)
+
+    def _read_entry(self):
+        """Scans one entry element, returning the decoded entry or None if skipped."""
+        self._skip_whitespace()
+        start = self._pos
+        self._mark = start
+        sniffed = {"type": None, "keep": self.keep_types is None}
+        keep_types = self.keep_types
+
+        def on_member_string(string_start):
+            if self._buf[string_start:self._pos] != b'"resourceType"':
+                return False
+            match = _TYPE_VALUE_RE.match(self._buf, self._pos)
+            while match is None and len(self._buf) - self._pos < RESOURCE_TYPE_LOOKAHEAD:
+                if not self._fill():
+                    break
+                match = _TYPE_VALUE_RE.match(self._buf, self._pos)
+            if match is None:
+                return False
+            sniffed["type"] = match.group(1).decode("utf-8")
+            self._pos = match.end()
+            if keep_types is not None:
+                sniffed["keep"] = sniffed["type"] in keep_types or sniffed["type"] in self.member_types
+                if not sniffed["keep"]:
+                    self._mark = None  # Skipped entry: let refills drop its bytes
+            return True
+
+        entry_offset = self._dropped + start
+        self._scan_value(on_member_string)
+        entry_bytes = (self._dropped + self._pos) - entry_offset
+        self.stats["entries_seen"] += 1
+        self.stats["max_entry_bytes"] = max(self.stats["max_entry_bytes"], entry_bytes)
+
+        if not sniffed["keep"] or (keep_types is not None and sniffed["type"] is None):
+            self._mark = None
+            return None
+        start, self._mark = self._mark, None
+        raw = self._buf[start:self._pos]
+        self.stats["entries_kept"] += 1
+        members = self.member_types.get(sniffed["type"])
+        if members is not None:
+            return self._decode_resource_members(raw, self._resource_start - entry_offset, members)
+        self.stats["bytes_decoded"] += len(raw)
+        return self._loads(raw)
+
+    def _decode_resource_members(self, raw, resource_start, members):
+        """
+        Decodes only the given members of the resource object starting at
+        raw[resource_start], the slice of one scanned entry.
+        """
+        resource = {}
+        try:
+            for member, value_start, value_end in _member_spans(raw, resource_start):
+                name = members.get(member)
+                if name is not None:
+                    value = raw[value_start:value_end]
+                    self.stats["bytes_decoded"] += len(value)
+                    resource[name] = self._loads(value)
+        except ValueError:
+            # Nested deeper than the member regex follows: decode the whole entry
+            self.stats["bytes_decoded"] += len(raw)
+            whole = self._loads(raw).get("resource", {})
+            resource = {key: value for key, value in whole.items() if key in members.values()}
+        return {"resource": resource}
+
+    def _iter_entry_array(self):
+        self._expect(_OPEN_BRACKET)
+        if self._peek() == _CLOSE_BRACKET:
+            self._pos += 1
+            return
+        while True:
+            entry = self._read_entry()
+            if entry is not None:
+                yield entry
+            separator = self._peek()
+            self._pos += 1
+            if separator == _CLOSE_BRACKET:
+                return
+            if separator != _COMMA:
+                raise self._error("Expected ',' or ']' in entry array")
+
+    def __iter__(self):
+        self._expect(_OPEN_BRACE)
+        if self._peek() == _CLOSE_BRACE:
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != _QUOTE:
+                raise self._error("Expected a member name")
+            key = self._decode_value()
+            self._expect(_COLON)
+            if key == "entry":
+                yield from self._iter_entry_array()
+            else:
+                self.bundle_fields[key] = self._decode_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == _CLOSE_BRACE:
+                return
+            if separator != _COMMA:
+                raise self._error("Expected ',' or '}' in bundle")
+
+
+def read_bundle_stream(fp, keep_types=None, chunk_size=STREAM_CHUNK_SIZE, loads=None, stats=None, member_types=None):
+    """
+    Reads a FHIR Bundle from a binary file object, keeping only entries whose
+    resourceType is in keep_types (and the member_types members of others;
+    see BundleStream). Returns a bundle dict with the same shape as
+    json.load() would produce, minus the skipped entries.
+    If a stats dict is given, it receives the stream's counters.
+
+    The returned bundle holds every kept entry, decoded, because the parsers
+    resolve references across the whole bundle. Peak memory is therefore
+    bounded by the kept entries plus the one being scanned, not by the
+    largest single resource; iterate over a BundleStream directly to hold
+    one entry at a time.
+    """
+    stream = BundleStream(fp, keep_types=keep_types, chunk_size=chunk_size, loads=loads, member_types=member_types)
+    return _collect_bundle(stream, stats)
+
+
+def read_bundle_filtered(data, keep_types=None, loads=None, stats=None, member_types=None):
+    """
+    Decodes a FHIR Bundle held in memory as bytes (or any buffer such as an
+    mmap), pre-scanning each entry's resourceType and decoding only the entries
+    whose type is in keep_types (and the member_types members of others).
+    Only the kept slices are copied out of data.
+    """
+    return _collect_bundle(BundleStream.from_buffer(data, keep_types=keep_types, loads=loads, member_types=member_types), stats)
+
+
+def _collect_bundle(stream, stats=None):
+    """Drains stream into a bundle dict: every kept entry is held until the caller is done with it."""
+    entries = list(stream)
+    if stats is not None:
+        stats.update(stream.stats)
+    bundle_data = dict(stream.bundle_fields)
+    bundle_data["entry"] = entries
+    return bundle_data
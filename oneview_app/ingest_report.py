@@ -0,0 +1,69 @@
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Counters for one load_all_patients_data run.
+#
+# bytes_copied counts the bytes our readers copy out of the files into Python
+# objects: whole-file reads, stream chunks and the entry slices handed to the
+# JSON decoder. Copies the decoder makes internally are not included.
+
+
+def peak_rss_kb():
+    """Returns the peak resident set size of this process in KiB, or None when unknown."""
+    # Linux: VmHWM starts over at exec, unlike ru_maxrss which keeps the parent's peak
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class IngestReport:
+    """Collects file, byte and memory counters while a data directory is loaded."""
+
+    def __init__(self):
+        self.files = 0
+        self.patients = 0
+        self.bytes_on_disk = 0
+        self.bytes_copied = 0
+        self.peak_rss_kb = None
+        self.elapsed = 0.0
+        self._started = time.perf_counter()
+
+    def add_copied(self, size):
+        self.bytes_copied += size
+
+    def finish(self, patients):
+        self.patients = patients
+        self.elapsed = time.perf_counter() - self._started
+        self.peak_rss_kb = peak_rss_kb()
+
+    def as_dict(self):
+        return {
+            "files": self.files,
+            "patients": self.patients,
+            "bytes_on_disk": self.bytes_on_disk,
+            "bytes_copied": self.bytes_copied,
+            "peak_rss_kb": self.peak_rss_kb,
+            "elapsed": self.elapsed,
+        }
+
+    def summary(self):
+        peak = f"{self.peak_rss_kb / 1024:.1f} MiB" if self.peak_rss_kb is not None else "n/a"
+        return (
+            f"Ingest: {self.patients} patients from {self.files} files in {self.elapsed:.2f}s, "
+            f"{self.bytes_on_disk / 1e6:.1f} MB on disk, {self.bytes_copied / 1e6:.1f} MB copied, "
+            f"peak RSS {peak}"
+        )
@@ -0,0 +1,69 @@
+import json
+import logging
+
+# Pluggable JSON decoders for bundle ingest.
+#
+# Every decoder takes the raw bytes of a JSON document and returns the decoded
+# Python object, so files are read as bytes and never copied into an
+# intermediate str by our code. The stdlib json module is always registered;
+# orjson and ujson are used when installed. All decoders raise
+# json.JSONDecodeError on malformed input, so callers keep a single except
+# clause whichever backend is active.
+
+STDLIB_DECODER = "json"
+# Order in which the "auto" choice picks an installed decoder
+DECODER_PREFERENCE = ("orjson", "ujson", STDLIB_DECODER)
+AUTO_DECODER = "auto"
+
+
+def _wrap_decode_errors(loads, error_types, name):
+    """Returns loads with the backend's own decode errors re-raised as json.JSONDecodeError."""
+    def decode(data):
+        try:
+            return loads(data)
+        except json.JSONDecodeError:
+            raise
+        except error_types as e:
+            raise json.JSONDecodeError(f"{name}: {e}", "", 0) from e
+    decode.__name__ = f"{name}_loads"
+    return decode
+
+
+# json.loads accepts bytes and detects UTF-8/16/32 itself
+JSON_DECODERS = {STDLIB_DECODER: json.loads}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    # orjson.JSONDecodeError already subclasses json.JSONDecodeError
+    JSON_DECODERS["orjson"] = orjson.loads
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+else:
+    JSON_DECODERS["ujson"] = _wrap_decode_errors(ujson.loads, (ValueError,), "ujson")
+
+
+def available_decoders():
+    """Returns the names of the installed decoders, fastest first."""
+    return [name for name in DECODER_PREFERENCE if name in JSON_DECODERS]
+
+
+def get_decoder(name=AUTO_DECODER):
+    """
+    Returns the loads(bytes) function for a decoder name. "auto" (or None)
+    picks the fastest installed decoder and falls back to the stdlib.
+    """
+    if name is None or name == AUTO_DECODER:
+        name = available_decoders()[0]
+    loads = JSON_DECODERS.get(name)
+    if loads is None:
+        if name in DECODER_PREFERENCE:
+            raise ValueError(f"JSON decoder {name!r} is not installed (available: {', '.join(available_decoders())})")
+        raise ValueError(f"Unknown JSON decoder {name!r} (expected one of: {AUTO_DECODER}, {', '.join(DECODER_PREFERENCE)})")
+    logging.debug(f"Using JSON decoder {name}")
+    return loads
@@ -0,0 +1,166 @@
+import unicodedata
+
+# Typo-tolerant patient name matching.
+#
+# Names are split into letter-only tokens ("O'Malley" -> "omalley"). Each
+# distinct token goes into two indexes built at ingest: a Soundex bucket, which
+# catches spellings that sound alike ("Pinkmann"/"Pinkman"), and a
+# symmetric-deletion index, which finds every token within a small edit
+# distance by looking up the query's deletion variants instead of comparing it
+# against the whole vocabulary (a BK-tree ends up visiting most of a large
+# vocabulary at distance 2). A patient matches when every query token
+# matches one of their name tokens; results are ranked by total edit distance.
+
+MAX_TYPOS = 2
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def name_tokens(name):
+    """Splits a name into lower-case letter-only tokens, folding accents ("Né-Lambert" -> ["ne", "lambert"])."""
+    folded = unicodedata.normalize("NFKD", str(name)).casefold()
+    tokens = []
+    for part in folded.split():
+        token = "".join(c for c in part if c.isalpha() and c.isascii())
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def soundex(token):
+    """American Soundex code of a lower-case ASCII token ("pinkman" -> "p525")."""
+    if not token:
+        return ""
+    code = token[0]
+    previous = _SOUNDEX_CODES.get(token[0])
+    for letter in token[1:]:
+        digit = _SOUNDEX_CODES.get(letter)
+        if digit is not None and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in "hw":  # h and w do not separate letters with the same code
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance between a and b; stops early and returns limit + 1 once it exceeds limit."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def max_typos(token):
+    """Edits tolerated for a query token: none for very short tokens, more for long ones."""
+    if len(token) <= 2:
+        return 0
+    if len(token) <= 5:
+        return 1
+    return MAX_TYPOS
+
+
+def deletion_variants(word, depth):
+    """Returns word and every string obtained by deleting up to depth characters from it."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class DeletionIndex:
+    """
+    Symmetric-deletion index: two words within edit distance d share a variant
+    obtained by deleting at most d characters from each, so a lookup only
+    verifies the words sharing one of the query's variants.
+    """
+
+    def __init__(self, words=(), max_distance=MAX_TYPOS):
+        self.max_distance = max_distance
+        self._variants = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        for variant in deletion_variants(word, self.max_distance):
+            self._variants.setdefault(variant, []).append(word)
+
+    def search(self, word, max_distance):
+        """Returns (distance, word) pairs for every indexed word within max_distance (at most self.max_distance)."""
+        max_distance = min(max_distance, self.max_distance)
+        candidates = set()
+        for variant in deletion_variants(word, max_distance):
+            candidates.update(self._variants.get(variant, ()))
+        found = []
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+        return found
+
+
+class FuzzyNameIndex:
+    """Soundex and deletion indexes over the name tokens of parsed patients."""
+
+    def __init__(self, patients):
+        self._postings = {}  # token -> sorted patient positions
+        self._soundex = {}   # soundex code -> tokens
+        self._near = DeletionIndex()
+        for doc, patient in enumerate(patients):
+            for token in name_tokens(patient.get("full_name") or ""):
+                posting = self._postings.get(token)
+                if posting is None:
+                    self._postings[token] = [doc]
+                    self._soundex.setdefault(soundex(token), []).append(token)
+                    self._near.add(token)
+                elif posting[-1] != doc:
+                    posting.append(doc)
+
+    def similar_tokens(self, token):
+        """Returns {indexed token: edit distance} for tokens close to or sounding like token."""
+        limit = max_typos(token)
+        matches = {word: distance for distance, word in self._near.search(token, limit)}
+        # Same-sounding tokens get one extra edit of slack ("Pinkmann" -> "Pinckman")
+        for word in self._soundex.get(soundex(token), []):
+            if word not in matches:
+                distance = edit_distance(token, word, limit + 1)
+                if distance <= limit + 1:
+                    matches[word] = distance
+        return matches
+
+    def match(self, text):
+        """
+        Returns {patient position: score} for patients whose name matches every
+        token of text within the typo budget; lower scores are closer matches.
+        """
+        scores = None
+        for token in name_tokens(text):
+            token_scores = {}
+            for word, distance in self.similar_tokens(token).items():
+                for doc in self._postings[word]:
+                    if distance < token_scores.get(doc, distance + 1):
+                        token_scores[doc] = distance
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc: score + token_scores[doc] for doc, score in scores.items() if doc in token_scores}
+            if not scores:
+                return {}
+        return scores or {}
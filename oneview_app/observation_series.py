@@ -0,0 +1,94 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Per-patient, per-code time series of numeric Observations (labs and vitals).
+#
+# A bundle holds thousands of Observations; keeping each as a dict would
+# dwarf the rest of the patient record. Each code (LOINC where the
+# Observation has one) instead gets two packed arrays, int64 epoch seconds and
+# float64 values, sorted by time at ingest. Panels such as blood pressure
+# contribute one series per component (systolic, diastolic). Charts ask for a
+# series downsampled to a number of points with LTTB
+# (largest-triangle-three-buckets), which keeps the peaks and troughs a plain
+# stride would miss.
+
+
+class ObservationSeries:
+    """Sorted, array-backed measurements of one observation code."""
+
+    __slots__ = ("code", "display", "unit", "timestamps", "values")
+
+    def __init__(self, code, display=None, unit=None, timestamps=(), values=()):
+        self.code = code
+        self.display = display
+        self.unit = unit
+        self.timestamps = array('q', timestamps)
+        self.values = array('d', values)
+
+    @classmethod
+    def from_points(cls, code, display, unit, points):
+        """Builds a series from unsorted (timestamp, value) pairs."""
+        points = sorted(points, key=lambda point: point[0])
+        return cls(code, display, unit, (t for t, _ in points), (v for _, v in points))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __eq__(self, other):
+        if not isinstance(other, ObservationSeries):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        return f"ObservationSeries({self.code!r}, {self.display!r}, {len(self)} points)"
+
+    def window(self, start=None, end=None):
+        """Returns the (lo, hi) index range of the points with start <= timestamp <= end."""
+        lo = bisect_left(self.timestamps, start) if start is not None else 0
+        hi = bisect_right(self.timestamps, end) if end is not None else len(self.timestamps)
+        return lo, max(lo, hi)
+
+    def downsample(self, points, start=None, end=None):
+        """Returns up to points (timestamp, value) pairs between start and end, chosen by LTTB."""
+        lo, hi = self.window(start, end)
+        return [(self.timestamps[i], self.values[i]) for i in lttb_indices(self.timestamps, self.values, points, lo, hi)]
+
+
+def lttb_indices(xs, ys, threshold, lo=0, hi=None):
+    """
+    Largest-triangle-three-buckets over xs[lo:hi]/ys[lo:hi]: returns the indices
+    of at most threshold points, always keeping the first and last. Each bucket
+    in between contributes the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket.
+    """
+    if hi is None:
+        hi = len(xs)
+    n = hi - lo
+    if threshold >= n or n <= 2:
+        return list(range(lo, hi))
+    if threshold < 3:
+        return [lo, hi - 1][:threshold] if threshold > 0 else []
+    kept = [lo]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = lo
+    for bucket in range(threshold - 2):
+        start = lo + 1 + int(bucket * bucket_size)
+        end = lo + 1 + int((bucket + 1) * bucket_size)
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(lo + 1 + int((bucket + 2) * bucket_size), hi - 1) if bucket < threshold - 3 else hi
+        if next_end <= next_start:
+            next_end = next_start + 1
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((ax - avg_x) * (ys[i] - ay) - (ax - xs[i]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+        a = best
+    kept.append(hi - 1)
+    return kept
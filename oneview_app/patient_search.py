@@ -0,0 +1,157 @@
+import re
+from oneview_app.cohort_index import intersect_postings, union_postings
+from oneview_app.name_matching import FuzzyNameIndex
+
+# Structured patient search over full_name, dob, gender and contact_phone.
+#
+# Every field has its own index: exact-value posting lists for dob, gender and
+# phone, and a trigram index for the name so the existing case-insensitive
+# substring match ("pink" finds "Jesse Bruce Pinkman") needs no scan. A query
+# is planned by estimating how many patients each criterion admits and
+# starting from the most selective one. Once the candidate set is small, the
+# remaining criteria are checked on the candidates directly instead of being
+# intersected, so a broad name filter costs next to nothing once a DOB is given.
+# With fuzzy=True the text criterion is answered by the typo-tolerant
+# FuzzyNameIndex instead, and results are ranked by closeness.
+
+NAME_GRAM = 3
+# Below this many candidates, checking each candidate beats another intersection
+VERIFY_CANDIDATES_BELOW = 64
+
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def normalize_name(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def normalize_phone(phone):
+    """Digits only, without a leading US country code: "+1 (505) 111-2222" -> "5051112222"."""
+    digits = _NON_DIGIT_RE.sub("", str(phone))
+    return digits[1:] if len(digits) == 11 and digits.startswith("1") else digits
+
+
+def name_grams(text):
+    return {text[i:i + NAME_GRAM] for i in range(len(text) - NAME_GRAM + 1)}
+
+
+class _Criterion:
+    """One planned search condition: a size estimate, its posting list and a per-patient check."""
+
+    def __init__(self, name, estimate, postings, matches):
+        self.name = name
+        self.estimate = estimate
+        self.postings = postings
+        self.matches = matches
+
+
+class PatientSearchIndex:
+    """Per-field indexes over parsed patients, built once at ingest."""
+
+    def __init__(self, patients):
+        self.patients = patients
+        self._ids = {}
+        self._dobs = {}
+        self._genders = {}
+        self._phones = {}
+        self._grams = {}
+        self._names = []  # Normalized full_name per position, for substring checks
+        for doc, patient in enumerate(patients):
+            self._add(doc, patient)
+        self.fuzzy_names = FuzzyNameIndex(patients)
+
+    def _add(self, doc, patient):
+        for index, value in (
+            (self._ids, patient.get("patient_id")),
+            (self._dobs, patient.get("dob")),
+            (self._genders, patient.get("gender") and patient["gender"].casefold()),
+            (self._phones, patient.get("contact_phone") and normalize_phone(patient["contact_phone"])),
+        ):
+            if value:
+                index.setdefault(value, []).append(doc)
+        name = normalize_name(patient.get("full_name") or "")
+        self._names.append(name)
+        for gram in name_grams(name):
+            self._grams.setdefault(gram, []).append(doc)
+
+    # --- Criteria ---
+
+    def _exact(self, label, index, key, field, normalize):
+        posting = index.get(key, [])
+        return _Criterion(
+            label,
+            len(posting),
+            lambda: posting,
+            lambda doc: (normalize(self.patients[doc].get(field) or "")) == key,
+        )
+
+    def _text(self, text):
+        """The free-text box: an exact patient_id or a substring of the name (as index() always did)."""
+        needle = normalize_name(text)
+        id_posting = self._ids.get(text, [])
+        grams = name_grams(needle)
+        if grams:
+            gram_postings = [self._grams.get(gram, []) for gram in grams]
+            estimate = min(len(p) for p in gram_postings) + len(id_posting)
+        else:
+            gram_postings = None  # Too short for a trigram: every name is a candidate
+            estimate = len(self.patients)
+
+        def postings():
+            if gram_postings is None:
+                names = range(len(self.patients))
+            else:
+                names = intersect_postings(gram_postings)
+            # Trigrams only narrow the candidates; the substring check decides
+            matched = [doc for doc in names if needle in self._names[doc]]
+            return union_postings([matched, id_posting]) if id_posting else matched
+
+        def matches(doc):
+            return self.patients[doc].get("patient_id") == text or needle in self._names[doc]
+
+        return _Criterion("text", estimate, postings, matches)
+
+    def _fuzzy_text(self, text, scores):
+        """The free-text box matched as a misspelt name; scores come from FuzzyNameIndex.match."""
+        posting = sorted(scores)
+        return _Criterion("fuzzy_text", len(posting), lambda: posting, lambda doc: doc in scores)
+
+    def plan(self, text=None, dob=None, gender=None, phone=None, fuzzy_scores=None):
+        """Returns the criteria for a search, most selective first."""
+        criteria = []
+        if fuzzy_scores is not None:
+            criteria.append(self._fuzzy_text(text, fuzzy_scores))
+        elif text:
+            criteria.append(self._text(text))
+        if dob:
+            criteria.append(self._exact("dob", self._dobs, dob, "dob", str))
+        if gender:
+            criteria.append(self._exact("gender", self._genders, gender.casefold(), "gender", str.casefold))
+        if phone:
+            criteria.append(self._exact("phone", self._phones, normalize_phone(phone), "contact_phone", normalize_phone))
+        return sorted(criteria, key=lambda c: c.estimate)
+
+    def search_positions(self, text=None, dob=None, gender=None, phone=None, fuzzy=False):
+        """
+        Returns the positions of the patients matching every given field, in
+        load order, or closest name first when fuzzy is set.
+        """
+        fuzzy_scores = self.fuzzy_names.match(text) if fuzzy and text else None
+        criteria = self.plan(text, dob, gender, phone, fuzzy_scores)
+        if not criteria:
+            return []
+        candidates = criteria[0].postings()
+        for criterion in criteria[1:]:
+            if not candidates:
+                break
+            if len(candidates) < VERIFY_CANDIDATES_BELOW or len(candidates) * 4 < criterion.estimate:
+                candidates = [doc for doc in candidates if criterion.matches(doc)]
+            else:
+                candidates = intersect_postings([candidates, criterion.postings()])
+        if fuzzy_scores is not None:
+            candidates = sorted(candidates, key=lambda doc: (fuzzy_scores[doc], doc))
+        return candidates
+
+    def search(self, text=None, dob=None, gender=None, phone=None, fuzzy=False):
+        """Returns the matching patients (see search_positions)."""
+        return [self.patients[doc] for doc in self.search_positions(text, dob, gender, phone, fuzzy)]
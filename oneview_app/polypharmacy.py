@@ -0,0 +1,168 @@
+"""
+Polypharmacy report: patients with many concurrently active medications.
+
+Run from the repository root as a batch job:
+
+    python -m oneview_app.polypharmacy [--min-concurrent 5] [--workers N] [--output report.json]
+
+Each medication request is turned into an active period. A sweep line over
+each patient's sorted start and end events tracks how many distinct
+medications are active at once and records the windows where that number
+reaches the threshold. Its cost is O(m log m) per patient, with no pairwise
+comparison of medications. Patients are swept in parallel worker processes,
+and the result is ranked by peak concurrency, then by time spent over the
+threshold.
+"""
+import argparse
+import json
+import logging
+import os
+from itertools import groupby
+from operator import itemgetter
+from oneview_app.batch import CHUNK_SIZE, map_patient_chunks
+from oneview_app.encounter_index import encounter_timestamp, iso_timestamp
+
+POLYPHARMACY_THRESHOLD = 5
+OPEN_END = 2 ** 62
+_DAY = 24 * 60 * 60
+
+
+def medication_period(medication):
+    """
+    Returns the (start, end) timestamps a medication request is active over, or None.
+    The start is the validity period start or the authoring date. The end is the
+    validity period end, else start plus the expected supply duration, else
+    open-ended for an active request. A request that is no longer active and has
+    no end on record has no known period and is left out.
+    """
+    start = encounter_timestamp(medication.get("period_start") or medication.get("authored_on"))
+    if start is None:
+        return None
+    end = None
+    if medication.get("period_end"):
+        end = encounter_timestamp(medication["period_end"])
+        if end is not None and 'T' not in medication["period_end"]:
+            end += _DAY  # A plain end date includes that whole day
+    elif medication.get("supply_days"):
+        end = start + int(medication["supply_days"] * _DAY)
+    elif medication.get("status") == "active":
+        end = OPEN_END
+    return (start, end) if end is not None and end > start else None
+
+
+def format_timestamp(timestamp):
+    """ISO 8601 UTC for a timestamp; None for an open end."""
+    if timestamp is None or timestamp >= OPEN_END:
+        return None
+    return iso_timestamp(timestamp)
+
+
+def overlap_windows(medications, threshold=POLYPHARMACY_THRESHOLD):
+    """
+    Sweeps a patient's medications and returns (peak, windows). peak is the
+    most distinct medications active at once. Each window is a maximal
+    (start, end, peak in window, medication names) span with at least
+    threshold of them active. A medication with several overlapping requests
+    counts once.
+    """
+    events = []
+    for medication in medications:
+        period = medication_period(medication)
+        if period is not None:
+            name = medication.get("name") or "Unknown Medication"
+            # Ends sort before starts at the same instant: periods are half-open
+            events.append((period[0], 1, name))
+            events.append((period[1], 0, name))
+    events.sort()
+    active = {}   # name -> number of its requests active now
+    peak = 0
+    windows = []
+    window = None  # [start, end, peak, names] while over the threshold
+    # Apply every event at an instant before checking the threshold, so a
+    # renewal ending the day its successor starts does not split a window
+    for timestamp, group in groupby(events, key=itemgetter(0)):
+        for _, is_start, name in group:
+            if is_start:
+                active[name] = active.get(name, 0) + 1
+            else:
+                active[name] -= 1
+                if not active[name]:
+                    del active[name]
+        count = len(active)
+        peak = max(peak, count)
+        if count >= threshold:
+            if window is None:
+                window = [timestamp, None, count, set(active)]
+            else:
+                window[2] = max(window[2], count)
+                window[3].update(active)
+        elif window is not None:
+            window[1] = timestamp
+            windows.append((window[0], window[1], window[2], sorted(window[3])))
+            window = None
+    if window is not None:  # Still over the threshold after the last event (open-ended medications)
+        windows.append((window[0], OPEN_END, window[2], sorted(window[3])))
+    return peak, windows
+
+
+def analyze_patients(patients, threshold=POLYPHARMACY_THRESHOLD):
+    """Returns a report entry for every patient meeting the threshold (one worker's share of the job)."""
+    entries = []
+    for patient in patients:
+        peak, windows = overlap_windows(patient.get("medications") or [], threshold)
+        if not windows:
+            continue
+        entries.append({
+            "patient_id": patient.get("patient_id"),
+            "full_name": patient.get("full_name"),
+            "peak_concurrent": peak,
+            "ongoing": windows[-1][1] == OPEN_END,
+            # Open-ended windows count up to their start; they are flagged ongoing instead
+            "days_over_threshold": round(sum(end - start for start, end, _, _ in windows if end != OPEN_END) / _DAY, 1),
+            "windows": [
+                {"start": format_timestamp(start), "end": format_timestamp(end), "peak": count, "medications": names}
+                for start, end, count, names in windows
+            ],
+        })
+    return entries
+
+
+def polypharmacy_report(patients, threshold=POLYPHARMACY_THRESHOLD, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Runs the sweep over every patient, in parallel when workers != 1 (None
+    means one per CPU), and returns the ranked report entries.
+    """
+    entries = map_patient_chunks(
+        analyze_patients, patients, ("patient_id", "full_name", "medications"), threshold,
+        workers=workers, chunk_size=chunk_size,
+    )
+    entries.sort(key=lambda e: (-e["peak_concurrent"], not e["ongoing"], -e["days_over_threshold"], e["patient_id"] or ""))
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-concurrent", type=int, default=POLYPHARMACY_THRESHOLD, help="distinct concurrent medications that count as polypharmacy")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU; 1 runs inline)")
+    parser.add_argument("--data-dir", default=None, help="FHIR data directory (default: the app's data directory)")
+    parser.add_argument("--output", default=None, help="write the report as JSON to this file instead of printing a summary")
+    args = parser.parse_args(argv)
+
+    from oneview_app.fhir_parser import DATA_DIR, load_all_patients_data
+    patients = load_all_patients_data(args.data_dir or DATA_DIR)
+    entries = polypharmacy_report(patients, args.min_concurrent, args.workers)
+    logging.info(f"Polypharmacy report: {len(entries)} of {len(patients)} patients with {args.min_concurrent}+ concurrent medications")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"threshold": args.min_concurrent, "patients": entries}, f, indent=2)
+        print(f"Wrote {len(entries)} patients to {os.path.abspath(args.output)}")
+        return
+    print(f"{'patient':<38} {'name':<30} {'peak':>4} {'days':>8}  windows")
+    for entry in entries:
+        ongoing = " (ongoing)" if entry["ongoing"] else ""
+        print(f"{entry['patient_id'] or '':<38} {(entry['full_name'] or '')[:30]:<30} {entry['peak_concurrent']:>4} {entry['days_over_threshold']:>8}  {len(entry['windows'])}{ongoing}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
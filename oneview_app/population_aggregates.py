@@ -0,0 +1,111 @@
+from collections import Counter
+from oneview_app.cohort_index import ACTIVE_STATUSES
+
+# Population dashboard counts, maintained incrementally.
+#
+# Every patient contributes one key per dimension (insurance plan, PCP,
+# gender) and one key per distinct active condition. The aggregates are
+# Counters over those keys. Each patient's contribution is remembered by
+# patient_id, so update() after a reload only subtracts the old contribution
+# and adds the new one for patients who were added, changed or removed.
+# Age bands are not counted here: a patient's band changes with the date, not
+# with the data, so the dashboard takes them from DobArray.age_band_counts,
+# which answers each band with two bisections of the DOBs sorted at ingest.
+
+# (label, lowest age, highest age or None)
+AGE_BANDS = (
+    ("0-17", 0, 17),
+    ("18-34", 18, 34),
+    ("35-49", 35, 49),
+    ("50-64", 50, 64),
+    ("65+", 65, None),
+)
+DIMENSIONS = ("insurance", "pcp_name", "gender")
+UNKNOWN = "Unknown"
+TOP_CONDITIONS = 10
+
+
+def patient_contribution(patient):
+    """The keys a patient adds to each aggregate: ({dimension: key}, frozenset of active conditions)."""
+    keys = {
+        "insurance": patient.get("insurance") or UNKNOWN,
+        "pcp_name": patient.get("pcp_name") or UNKNOWN,
+        "gender": patient.get("gender") or UNKNOWN,
+    }
+    conditions = frozenset(
+        d.get("description") or d.get("code")
+        for d in patient.get("diagnoses") or []
+        if d.get("status") in ACTIVE_STATUSES and (d.get("description") or d.get("code"))
+    )
+    return keys, conditions
+
+
+class PopulationAggregates:
+    """Counts by insurance, PCP, gender and active condition."""
+
+    def __init__(self, patients=()):
+        self.counts = {dimension: Counter() for dimension in DIMENSIONS}
+        self.conditions = Counter()  # Active condition -> patients with it
+        self._contributions = {}     # patient_id -> patient_contribution()
+        if patients:
+            self.update(patients)
+
+    def __len__(self):
+        return len(self._contributions)
+
+    def _apply(self, contribution, sign):
+        keys, conditions = contribution
+        for dimension, key in keys.items():
+            counter = self.counts[dimension]
+            counter[key] += sign
+            if not counter[key]:
+                del counter[key]
+        for condition in conditions:
+            self.conditions[condition] += sign
+            if not self.conditions[condition]:
+                del self.conditions[condition]
+
+    def update(self, patients):
+        """
+        Brings the aggregates in line with a (re)loaded patient list; only
+        patients that are new, gone or changed touch the counters.
+        Returns counts of added, updated, removed and unchanged patients.
+        """
+        changes = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        present = set()
+        for patient in patients:
+            patient_id = patient.get("patient_id")
+            if not patient_id:
+                continue
+            present.add(patient_id)
+            contribution = patient_contribution(patient)
+            current = self._contributions.get(patient_id)
+            if current == contribution:
+                changes["unchanged"] += 1
+                continue
+            if current is not None:
+                self._apply(current, -1)
+                changes["updated"] += 1
+            else:
+                changes["added"] += 1
+            self._apply(contribution, 1)
+            self._contributions[patient_id] = contribution
+        for patient_id in [p for p in self._contributions if p not in present]:
+            self._apply(self._contributions.pop(patient_id), -1)
+            changes["removed"] += 1
+        return changes
+
+    def summary(self, top_conditions=TOP_CONDITIONS, age_band_counts=None):
+        """
+        The dashboard: total patients, count lists per dimension (largest
+        first), the top conditions and, from age_band_counts (as returned by
+        DobArray.age_band_counts over AGE_BANDS), the age bands in band order.
+        """
+        return {
+            "patients": len(self._contributions),
+            "insurance": self.counts["insurance"].most_common(),
+            "pcp_name": self.counts["pcp_name"].most_common(),
+            "gender": self.counts["gender"].most_common(),
+            "age_band": [(label or UNKNOWN, count) for label, count in (age_band_counts or {}).items() if count],
+            "top_conditions": self.conditions.most_common(top_conditions),
+        }
@@ -0,0 +1,109 @@
+import re
+from oneview_app.cohort_index import normalize_value
+
+# Provider panels and facility rosters, precomputed at ingest.
+#
+# A provider's panel is every patient whose pcp_name is that provider plus
+# every patient with an encounter where they were the provider. A facility's
+# roster is every patient with an encounter there. Each entry carries the
+# patient's last visit with that provider / at that facility, and each list is
+# stored sorted by recency, so a page of the default view is a slice.
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 500
+
+# Encounter dates are FHIR dates or dateTimes; anything else is not a visit date
+_VISIT_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def visit_date(date_str):
+    """Returns date_str if it is a usable FHIR date/dateTime, else None."""
+    if date_str and _VISIT_DATE_RE.match(date_str):
+        return date_str
+    return None
+
+
+def by_recency(entries):
+    """Most recent visit first; entries without a visit last; ties by name."""
+    entries = sorted(entries, key=lambda e: ((e["full_name"] or "").casefold(), e["patient_id"] or ""))
+    # Stable sort: reverse=True keeps the name order among equal dates, and "" sorts last
+    entries.sort(key=lambda e: e["last_visit"] or "", reverse=True)
+    return entries
+
+
+class RosterIndex:
+    """Maps a display name (provider or facility) to its patients and their last visit."""
+
+    def __init__(self):
+        self._names = {}     # normalized key -> display name as first seen
+        self._visits = {}    # normalized key -> {patient_id: entry}
+        self._sorted = {}
+
+    def add(self, name, patient, date_str=None):
+        if not name:
+            return
+        key = normalize_value(name)
+        self._names.setdefault(key, name)
+        visits = self._visits.setdefault(key, {})
+        patient_id = patient.get("patient_id")
+        entry = visits.get(patient_id)
+        if entry is None:
+            entry = visits[patient_id] = {"patient_id": patient_id, "full_name": patient.get("full_name"), "last_visit": None}
+        date_str = visit_date(date_str)
+        if date_str and (entry["last_visit"] is None or date_str > entry["last_visit"]):
+            entry["last_visit"] = date_str
+
+    def finish(self):
+        """Sorts every list by recency once all patients are added."""
+        self._sorted = {key: by_recency(visits.values()) for key, visits in self._visits.items()}
+
+    def names(self):
+        """Returns (display name, patient count) pairs, largest first."""
+        return sorted(
+            ((self._names[key], len(entries)) for key, entries in self._sorted.items()),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def page(self, name, page=1, per_page=DEFAULT_PAGE_SIZE, sort="recency", order="desc"):
+        """
+        Returns one page of the patients for name, or None if the name is unknown.
+        sort is "recency" (last visit) or "name"; order is "desc" or "asc".
+        """
+        key = normalize_value(name)
+        entries = self._sorted.get(key)
+        if entries is None:
+            return None
+        if sort == "name":
+            entries = sorted(entries, key=lambda e: ((e["full_name"] or "").casefold(), e["patient_id"] or ""), reverse=(order == "desc"))
+        elif order == "asc":
+            # Oldest visit first; patients with no visit on record still go last
+            entries = [e for e in reversed(entries) if e["last_visit"]] + [e for e in entries if not e["last_visit"]]
+        page = max(1, page)
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        start = (page - 1) * per_page
+        return {
+            "name": self._names[key],
+            "total": len(entries),
+            "page": page,
+            "per_page": per_page,
+            "pages": -(-len(entries) // per_page),
+            "sort": sort,
+            "order": order,
+            "patients": entries[start:start + per_page],
+        }
+
+
+class ProviderIndex:
+    """Provider panels and facility rosters over a list of parsed patients."""
+
+    def __init__(self, patients):
+        self.providers = RosterIndex()
+        self.facilities = RosterIndex()
+        for patient in patients:
+            # Assigned PCP: on the panel even without a visit on record
+            self.providers.add(patient.get("pcp_name"), patient)
+            for encounter in patient.get("recent_encounters") or []:
+                self.providers.add(encounter.get("provider"), patient, encounter.get("date"))
+                self.facilities.add(encounter.get("facility"), patient, encounter.get("date"))
+        self.providers.finish()
+        self.facilities.finish()
@@ -0,0 +1,151 @@
+"""
+30-day inpatient readmissions.
+
+Run from the repository root as a batch job:
+
+    python -m oneview_app.readmissions [--window-days 30] [--workers N] [--output report.json]
+
+Each patient's inpatient stays (encounter class IMP and its acute/non-acute
+variants) are sorted once by admission time. Stays that overlap, such as
+transfers, are merged. Then each adjacent pair is checked: an admission
+within the window after the previous discharge is a readmission. The report
+has a population summary, with discharges and readmissions per discharge
+month, and a per-patient entry that the detail page shows as a flag.
+"""
+import argparse
+import json
+import logging
+import os
+from oneview_app.batch import CHUNK_SIZE, map_patient_chunks
+from oneview_app.encounter_index import encounter_timestamp, iso_timestamp
+
+READMISSION_WINDOW_DAYS = 30
+# v3 ActEncounterCode values for an inpatient stay (plus the R5-style plain code)
+INPATIENT_CLASS_CODES = frozenset(["IMP", "ACUTE", "NONAC", "inpatient"])
+_DAY = 24 * 60 * 60
+
+
+def inpatient_stays(encounters):
+    """
+    Returns a patient's inpatient stays as sorted (admission, discharge)
+    timestamps, with overlapping stays merged. A stay with no usable end is
+    taken to be discharged on the day it started.
+    """
+    stays = []
+    for encounter in encounters:
+        if encounter.get("encounter_class") not in INPATIENT_CLASS_CODES:
+            continue
+        admitted = encounter_timestamp(encounter.get("date"))
+        if admitted is None:
+            continue
+        discharged = encounter_timestamp(encounter.get("end"))
+        stays.append((admitted, discharged if discharged is not None and discharged >= admitted else admitted))
+    stays.sort()
+    merged = []
+    for admitted, discharged in stays:
+        if merged and admitted <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], discharged))
+        else:
+            merged.append((admitted, discharged))
+    return merged
+
+
+def find_readmissions(stays, window_days=READMISSION_WINDOW_DAYS):
+    """Returns (discharge, readmission) timestamp pairs from adjacent sorted stays within window_days."""
+    window = window_days * _DAY
+    return [
+        (previous[1], current[0])
+        for previous, current in zip(stays, stays[1:])
+        if current[0] - previous[1] <= window
+    ]
+
+
+def analyze_patients(patients, window_days=READMISSION_WINDOW_DAYS):
+    """Returns an entry for every patient with an inpatient stay (one worker's share of the job)."""
+    entries = []
+    for patient in patients:
+        stays = inpatient_stays(patient.get("recent_encounters") or [])
+        if not stays:
+            continue
+        pairs = find_readmissions(stays, window_days)
+        entries.append({
+            "patient_id": patient.get("patient_id"),
+            "full_name": patient.get("full_name"),
+            "stays": len(stays),
+            "readmitted": bool(pairs),
+            "readmissions": [
+                {"discharge": iso_timestamp(discharge), "readmission": iso_timestamp(admission), "days_between": round((admission - discharge) / _DAY, 1)}
+                for discharge, admission in pairs
+            ],
+            # Discharge months, for the monthly summary
+            "discharge_months": [iso_timestamp(discharge)[:7] for _, discharge in stays],
+        })
+    return entries
+
+
+def summarize(entries, window_days=READMISSION_WINDOW_DAYS):
+    """Population summary of the per-patient entries, overall and by discharge month."""
+    by_month = {}
+    for entry in entries:
+        for month in entry["discharge_months"]:
+            by_month.setdefault(month, {"discharges": 0, "readmissions": 0})["discharges"] += 1
+        # A readmission counts against the month of the discharge it followed
+        for pair in entry["readmissions"]:
+            by_month[pair["discharge"][:7]]["readmissions"] += 1
+    discharges = sum(entry["stays"] for entry in entries)
+    readmissions = sum(len(entry["readmissions"]) for entry in entries)
+    for counts in by_month.values():
+        counts["rate"] = round(counts["readmissions"] / counts["discharges"], 4)
+    return {
+        "window_days": window_days,
+        "patients_with_inpatient_stays": len(entries),
+        "patients_readmitted": sum(1 for entry in entries if entry["readmitted"]),
+        "discharges": discharges,
+        "readmissions": readmissions,
+        "rate": round(readmissions / discharges, 4) if discharges else 0.0,
+        "by_month": dict(sorted(by_month.items())),
+    }
+
+
+def readmission_report(patients, window_days=READMISSION_WINDOW_DAYS, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Runs the readmission scan over every patient (in parallel when workers != 1)
+    and returns {"summary": ..., "patients": entries}, most readmissions first.
+    """
+    entries = map_patient_chunks(
+        analyze_patients, patients, ("patient_id", "full_name", "recent_encounters"), window_days,
+        workers=workers, chunk_size=chunk_size,
+    )
+    summary = summarize(entries, window_days)
+    entries.sort(key=lambda e: (-len(e["readmissions"]), -e["stays"], e["patient_id"] or ""))
+    return {"summary": summary, "patients": entries}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--window-days", type=int, default=READMISSION_WINDOW_DAYS, help="days after discharge that count as a readmission")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU; 1 runs inline)")
+    parser.add_argument("--data-dir", default=None, help="FHIR data directory (default: the app's data directory)")
+    parser.add_argument("--output", default=None, help="write the report as JSON to this file instead of printing the summary")
+    args = parser.parse_args(argv)
+
+    from oneview_app.fhir_parser import DATA_DIR, load_all_patients_data
+    patients = load_all_patients_data(args.data_dir or DATA_DIR)
+    report = readmission_report(patients, args.window_days, args.workers)
+    summary = report["summary"]
+    logging.info(f"Readmission report: {summary['readmissions']} readmissions after {summary['discharges']} discharges")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote the report for {len(report['patients'])} patients to {os.path.abspath(args.output)}")
+        return
+    print(f"{args.window_days}-day readmissions: {summary['readmissions']} / {summary['discharges']} discharges "
+          f"({summary['rate']:.1%}), {summary['patients_readmitted']} of {summary['patients_with_inpatient_stays']} inpatients")
+    print(f"{'month':<8} {'discharges':>10} {'readmissions':>12} {'rate':>7}")
+    for month, counts in summary["by_month"].items():
+        print(f"{month:<8} {counts['discharges']:>10} {counts['readmissions']:>12} {counts['rate']:>7.1%}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,116 @@
+import unittest
+import gzip
+import io
+import json
+import os
+import tarfile
+import tempfile
+import mmap
+from oneview_app.bundle_sources import is_bundle_source, iter_bundle_files, map_bundle_file, scan_bundle_sources
+from oneview_app.fhir_parser import load_all_patients_data
+from oneview_app.ingest_report import IngestReport
+from oneview_app.test_fhir_parser import MOCK_PATIENT_BUNDLE_MINIMAL, MOCK_PATIENT_BUNDLE_NO_PCP_IN_ENCOUNTER
+
+
+def _bundle_bytes(bundle):
+    return json.dumps(bundle).encode("utf-8")
+
+
+def _add_tar_member(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    archive.addfile(info, io.BytesIO(data))
+
+
+class TestBundleSources(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_gzip_bundle(self, filename, bundle):
+        with gzip.open(os.path.join(self.data_directory, filename), "wb") as f:
+            f.write(_bundle_bytes(bundle))
+
+    def write_archive(self, filename, mode, members):
+        with tarfile.open(os.path.join(self.data_directory, filename), mode) as archive:
+            for name, data in members:
+                _add_tar_member(archive, name, data)
+
+    def test_is_bundle_source(self):
+        for name in ("a.json", "a.json.gz", "drop.tar", "drop.tar.gz", "drop.tgz"):
+            self.assertTrue(is_bundle_source(name), name)
+        for name in ("notes.txt", "a.gz", ".gitignore"):
+            self.assertFalse(is_bundle_source(name), name)
+
+    def test_gzip_bundle_is_loaded(self):
+        self.write_gzip_bundle("minimal.json.gz", MOCK_PATIENT_BUNDLE_MINIMAL)
+        patients = load_all_patients_data(self.data_directory)
+        self.assertEqual([p["patient_id"] for p in patients], ["patient-2"])
+
+    def test_tar_gz_archive_members_are_loaded(self):
+        self.write_archive("synthea.tar.gz", "w:gz", [
+            ("fhir/minimal.json", _bundle_bytes(MOCK_PATIENT_BUNDLE_MINIMAL)),
+            ("fhir/alice.json.gz", gzip.compress(_bundle_bytes(MOCK_PATIENT_BUNDLE_NO_PCP_IN_ENCOUNTER))),
+            ("fhir/README.txt", b"not a bundle"),
+        ])
+        for reader in ("json", "stream", "filtered", "mmap"):
+            patients = load_all_patients_data(self.data_directory, reader=reader)
+            self.assertEqual(sorted(p["patient_id"] for p in patients), ["patient-2", "patient-3"], reader)
+
+    def test_member_names_are_labelled_with_archive(self):
+        self.write_archive("drop.tar", "w", [("a/minimal.json", _bundle_bytes(MOCK_PATIENT_BUNDLE_MINIMAL))])
+        names = [name for name, _ in iter_bundle_files(self.data_directory, ["drop.tar"])]
+        self.assertEqual(names, ["drop.tar:a/minimal.json"])
+
+    def test_corrupt_sources_do_not_stop_loading(self):
+        with open(os.path.join(self.data_directory, "broken.tar.gz"), "wb") as f:
+            f.write(b"definitely not a tarball")
+        with open(os.path.join(self.data_directory, "broken.json.gz"), "wb") as f:
+            f.write(b"definitely not gzip")
+        self.write_gzip_bundle("minimal.json.gz", MOCK_PATIENT_BUNDLE_MINIMAL)
+        with self.assertLogs(level="ERROR"):
+            patients = load_all_patients_data(self.data_directory, reader="stream")
+        self.assertEqual([p["patient_id"] for p in patients], ["patient-2"])
+
+    def test_scan_bundle_sources_reports_sizes(self):
+        self.write_gzip_bundle("minimal.json.gz", MOCK_PATIENT_BUNDLE_MINIMAL)
+        os.mkdir(os.path.join(self.data_directory, "subdir.json"))
+        with open(os.path.join(self.data_directory, "notes.txt"), "w") as f:
+            f.write("skip me")
+        size = os.path.getsize(os.path.join(self.data_directory, "minimal.json.gz"))
+        self.assertEqual(scan_bundle_sources(self.data_directory), [("minimal.json.gz", size)])
+
+    def test_map_bundle_file(self):
+        path = os.path.join(self.data_directory, "minimal.json")
+        with open(path, "wb") as f:
+            f.write(_bundle_bytes(MOCK_PATIENT_BUNDLE_MINIMAL))
+        with open(path, "rb") as f:
+            data = map_bundle_file(f)
+            self.assertIsInstance(data, mmap.mmap)
+            self.assertEqual(data[:], _bundle_bytes(MOCK_PATIENT_BUNDLE_MINIMAL))
+            data.close()
+        self.write_gzip_bundle("minimal.json.gz", MOCK_PATIENT_BUNDLE_MINIMAL)
+        for _, fp in iter_bundle_files(self.data_directory, ["minimal.json.gz"]):
+            self.assertEqual(map_bundle_file(fp), _bundle_bytes(MOCK_PATIENT_BUNDLE_MINIMAL))
+
+    def test_mmap_reader_copies_fewer_bytes(self):
+        with open(os.path.join(self.data_directory, "minimal.json"), "wb") as f:
+            f.write(_bundle_bytes(MOCK_PATIENT_BUNDLE_MINIMAL))
+        copied = {}
+        for reader in ("json", "mmap"):
+            report = IngestReport()
+            patients = load_all_patients_data(self.data_directory, reader=reader, report=report)
+            self.assertEqual([p["patient_id"] for p in patients], ["patient-2"])
+            self.assertEqual(report.files, 1)
+            self.assertEqual(report.patients, 1)
+            copied[reader] = report.bytes_copied
+        self.assertEqual(copied["json"], report.bytes_on_disk)
+        self.assertLess(copied["mmap"], copied["json"])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,102 @@
+import unittest
+import copy
+from unittest import mock
+from oneview_app import app as app_module
+from oneview_app.clinical_text_index import ClinicalTextIndex, tokenize
+
+MOCK_CLINICAL_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Ann Lee",
+        "diagnoses": [{"description": "Childhood asthma"}, {"description": "Hypertension"}],
+        "medications": [{"name": "Albuterol 0.09 MG/ACTUAT inhaler"}],
+        "recent_encounters": [{"type": "Asthma follow-up", "primary_diagnosis_text": "Childhood asthma"}],
+    },
+    {
+        "patient_id": "p1", "full_name": "Bo Diaz",
+        "diagnoses": [{"description": "Asthmatic bronchitis"}],
+        "medications": None,
+        "recent_encounters": [{"type": "Emergency room admission", "primary_diagnosis_text": None}],
+    },
+    {
+        "patient_id": "p2", "full_name": "Cy Moss",
+        "diagnoses": [],
+        "medications": [{"name": "Lisinopril 10 MG"}],
+        "recent_encounters": [{"type": "General examination", "primary_diagnosis_text": "Asthma"}],
+    },
+]
+
+
+class TestClinicalTextIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ClinicalTextIndex(MOCK_CLINICAL_PATIENTS)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Albuterol 0.09 MG/ACTUAT"), ["albuterol", "09", "mg", "actuat"])
+
+    def test_ranked_hits(self):
+        hits = self.index.search("asthma")
+        self.assertEqual([h[0] for h in hits], ["p0", "p2"])
+        self.assertGreater(hits[0][1], hits[1][1])
+        self.assertIn(("diagnosis", "Childhood asthma"), hits[0][2])
+
+    def test_prefix_query(self):
+        self.assertEqual(sorted(h[0] for h in self.index.search("asth*")), ["p0", "p1", "p2"])
+        self.assertEqual([h[0] for h in self.index.search("albu* inhaler")], ["p0"])
+
+    def test_one_character_prefix(self):
+        self.assertEqual(self.index.expand("l", prefix=True), ["lisinopril"])
+        self.assertEqual([h[0] for h in self.index.search("l*")], ["p2"])
+        self.assertEqual([h[0] for h in self.index.search("asthma l*")], ["p2"])
+        self.assertEqual(self.index.search("x*"), [])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual([h[0] for h in self.index.search("asthma lisinopril")], ["p2"])
+        self.assertEqual(self.index.search("asthma warfarin"), [])
+        self.assertEqual(self.index.search(""), [])
+
+    def test_incremental_update(self):
+        patients = copy.deepcopy(MOCK_CLINICAL_PATIENTS)
+        patients[1]["diagnoses"] = [{"description": "Seasonal allergic rhinitis"}]
+        del patients[2]
+        patients.append({"patient_id": "p3", "diagnoses": [{"description": "Asthma"}]})
+        changes = self.index.update(patients)
+        self.assertEqual(changes, {"added": 1, "updated": 1, "removed": 1, "unchanged": 1})
+        self.assertEqual(sorted(h[0] for h in self.index.search("asth*")), ["p0", "p3"])
+        self.assertEqual([h[0] for h in self.index.search("rhinitis")], ["p1"])
+        self.assertEqual(self.index.search("lisinopril"), [])
+        self.assertEqual(self.index.expand("bronch", prefix=True), [])
+
+
+class TestClinicalSearchRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = (app_module.clinical_text_index, app_module.patients_by_id)
+        app_module.clinical_text_index = ClinicalTextIndex(MOCK_CLINICAL_PATIENTS)
+        app_module.patients_by_id = {p["patient_id"]: p for p in MOCK_CLINICAL_PATIENTS}
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.clinical_text_index, app_module.patients_by_id = self._saved
+
+    def test_clinical_search(self):
+        data = self.client.get("/clinical_search?q=asthma").get_json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["hits"][0]["patient_id"], "p0")
+        self.assertEqual(data["hits"][0]["full_name"], "Ann Lee")
+
+    def test_reload_updates_index_incrementally(self):
+        patients = copy.deepcopy(MOCK_CLINICAL_PATIENTS)
+        patients[2]["medications"] = [{"name": "Metformin 500 MG"}]
+        with mock.patch.object(app_module, "load_all_patients_data", return_value=patients), \
+                mock.patch.object(app_module, "all_patients_data", MOCK_CLINICAL_PATIENTS), \
+                mock.patch.object(app_module, "cohort_index"), mock.patch.object(app_module, "search_index"), \
+                mock.patch.object(app_module, "reload_listeners", []):
+            data = self.client.post("/reload").get_json()
+            self.assertEqual(data["clinical_text_index"], {"added": 0, "updated": 1, "removed": 0, "unchanged": 2})
+            self.assertEqual(self.client.get("/clinical_search?q=metformin").get_json()["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,114 @@
+import unittest
+from oneview_app import app as app_module
+from oneview_app.cohort_index import CohortIndex, intersect_postings, union_postings
+
+DIABETES = "44054006"
+HYPERTENSION = "59621000"
+
+MOCK_COHORT_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Ann Lee", "dob": "1950-02-01", "gender": "female",
+        "insurance": "Medicare", "pcp_name": "Dr. Kim",
+        "diagnoses": [{"code": DIABETES, "status": "active"}, {"code": HYPERTENSION, "status": "resolved"}],
+        "medications": [{"name": "24 HR Metformin hydrochloride 500 MG", "status": "active"}],
+    },
+    {
+        "patient_id": "p1", "full_name": "Bo Diaz", "dob": "1972-07-30", "gender": "male",
+        "insurance": "Medicaid", "pcp_name": "Dr. Kim",
+        "diagnoses": [{"code": DIABETES, "status": "active"}],
+        "medications": [{"name": "Insulin Glargine", "status": "active"}, {"name": "24 HR Metformin hydrochloride 500 MG", "status": "stopped"}],
+    },
+    {
+        "patient_id": "p2", "full_name": "Cy Moss", "dob": "1988-12-12", "gender": "male",
+        "insurance": "Medicare", "pcp_name": "Dr. Ng",
+        "diagnoses": [{"code": HYPERTENSION, "status": "active"}],
+        "medications": None,
+    },
+    {
+        "patient_id": "p3", "full_name": "Di Park", "dob": "1950-02-01", "gender": "female",
+        "insurance": "medicare ", "pcp_name": None,
+        "diagnoses": [{"code": DIABETES, "status": "resolved"}],
+        "medications": [{"name": "24 HR Metformin hydrochloride 500 MG", "status": "active"}],
+    },
+]
+
+
+def _ids(patients):
+    return [p["patient_id"] for p in patients]
+
+
+class TestPostingLists(unittest.TestCase):
+
+    def test_intersect_postings(self):
+        self.assertEqual(intersect_postings([[1, 3, 5, 7, 9], [3, 4, 9], [0, 3, 9, 10]]), [3, 9])
+        self.assertEqual(intersect_postings([[1, 2], []]), [])
+        self.assertEqual(intersect_postings([]), [])
+
+    def test_union_postings(self):
+        self.assertEqual(union_postings([[1, 4], [2, 4, 8]]), [1, 2, 4, 8])
+
+
+class TestCohortIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CohortIndex(MOCK_COHORT_PATIENTS)
+
+    def test_active_diabetics_on_metformin_with_plan(self):
+        metformin = self.index.keys_containing("active_medication", "metformin")
+        patients = self.index.query(active_diagnosis_code=DIABETES, active_medication=metformin, insurance="Medicare")
+        self.assertEqual(_ids(patients), ["p0"])
+
+    def test_values_are_normalized(self):
+        self.assertEqual(_ids(self.index.query(insurance="MEDICARE")), ["p0", "p2", "p3"])
+
+    def test_or_within_field_and_across_fields(self):
+        self.assertEqual(_ids(self.index.query(insurance=["Medicaid", "Medicare"], gender="male")), ["p1", "p2"])
+        self.assertEqual(_ids(self.index.query(diagnosis_code=DIABETES, pcp_name="Dr. Kim")), ["p0", "p1"])
+
+    def test_dob_range(self):
+        self.assertEqual(_ids(self.index.query(dob_from="1950-01-01", dob_to="1972-12-31")), ["p0", "p1", "p3"])
+        self.assertEqual(_ids(self.index.query(dob_to="1950-02-01", gender="female")), ["p0", "p3"])
+
+    def test_no_criteria_and_no_match(self):
+        self.assertEqual(len(self.index.query()), 4)
+        self.assertEqual(self.index.query(insurance="Unknown Plan"), [])
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.index.query(blood_type="O+")
+
+
+class TestCohortRoute(unittest.TestCase):
+
+    def setUp(self):
+        self._original_index = app_module.cohort_index
+        app_module.cohort_index = CohortIndex(MOCK_COHORT_PATIENTS)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.cohort_index = self._original_index
+
+    def test_cohort_query(self):
+        response = self.client.get(f"/cohort?active_diagnosis_code={DIABETES}&active_medication_contains=metformin&insurance=Medicare")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["count"], 1)
+        self.assertEqual(response.get_json()["patients"][0]["patient_id"], "p0")
+
+    def test_unmatched_fragment_returns_nothing(self):
+        response = self.client.get("/cohort?medication_contains=warfarin")
+        self.assertEqual(response.get_json()["count"], 0)
+
+    def test_exact_dob(self):
+        data = self.client.get("/cohort?dob=1950-02-01&gender=female").get_json()
+        self.assertEqual([p["patient_id"] for p in data["patients"]], ["p0", "p3"])
+
+    def test_unknown_and_invalid_parameters_are_rejected(self):
+        response = self.client.get(f"/cohort?diagnosis={DIABETES}")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("diagnosis", response.get_json()["error"])
+        self.assertEqual(self.client.get("/cohort?age_min=old").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
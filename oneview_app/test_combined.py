@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+from werkzeug.test import Client
+from oneview_app import app as oneview
+from oneview_app import combined
+from longview_app import app as longview
+
+MOCK_SHARED_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Walter White", "dob": "1959-09-07", "gender": "male",
+        "recent_encounters": [{"date": "2023-03-15T10:00:00Z", "type": "Office visit", "facility": "Albuquerque General"}],
+        "diagnoses": [{"code": "44054006", "description": "Diabetes", "status": "active", "onset": "2010-01-01"}],
+        "medications": [],
+        "observations": {},
+        "active_condition_count": 1,
+    },
+]
+
+
+class TestSharedDataset(unittest.TestCase):
+
+    def test_longview_serves_oneviews_records(self):
+        self.assertIs(longview.all_patients_data, oneview.all_patients_data)
+        self.assertIs(longview.patients_by_id, oneview.patients_by_id)
+        self.assertIs(longview.search_index, oneview.search_index)
+        self.assertIn(longview.use_patients, oneview.reload_listeners)
+
+    def test_projection_keeps_view_fields_and_shares_lists(self):
+        projected = longview.project_patient(MOCK_SHARED_PATIENTS[0])
+        self.assertEqual(set(projected), set(longview.PATIENT_FIELDS))
+        self.assertNotIn("observations", projected)
+        self.assertIsNone(projected["address_full"])
+        self.assertIs(projected["recent_encounters"], MOCK_SHARED_PATIENTS[0]["recent_encounters"])
+
+
+class TestCombinedApplication(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = longview.all_patients_data, longview.patients_by_id, longview.search_index, longview.timelines
+        longview.use_patients(MOCK_SHARED_PATIENTS)
+        self.client = Client(combined.application)
+
+    def tearDown(self):
+        longview.all_patients_data, longview.patients_by_id, longview.search_index, longview.timelines = self._originals
+
+    def test_longview_is_mounted_over_the_shared_records(self):
+        response = self.client.get(f"{combined.LONGVIEW_PREFIX}/patients/p0/timeline")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e["kind"] for e in response.get_json()["events"]], ["condition_onset", "encounter"])
+        page = self.client.get(f"{combined.LONGVIEW_PREFIX}/?patient_id=p0").get_data(as_text=True)
+        self.assertIn(f'href="{combined.LONGVIEW_PREFIX}/" class="back-link"', page)
+
+    def test_longview_search_uses_the_index(self):
+        with mock.patch.object(longview.search_index, "search", wraps=longview.search_index.search) as search:
+            page = self.client.post(f"{combined.LONGVIEW_PREFIX}/", data={"search_query": "WALTER"}).get_data(as_text=True)
+        search.assert_called_once_with(text="WALTER")
+        self.assertIn("Walter White", page)
+
+    def test_oneview_is_mounted_at_the_root(self):
+        self.assertEqual(self.client.get("/dashboard.json").status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,104 @@
+import random
+import unittest
+from oneview_app import app as app_module
+from oneview_app.condition_index import ConditionIntervalIndex, IntervalTree, condition_interval
+
+MOCK_CONDITION_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Walter White",
+        "diagnoses": [
+            {"code": "59621000", "description": "Essential hypertension", "status": "active", "onset": "2015-06-01T08:00:00Z", "abatement": None},
+            {"code": "44465007", "description": "Sprained Ankle", "status": "resolved", "onset": "2021-02-01", "abatement": "2021-03-15"},
+            {"code": "10509002", "description": "Acute bronchitis", "status": "resolved", "onset": "2020-01-10", "abatement": None},
+        ],
+    },
+    {
+        "patient_id": "p1", "full_name": "Jesse Pinkman",
+        "diagnoses": [
+            {"code": "44465007", "description": "Sprained Ankle", "status": "resolved", "onset": "2021-03-01", "abatement": "2021-04-01"},
+            {"code": "38341003", "description": "Hypertension", "status": "active", "onset": None, "abatement": None},
+            {"code": "1", "description": "Unreadable onset", "status": "active", "onset": "Invalid Date String", "abatement": None},
+        ],
+    },
+]
+
+
+def _codes(hits):
+    return [(patient["patient_id"], condition["code"]) for patient, condition in hits]
+
+
+class TestIntervalTree(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        intervals = []
+        for n in range(300):
+            start = rng.randrange(1000)
+            intervals.append((start, start + rng.randrange(1, 120), n))
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            start = rng.randrange(-50, 1150)
+            end = start + rng.choice([0, 0, rng.randrange(200)])
+            expected = sorted(n for s, e, n in intervals if s <= end and e > start)
+            self.assertEqual(sorted(tree.overlapping(start, end)), expected)
+
+    def test_half_open(self):
+        tree = IntervalTree([(10, 20, "a")])
+        self.assertEqual(tree.overlapping(10, 10), ["a"])
+        self.assertEqual(tree.overlapping(20, 20), [])
+
+
+class TestConditionIntervalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ConditionIntervalIndex(MOCK_CONDITION_PATIENTS)
+
+    def test_intervals(self):
+        self.assertIsNone(condition_interval({"onset": "2020-01-01", "abatement": "2019-01-01"}))
+        self.assertIsNone(condition_interval({"status": "resolved"}))
+        self.assertEqual(len(self.index), 5)
+
+    def test_active_on_date(self):
+        self.assertEqual(_codes(self.index.active_on("2021-03-10")),
+                         [("p0", "59621000"), ("p0", "44465007"), ("p1", "44465007"), ("p1", "38341003")])
+        # Abatement is exclusive; a resolved condition with no abatement counts on its onset day only
+        self.assertEqual(_codes(self.index.active_on("2021-03-15T00:00:00Z")), [("p0", "59621000"), ("p1", "44465007"), ("p1", "38341003")])
+        self.assertIn(("p0", "10509002"), _codes(self.index.active_on("2020-01-10")))
+        self.assertNotIn(("p0", "10509002"), _codes(self.index.active_on("2020-01-11")))
+
+    def test_range_and_patient(self):
+        self.assertEqual(_codes(self.index.active_between("2010-01-01", "2014-12-31")), [("p1", "38341003")])
+        self.assertEqual(_codes(self.index.active_between("2021-01-01", "2021-12-31", patient_id="p1")),
+                         [("p1", "44465007"), ("p1", "38341003")])
+        self.assertEqual(self.index.active_on("2021-01-01", patient_id="nobody"), [])
+
+    def test_invalid_dates(self):
+        with self.assertRaises(ValueError):
+            self.index.active_on("last year")
+        with self.assertRaises(ValueError):
+            self.index.active_between("2021-01-01", "2020-01-01")
+
+
+class TestActiveConditionsRoute(unittest.TestCase):
+
+    def setUp(self):
+        self._original_index = app_module.condition_index
+        app_module.condition_index = ConditionIntervalIndex(MOCK_CONDITION_PATIENTS)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.condition_index = self._original_index
+
+    def test_active_as_of(self):
+        data = self.client.get('/conditions/active?date=2021-03-10&code=44465007').get_json()
+        self.assertEqual((data["count"], data["patient_count"]), (2, 2))
+        self.assertEqual(data["conditions"][0]["onset"], "2021-02-01")
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/conditions/active').status_code, 400)
+        self.assertEqual(self.client.get('/conditions/active?date=soon').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,100 @@
+import unittest
+from datetime import date, timedelta
+from oneview_app import app as app_module
+from oneview_app import demographics
+from oneview_app.cohort_index import CohortIndex
+from oneview_app.demographics import UNKNOWN_DOB, DobArray, age_from_key, dob_key
+from oneview_app.population_aggregates import AGE_BANDS
+
+TODAY = date(2024, 2, 29)
+
+MOCK_DEMOGRAPHIC_PATIENTS = [
+    {"patient_id": "p0", "dob": "1959-09-07", "gender": "male"},
+    {"patient_id": "p1", "dob": "2006-02-28", "gender": "female"},  # 18 the day before TODAY
+    {"patient_id": "p2", "dob": "2006-03-01", "gender": "female"},  # 18 the day after TODAY
+    {"patient_id": "p3", "dob": None, "gender": "male"},
+    {"patient_id": "p4", "dob": "2020-02-29", "gender": "male"},    # Leap-day birthday on a leap day
+    {"patient_id": "p5", "dob": "2030-01-01", "gender": "female"},  # In the future
+    {"patient_id": "p6", "dob": "1920-01-01", "gender": "female"},
+]
+
+
+class TestDobKey(unittest.TestCase):
+
+    def test_dob_key(self):
+        self.assertEqual(dob_key("1959-09-07"), 19590907)
+        self.assertEqual(dob_key("1959-09-07T00:00:00Z"), 19590907)
+        for invalid in (None, "", "invalid-date", "2000-13-01"):
+            self.assertEqual(dob_key(invalid), UNKNOWN_DOB, invalid)
+
+    def test_age_from_key(self):
+        self.assertEqual(age_from_key(dob_key("2006-02-28"), TODAY), 18)
+        self.assertEqual(age_from_key(dob_key("2006-03-01"), TODAY), 17)
+        self.assertEqual(age_from_key(dob_key("2020-02-29"), TODAY), 4)
+        self.assertEqual(age_from_key(dob_key("2020-02-29"), date(2025, 2, 28)), 4)
+        self.assertEqual(age_from_key(dob_key("2020-02-29"), date(2025, 3, 1)), 5)
+        self.assertIsNone(age_from_key(UNKNOWN_DOB, TODAY))
+        self.assertIsNone(age_from_key(dob_key("2030-01-01"), TODAY))
+
+
+class TestDobArray(unittest.TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        self.dobs = DobArray(MOCK_DEMOGRAPHIC_PATIENTS, use_numpy=self.use_numpy)
+
+    def test_ages_match_the_scalar_calculation(self):
+        expected = [age_from_key(dob_key(p["dob"]), TODAY) for p in MOCK_DEMOGRAPHIC_PATIENTS]
+        self.assertEqual(self.dobs.ages(TODAY), [-1 if age is None else age for age in expected])
+
+    def test_age_band_counts(self):
+        self.assertEqual(
+            self.dobs.age_band_counts(AGE_BANDS, TODAY),
+            {"0-17": 2, "18-34": 1, "35-49": 0, "50-64": 1, "65+": 1, None: 2},
+        )
+
+    def test_age_band_counts_match_the_positions_on_every_day(self):
+        day = date(2023, 12, 25)
+        for _ in range(90):
+            counts = self.dobs.age_band_counts(AGE_BANDS, day)
+            for label, lowest, highest in AGE_BANDS:
+                self.assertEqual(counts[label], len(self.dobs.positions_in_age_range(lowest, highest, day)), (label, day))
+            day += timedelta(days=1)
+
+    def test_positions_in_age_range(self):
+        self.assertEqual(self.dobs.positions_in_age_range(18, 18, TODAY), [1])
+        self.assertEqual(self.dobs.positions_in_age_range(None, 17, TODAY), [2, 4])
+        self.assertEqual(self.dobs.positions_in_age_range(64, None, TODAY), [0, 6])
+        self.assertEqual(self.dobs.positions_in_age_range(None, None, TODAY), [0, 1, 2, 4, 6])
+        self.assertEqual(self.dobs.positions_in_age_range(30, 20, TODAY), [])
+
+
+@unittest.skipIf(demographics.numpy is None, "numpy is not installed")
+class TestDobArrayNumpy(TestDobArray):
+    use_numpy = True
+
+    def test_uses_numpy(self):
+        self.assertTrue(self.dobs.use_numpy)
+
+
+class TestCohortAgeFilter(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = app_module.cohort_index, app_module.dob_array
+        app_module.cohort_index = CohortIndex(MOCK_DEMOGRAPHIC_PATIENTS)
+        app_module.dob_array = DobArray(MOCK_DEMOGRAPHIC_PATIENTS)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.cohort_index, app_module.dob_array = self._originals
+
+    def test_age_range_combines_with_other_criteria(self):
+        response = self.client.get("/cohort?age_min=100&gender=female")
+        self.assertEqual([p["patient_id"] for p in response.get_json()["patients"]], ["p6"])
+        response = self.client.get("/cohort?age_min=40&gender=male")
+        self.assertEqual([p["patient_id"] for p in response.get_json()["patients"]], ["p0"])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,85 @@
+import unittest
+from oneview_app import app as app_module
+from oneview_app.cohort_index import CohortIndex
+from oneview_app.derived_fields import apply_derived_fields, derive_fields
+from oneview_app.fhir_parser import parse_fhir_bundle
+from oneview_app.test_fhir_parser import MOCK_PATIENT_BUNDLE_FULL
+
+MOCK_DERIVED_PATIENT = {
+    "patient_id": "p1",
+    "full_name": "Walter White",
+    "recent_encounters": [
+        {"date": "2021-05-01T09:00:00Z", "type": "General examination of patient (procedure)"},
+        {"date": "2023-02-10T09:00:00-07:00", "type": "Emergency room admission (procedure)"},
+        {"date": "2019-05-01", "type": "Well child visit (procedure)"},
+        {"date": "Invalid Date String", "type": "Encounter for check up (procedure)"},
+    ],
+    "diagnoses": [
+        {"code": "44054006", "status": "active"},
+        {"code": "44054006", "status": "active"},  # Recorded twice: one condition
+        {"code": "59621000", "status": "recurrence"},
+        {"code": "195662009", "status": "resolved"},
+    ],
+    "medications": [
+        {"name": "Metformin", "status": "active"},
+        {"name": "Lisinopril", "status": "stopped"},
+    ],
+}
+
+
+class TestDerivedFields(unittest.TestCase):
+
+    def test_derive_fields(self):
+        self.assertEqual(derive_fields(MOCK_DERIVED_PATIENT), {
+            "last_wellness_visit": "2021-05-01T09:00:00Z",
+            "last_encounter_date": "2023-02-10T09:00:00-07:00",
+            "active_condition_count": 2,
+            "active_medication_count": 1,
+        })
+
+    def test_empty_patient(self):
+        self.assertEqual(derive_fields({}), {
+            "last_wellness_visit": None, "last_encounter_date": None,
+            "active_condition_count": 0, "active_medication_count": 0,
+        })
+
+    def test_parse_fhir_bundle_runs_the_stage(self):
+        parsed = parse_fhir_bundle(MOCK_PATIENT_BUNDLE_FULL)
+        self.assertEqual(parsed["last_encounter_date"], "2023-03-20T14:00:00Z")
+        self.assertEqual(parsed["last_wellness_visit"], "2023-01-15T10:00:00Z")  # "Routine Checkup"
+        self.assertEqual((parsed["active_condition_count"], parsed["active_medication_count"]), (1, 2))
+
+    def test_cohort_on_derived_counts(self):
+        patient = apply_derived_fields(dict(MOCK_DERIVED_PATIENT))
+        index = CohortIndex([patient, {"patient_id": "p2", "active_medication_count": 0}])
+        self.assertEqual([p["patient_id"] for p in index.query(active_condition_count="2")], ["p1"])
+
+
+class TestDetailPage(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = app_module.all_patients_data, app_module.patients_by_id
+        patient = apply_derived_fields(dict(MOCK_DERIVED_PATIENT))
+        app_module.all_patients_data = [patient]
+        app_module.patients_by_id = {patient["patient_id"]: patient}
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.all_patients_data, app_module.patients_by_id = self._originals
+
+    def test_shows_derived_fields(self):
+        response = self.client.get('/?patient_id=p1')
+        self.assertIn(b"Date of Last Wellness Visit:</strong> 2021-05-01T09:00:00Z", response.data)
+        self.assertIn(b"Active Conditions / Medications:</strong> 2 / 1", response.data)
+
+    def test_encounters_sort_on_store_timestamps(self):
+        page = self.client.get('/?patient_id=p1').get_data(as_text=True)
+        # Newest first across offsets and date-only values; the unparseable date goes last
+        dates = ["2023-02-10T09:00:00-07:00", "2021-05-01T09:00:00Z", "2019-05-01", "Invalid Date String"]
+        positions = [page.rindex(date) for date in dates]  # Last mention: the encounter table follows the summary
+        self.assertEqual(positions, sorted(positions))
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
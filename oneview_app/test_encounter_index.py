@@ -0,0 +1,139 @@
+import unittest
+from datetime import datetime, timezone
+from oneview_app import app as app_module
+from oneview_app import encounter_index
+from oneview_app.encounter_index import EncounterStore, EncounterTimeIndex, encounter_timestamp
+
+MOCK_ENCOUNTER_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Walter White",
+        "recent_encounters": [
+            {"date": "2023-03-15T10:00:00Z", "type": "Office visit", "facility": "Albuquerque General", "provider": "Dr. A"},
+            {"date": "2023-04-01", "type": "Emergency", "facility": "Albuquerque General", "provider": "Dr. B"},
+            {"date": "Invalid Date String", "type": "Office visit", "facility": "Albuquerque General"},
+        ],
+    },
+    {
+        "patient_id": "p1", "full_name": "Jesse Pinkman",
+        "recent_encounters": [
+            {"date": "2023-03-31", "type": "office visit", "facility": "Cancer Center", "provider": "Dr. C"},
+            {"date": "2023-03-01T23:30:00-05:00", "type": "Emergency", "facility": "Albuquerque General"},
+        ],
+    },
+    {"patient_id": "p2", "full_name": "Skyler White", "recent_encounters": []},
+]
+
+
+def _dates(hits):
+    return [encounter["date"] for _, encounter in hits]
+
+
+class TestEncounterTimeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = EncounterTimeIndex(MOCK_ENCOUNTER_PATIENTS)
+
+    def test_timestamps(self):
+        self.assertEqual(encounter_timestamp("1970-01-02"), 86400)
+        self.assertEqual(encounter_timestamp("1970-01-01", end_of_day=True), 86399)
+        self.assertEqual(encounter_timestamp("1970-01-01T00:00:00-01:00"), 3600)
+        self.assertIsNone(encounter_timestamp("Invalid Date String"))
+
+    def test_rows_are_sorted_and_skip_bad_dates(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(list(self.index.timestamps), sorted(self.index.timestamps))
+
+    def test_month_range_includes_last_day(self):
+        hits = self.index.query_dates(date_from="2023-03-01", date_to="2023-03-31")
+        # 23:30 at UTC-5 on March 1st is March 2nd in UTC
+        self.assertEqual(_dates(hits), ["2023-03-01T23:30:00-05:00", "2023-03-15T10:00:00Z", "2023-03-31"])
+
+    def test_filters(self):
+        hits = self.index.query_dates(date_from="2023-03-01", date_to="2023-03-31", facility="albuquerque general")
+        self.assertEqual([p["patient_id"] for p, _ in hits], ["p1", "p0"])
+        hits = self.index.query_dates(encounter_type="OFFICE VISIT")
+        self.assertEqual(_dates(hits), ["2023-03-15T10:00:00Z", "2023-03-31"])
+        self.assertEqual(self.index.query_dates(facility="Nowhere"), [])
+
+    def test_last_days(self):
+        now = datetime(2023, 4, 2, tzinfo=timezone.utc)
+        self.assertEqual(_dates(self.index.query_dates(last_days=7, now=now)), ["2023-03-31", "2023-04-01"])
+
+    def test_invalid_date_raises(self):
+        with self.assertRaises(ValueError):
+            self.index.query_dates(date_from="March")
+
+
+class TestEncounterStore(unittest.TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        self.store = EncounterStore(MOCK_ENCOUNTER_PATIENTS, use_numpy=self.use_numpy)
+
+    def test_rows_are_grouped_by_patient(self):
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(list(self.store.offsets), [0, 3, 5, 5])
+        self.assertEqual(list(self.store.patient_positions), [0, 0, 0, 1, 1])
+
+    def test_patient_encounters_keep_undated_last(self):
+        self.assertEqual([e["date"] for e in self.store.patient_encounters(0)],
+                         ["2023-03-15T10:00:00Z", "2023-04-01", "Invalid Date String"])
+        self.assertEqual([e["date"] for e in self.store.patient_encounters(1, descending=True)],
+                         ["2023-03-31", "2023-03-01T23:30:00-05:00"])
+        self.assertEqual(self.store.patient_encounters(2), [])
+
+    def test_rows_where_and_counts(self):
+        rows = self.store.rows_where(facility="ALBUQUERQUE GENERAL")
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(self.store.counts("type", rows), [("Office visit", 2), ("Emergency", 2)])
+        rows = self.store.rows_where(encounter_timestamp("2023-03-01"), encounter_timestamp("2023-03-31", end_of_day=True))
+        self.assertEqual(self.store.counts("facility", rows), [("Albuquerque General", 2), ("Cancer Center", 1)])
+        self.assertEqual(self.store.rows_where(provider="Dr. Nobody"), [])
+        with self.assertRaises(ValueError):
+            self.store.rows_where(ward="ICU")
+
+    def test_time_index_shares_the_store(self):
+        index = EncounterTimeIndex(MOCK_ENCOUNTER_PATIENTS, self.store)
+        self.assertIs(index.store, self.store)
+        self.assertEqual(_dates(index.query(provider="dr. c")), ["2023-03-31"])
+
+
+@unittest.skipIf(encounter_index.numpy is None, "numpy is not installed")
+class TestEncounterStoreNumpy(TestEncounterStore):
+    use_numpy = True
+
+    def test_uses_numpy(self):
+        self.assertTrue(self.store.use_numpy)
+
+
+class TestEncountersRoute(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = app_module.encounter_store, app_module.encounter_index
+        app_module.encounter_store = EncounterStore(MOCK_ENCOUNTER_PATIENTS)
+        app_module.encounter_index = EncounterTimeIndex(MOCK_ENCOUNTER_PATIENTS, app_module.encounter_store)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.encounter_store, app_module.encounter_index = self._originals
+
+    def test_range_query(self):
+        data = self.client.get('/encounters?from=2023-03-01&to=2023-03-31&type=Emergency').get_json()
+        self.assertEqual((data["count"], data["patient_count"]), (1, 1))
+        self.assertEqual(data["encounters"][0]["patient_id"], "p1")
+
+    def test_bad_date(self):
+        self.assertEqual(self.client.get('/encounters?from=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/encounters?days=abc').status_code, 400)
+        self.assertEqual(self.client.get('/encounters/summary?to=yesterday').status_code, 400)
+
+    def test_summary(self):
+        data = self.client.get('/encounters/summary?by=facility&type=office%20visit').get_json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(data["counts"], [{"value": "Albuquerque General", "encounters": 2}, {"value": "Cancer Center", "encounters": 1}])
+        self.assertEqual(self.client.get('/encounters/summary?by=ward').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,157 @@
+import unittest
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+from oneview_app.fhir_ndjson import (
+    iter_ndjson_patient_bundles, patient_reference_id, line_patient_reference_id, ndjson_file_resource_type,
+)
+from oneview_app.fhir_parser import load_all_patients_data, parse_fhir_bundle, PARSED_RESOURCE_TYPES
+
+MOCK_EXPORT = {
+    "Patient.ndjson": [
+        {"resourceType": "Patient", "id": "p1", "name": [{"given": ["Walter"], "family": "White"}], "birthDate": "1959-09-07", "gender": "male"},
+        {"resourceType": "Patient", "id": "p2", "name": [{"given": ["Jesse"], "family": "Pinkman"}], "birthDate": "1984-08-24"},
+    ],
+    "Encounter.000.ndjson": [
+        {"resourceType": "Encounter", "id": "e1", "subject": {"reference": "Patient/p1"}, "period": {"start": "2023-01-15T10:00:00Z"},
+         "type": [{"text": "Checkup"}], "serviceProvider": {"display": "General Hospital"},
+         "participant": [{"type": [{"coding": [{"code": "PCP"}]}], "individual": {"reference": "Practitioner/pr1", "display": "Dr. Saul Goodman"}}]},
+    ],
+    "Encounter.001.ndjson": [
+        {"resourceType": "Encounter", "id": "e2", "subject": {"reference": "urn:uuid:p2"}, "period": {"start": "2023-05-01"}, "type": [{"text": "ER"}]},
+    ],
+    "Condition.ndjson": [
+        {"resourceType": "Condition", "id": "c1", "subject": {"reference": "Patient/p1"}, "clinicalStatus": {"coding": [{"code": "active"}]},
+         "code": {"coding": [{"system": "http://snomed.info/sct", "code": "44054006", "display": "Diabetes"}]}},
+    ],
+    "Coverage.ndjson": [
+        {"resourceType": "Coverage", "id": "cov1", "beneficiary": {"reference": "Patient/p2"}, "payor": [{"display": "Medicaid"}]},
+    ],
+    "MedicationRequest.ndjson": [
+        {"resourceType": "MedicationRequest", "id": "mr1", "subject": {"reference": "Patient/p1"}, "status": "active",
+         "medicationReference": {"reference": "Medication/m1"}, "authoredOn": "2022-01-01"},
+    ],
+    "Medication.ndjson": [
+        {"resourceType": "Medication", "id": "m1", "code": {"text": "Metformin 500mg"}},
+        {"resourceType": "Medication", "id": "m2", "code": {"text": "Unused"}},
+    ],
+    "Claim.ndjson": [
+        {"resourceType": "Claim", "id": "c1", "patient": {"reference": "Patient/p1"}},
+    ],
+}
+
+
+class TestFhirNdjson(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.export_directory = self._tmp.name
+        for filename, resources in MOCK_EXPORT.items():
+            with open(os.path.join(self.export_directory, filename), "w", encoding="utf-8") as f:
+                for resource in resources:
+                    f.write(json.dumps(resource) + "\n")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def by_id(self, patients):
+        return {p["patient_id"]: p for p in patients}
+
+    def test_patient_reference_id(self):
+        self.assertEqual(patient_reference_id({"resourceType": "Patient", "id": "x"}), "x")
+        self.assertEqual(patient_reference_id({"subject": {"reference": "Patient/p1"}}), "p1")
+        self.assertEqual(patient_reference_id({"beneficiary": {"reference": "urn:uuid:p2"}}), "p2")
+        self.assertIsNone(patient_reference_id({"subject": {"reference": "Group/g1"}}))
+
+    def test_line_patient_reference_id(self):
+        for resource in (r for resources in MOCK_EXPORT.values() for r in resources if r["resourceType"] != "Medication"):
+            line = json.dumps(resource).encode("utf-8")
+            self.assertEqual(line_patient_reference_id(line, resource["resourceType"]), patient_reference_id(resource))
+        # Lines the bytes alone cannot settle are left for a decode
+        inconclusive = [
+            {"resourceType": "Encounter", "contained": [{"resourceType": "Patient", "id": "x"}], "subject": {"reference": "Patient/p1"}},
+            {"resourceType": "Claim", "patient": {"reference": "Patient/p1"}, "subject": {"reference": "Patient/p2"}},
+            {"resourceType": "Encounter", "subject": {"reference": "Patient/p\"1"}},
+            {"resourceType": "Patient", "id": "p1", "extension": [{"id": "e1"}]},
+        ]
+        for resource in inconclusive:
+            self.assertIsNone(line_patient_reference_id(json.dumps(resource).encode("utf-8"), resource["resourceType"]))
+
+    def test_ndjson_file_resource_type(self):
+        self.assertEqual(ndjson_file_resource_type("Encounter.000.ndjson"), "Encounter")
+        self.assertEqual(ndjson_file_resource_type("MedicationRequest.ndjson.gz"), "MedicationRequest")
+        self.assertIsNone(ndjson_file_resource_type("export-1.ndjson"))
+
+    def test_load_ndjson_export(self):
+        patients = self.by_id(load_all_patients_data(self.export_directory, export_format="ndjson"))
+        self.assertEqual(set(patients), {"p1", "p2"})
+        walter = patients["p1"]
+        self.assertEqual(walter["full_name"], "Walter White")
+        self.assertEqual(walter["pcp_name"], "Dr. Saul Goodman")
+        self.assertEqual(walter["diagnoses"][0]["code"], "44054006")
+        self.assertEqual(walter["medications"][0]["name"], "Metformin 500mg")
+        jesse = patients["p2"]
+        self.assertEqual(jesse["insurance"], "Medicaid")
+        self.assertEqual([e["type"] for e in jesse["recent_encounters"]], ["ER"])
+
+    def test_partitioned_join_matches_in_memory_join(self):
+        in_memory = [parse_fhir_bundle(b) for b in iter_ndjson_patient_bundles(self.export_directory, PARSED_RESOURCE_TYPES)]
+        partitioned = [parse_fhir_bundle(b) for b in iter_ndjson_patient_bundles(self.export_directory, PARSED_RESOURCE_TYPES, partition_bytes=200)]
+        self.assertEqual(self.by_id(partitioned), self.by_id(in_memory))
+
+    def test_partitioned_join_decodes_each_line_once(self):
+        decoded = []
+
+        def counting_loads(line):
+            decoded.append(line)
+            return json.loads(line)
+
+        bundles = list(iter_ndjson_patient_bundles(self.export_directory, PARSED_RESOURCE_TYPES, partition_bytes=200, loads=counting_loads))
+        self.assertEqual(len(bundles), 2)
+        kept_lines = sum(
+            len(resources) for filename, resources in MOCK_EXPORT.items()
+            if ndjson_file_resource_type(filename) in PARSED_RESOURCE_TYPES | {"Patient"}
+        )
+        self.assertEqual(len(decoded), kept_lines)
+        self.assertEqual(len(set(decoded)), kept_lines)
+
+    def test_export_directory_is_listed_once(self):
+        with mock.patch("os.listdir", wraps=os.listdir) as listdir:
+            list(iter_ndjson_patient_bundles(self.export_directory, PARSED_RESOURCE_TYPES))
+        listdir.assert_called_once_with(self.export_directory)
+
+    def test_urn_uuid_medication_reference(self):
+        with open(os.path.join(self.export_directory, "MedicationRequest.ndjson"), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"resourceType": "MedicationRequest", "id": "mr1", "subject": {"reference": "Patient/p1"},
+                                "medicationReference": {"reference": "urn:uuid:m1"}}) + "\n")
+            f.write(json.dumps({"resourceType": "MedicationRequest", "id": "mr2", "subject": {"reference": "Patient/p1"},
+                                "medicationReference": {"reference": "Medication/m1"}}) + "\n")
+        for partition_bytes in (None, 200):
+            kwargs = {"partition_bytes": partition_bytes} if partition_bytes else {}
+            bundles = {b["id"]: b for b in iter_ndjson_patient_bundles(self.export_directory, PARSED_RESOURCE_TYPES, **kwargs)}
+            medications = [e for e in bundles["ndjson-p1"]["entry"] if e["resource"]["resourceType"] == "Medication"]
+            self.assertEqual([e["fullUrl"] for e in medications], ["Medication/m1"])
+            walter = parse_fhir_bundle(bundles["ndjson-p1"])
+            self.assertEqual([m["name"] for m in walter["medications"]], ["Metformin 500mg", "Metformin 500mg"])
+
+    def test_unused_types_and_medications_are_not_attached(self):
+        bundles = {b["id"]: b for b in iter_ndjson_patient_bundles(self.export_directory, PARSED_RESOURCE_TYPES)}
+        types = [e["resource"]["resourceType"] for e in bundles["ndjson-p1"]["entry"]]
+        self.assertNotIn("Claim", types)
+        self.assertEqual(types.count("Medication"), 1)
+
+    def test_gzipped_ndjson(self):
+        path = os.path.join(self.export_directory, "Coverage.ndjson")
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        with gzip.open(path + ".gz", "wb") as f:
+            f.write(data)
+        patients = self.by_id(load_all_patients_data(self.export_directory, export_format="ndjson"))
+        self.assertEqual(patients["p2"]["insurance"], "Medicaid")
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -67,6 +67,7 @@ MOCK_PATIENT_BUNDLE_FULL = {
                 "id": "encounter-1",
                 "status": "finished",
                 "period": {"start": "2023-01-15T10:00:00Z", "end": "2023-01-15T10:30:00Z"},
+                "class": {"system": "http://terminology.hl7.org/CodeSystem/v3-ActCode", "code": "AMB"},
                 "type": [{"text": "Routine Checkup"}],
                 "serviceProvider": {"display": "General Hospital"},
                 "participant": [
@@ -111,6 +112,7 @@ MOCK_PATIENT_BUNDLE_FULL = {
                 "clinicalStatus": {"coding": [{"code": "active"}]},
                 "verificationStatus": {"coding": [{"code": "confirmed"}]},
                 "category": [{"coding": [{"code": "encounter-diagnosis"}]}],
+                "onsetDateTime": "2015-06-01T08:00:00Z",
                 "code": {"text": "Essential hypertension", "coding": [{"system": "http://snomed.info/sct", "code": "59621000", "display": "Essential hypertension"}]},
             }
         },
@@ -120,6 +122,8 @@ MOCK_PATIENT_BUNDLE_FULL = {
                 "id": "condition-2",
                 "clinicalStatus": {"coding": [{"code": "resolved"}]},
                 "category": [{"text": "Problem List Item"}], # Using text for category
+                "onsetPeriod": {"start": "2021-02-01"},
+                "abatementDateTime": "2021-03-15",
                 "code": {"text": "Sprained Ankle"},
             }
         },
@@ -153,6 +157,10 @@ MOCK_PATIENT_BUNDLE_FULL = {
                 "authoredOn": "2021-11-15T09:30:00Z",
                 "requester": {"display": "Dr. Eva Core"},
                 # No dosageInstruction for this one
+                "dispenseRequest": {
+                    "validityPeriod": {"start": "2021-11-15", "end": "2022-11-15"},
+                    "expectedSupplyDuration": {"value": 3, "unit": "months", "system": "http://unitsofmeasure.org", "code": "mo"},
+                },
             }
         },
         { # Corresponding Medication resource for medreq-2
@@ -262,11 +270,14 @@ class TestFhirParser(unittest.TestCase):
         self.assertEqual(encounter1["facility"], "General Hospital")
         self.assertEqual(encounter1["provider"], "Dr. Primary Care")
         self.assertEqual(encounter1["primary_diagnosis_text"], "Hypertension")
+        self.assertEqual((encounter1["encounter_class"], encounter1["end"]), ("AMB", "2023-01-15T10:30:00Z"))
 
         self.assertEqual(encounter2["type"], "Specialist Visit")
         self.assertEqual(encounter2["facility"], "Specialty Clinic")
         self.assertEqual(encounter2["provider"], "Dr. Spectialist")
         self.assertEqual(encounter2["primary_diagnosis_text"], "Type 2 Diabetes")
+        self.assertIsNone(encounter2["encounter_class"])
+        self.assertIsNone(encounter2["end"])
 
         self.assertEqual(len(parsed["diagnoses"]), 2)
         diag1 = parsed["diagnoses"][0]
@@ -274,12 +285,15 @@ class TestFhirParser(unittest.TestCase):
         self.assertEqual(diag1["description"], "Essential hypertension")
         self.assertEqual(diag1["status"], "active")
         self.assertEqual(diag1["category"], "encounter-diagnosis")
+        self.assertEqual(diag1["onset"], "2015-06-01T08:00:00Z")
+        self.assertIsNone(diag1["abatement"])
 
         diag2 = parsed["diagnoses"][1]
         self.assertIsNone(diag2["code"]) # No coding, only text
         self.assertEqual(diag2["description"], "Sprained Ankle")
         self.assertEqual(diag2["status"], "resolved")
         self.assertEqual(diag2["category"], "Problem List Item")
+        self.assertEqual((diag2["onset"], diag2["abatement"]), ("2021-02-01", "2021-03-15"))
 
         # Test medications
         self.assertIsNotNone(parsed.get("medications"))
@@ -296,6 +310,8 @@ class TestFhirParser(unittest.TestCase):
         self.assertEqual(med2["prescriber"], "Dr. Eva Core")
         self.assertIsNone(med2["dosage"]) # No dosageInstruction
         self.assertEqual(med2["status"], "completed")
+        self.assertEqual((med2["period_start"], med2["period_end"], med2["supply_days"]), ("2021-11-15", "2022-11-15", 90))
+        self.assertIsNone(med1["supply_days"])
         
         med3 = next(m for m in parsed["medications"] if m["name"] == "Aspirin 81mg (External)") # Name from MedicationReference.display
         self.assertEqual(med3["authored_on"], "2023-01-20T10:00:00Z")
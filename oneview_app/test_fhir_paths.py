@@ -0,0 +1,93 @@
+import unittest
+from oneview_app.fhir_paths import FhirPathError, compile_path, compile_record
+
+MOCK_CONDITION = {
+    "resourceType": "Condition",
+    "code": {
+        "coding": [
+            {"system": "http://hl7.org/fhir/sid/icd-10", "code": "E11", "display": "Type 2 diabetes"},
+            {"system": "http://snomed.info/sct", "code": "44054006", "display": "Diabetes mellitus type 2"},
+        ],
+        "text": "Diabetes",
+    },
+    "clinicalStatus": {"coding": [{"code": "active"}]},
+}
+
+MOCK_PATIENT = {
+    "resourceType": "Patient",
+    "telecom": [
+        {"system": "email", "value": "a@example.com"},
+        {"system": "phone", "use": "work", "value": "555-0000"},
+        {"system": "phone", "use": "mobile", "value": "555-1234"},
+    ],
+    "communication": [
+        {"language": {"text": "French"}},
+        {"language": {"text": "English"}, "preferred": True},
+    ],
+}
+
+
+class TestFhirPaths(unittest.TestCase):
+
+    def test_member_access_and_indexing(self):
+        self.assertEqual(compile_path("code.coding[1].code")(MOCK_CONDITION), "44054006")
+        self.assertEqual(compile_path("clinicalStatus.coding[0].code")(MOCK_CONDITION), "active")
+        self.assertIsNone(compile_path("code.coding[5].code")(MOCK_CONDITION))
+
+    def test_missing_or_malformed_data_yields_none(self):
+        accessor = compile_path("type[0].coding[0].display")
+        self.assertIsNone(accessor({}))
+        self.assertIsNone(accessor({"type": []}))
+        self.assertIsNone(accessor({"type": "not-a-list"}))
+        self.assertIsNone(accessor({"type": [{"coding": {"display": "dict, not list"}}]}))
+
+    def test_filters(self):
+        self.assertEqual(compile_path("telecom[system=phone][use=home,mobile].value")(MOCK_PATIENT), "555-1234")
+        self.assertEqual(compile_path("communication[preferred=true].language.text")(MOCK_PATIENT), "English")
+        coding = compile_path("code.coding[system^=http://snomed.info/sct]")(MOCK_CONDITION)
+        self.assertEqual(coding["code"], "44054006")
+
+    def test_alternatives_take_first_non_empty_value(self):
+        accessor = compile_path("period.start | period.end")
+        self.assertEqual(accessor({"period": {"start": "2020", "end": "2021"}}), "2020")
+        self.assertEqual(accessor({"period": {"start": "", "end": "2021"}}), "2021")
+        self.assertIsNone(accessor({}))
+
+    def test_alternatives_on_malformed_data(self):
+        accessor = compile_path("class.code | class[0].coding[0].code")
+        self.assertEqual(accessor({"class": {"code": "AMB"}}), "AMB")
+        self.assertEqual(accessor({"class": [{"coding": [{"code": "EMER"}]}]}), "EMER")
+        self.assertIsNone(accessor({"class": "AMB"}))
+        self.assertIsNone(accessor({"class": [{"coding": "EMER"}]}))
+        self.assertIsNone(compile_path("period.start")("not-a-resource"))
+        # The last alternative is returned as found, a failed one as None
+        self.assertIs(compile_path("active | deceasedBoolean")({"active": False, "deceasedBoolean": False}), False)
+        self.assertIsNone(compile_path("period.start | period[0]")({"period": {"start": ""}}))
+
+    def test_record_fields_sharing_prefixes(self):
+        extractor = compile_record({
+            "date": "period.start | period.end",
+            "end": "period.end",
+            "type": "type[0].text | type[0].coding[0].display",
+            "first_code": "type[0].coding[0].code",
+        })
+        resource = {"period": {"end": "2021"}, "type": [{"coding": [{"code": "1", "display": "Visit"}]}]}
+        self.assertEqual(extractor(resource), {"date": "2021", "end": "2021", "type": "Visit", "first_code": "1"})
+        self.assertEqual(extractor({"period": [], "type": {}}), {"date": None, "end": None, "type": None, "first_code": None})
+
+    def test_compiled_paths_are_cached(self):
+        self.assertIs(compile_path("code.text"), compile_path("code.text"))
+
+    def test_compile_record(self):
+        extractor = compile_record({"text": "code.text", "status": "clinicalStatus.coding[0].code", "missing": "note[0].text"})
+        self.assertEqual(extractor(MOCK_CONDITION), {"text": "Diabetes", "status": "active", "missing": None})
+
+    def test_invalid_expression(self):
+        with self.assertRaises(FhirPathError):
+            compile_path("code..text")
+        with self.assertRaises(FhirPathError):
+            compile_path("")
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
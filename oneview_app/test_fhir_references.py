@@ -0,0 +1,200 @@
+import unittest
+import json
+import io
+import os
+import tarfile
+import tempfile
+from oneview_app.fhir_references import BundleResolver, ReferenceTable, is_shared_bundle_name, format_practitioner_name
+from oneview_app.fhir_parser import load_all_patients_data, parse_fhir_bundle, parse_medications
+
+MOCK_HOSPITAL_BUNDLE = {
+    "resourceType": "Bundle",
+    "type": "batch",
+    "entry": [
+        {
+            "fullUrl": "urn:uuid:org-1",
+            "resource": {
+                "resourceType": "Organization",
+                "id": "org-1",
+                "identifier": [{"system": "https://github.com/synthetichealth/synthea", "value": "org-1"}],
+                "name": "BOSTON MEDICAL CENTER",
+            },
+        },
+        {
+            "fullUrl": "urn:uuid:loc-1",
+            "resource": {"resourceType": "Location", "id": "loc-1", "name": "BOSTON MEDICAL CENTER - MAIN"},
+        },
+    ],
+}
+
+MOCK_PRACTITIONER_BUNDLE = {
+    "resourceType": "Bundle",
+    "type": "batch",
+    "entry": [
+        {
+            "fullUrl": "urn:uuid:pr-1",
+            "resource": {
+                "resourceType": "Practitioner",
+                "id": "pr-1",
+                "identifier": [{"system": "http://hl7.org/fhir/sid/us-npi", "value": "9999912345"}],
+                "name": [{"family": "Goodman", "given": ["Saul"], "prefix": ["Dr."]}],
+            },
+        },
+    ],
+}
+
+# Patient bundle whose references carry no display strings
+MOCK_PATIENT_BUNDLE_BARE_REFERENCES = {
+    "resourceType": "Bundle",
+    "type": "transaction",
+    "entry": [
+        {"fullUrl": "urn:uuid:patient-9", "resource": {"resourceType": "Patient", "id": "patient-9", "name": [{"family": "Ehrmantraut", "given": ["Mike"]}]}},
+        {
+            "fullUrl": "urn:uuid:enc-9",
+            "resource": {
+                "resourceType": "Encounter",
+                "id": "enc-9",
+                "period": {"start": "2023-06-01T08:00:00Z"},
+                "serviceProvider": {"reference": "Organization?identifier=https://github.com/synthetichealth/synthea|org-1"},
+                "participant": [{
+                    "type": [{"coding": [{"code": "PCP"}]}],
+                    "individual": {"reference": "Practitioner?identifier=http://hl7.org/fhir/sid/us-npi|9999912345"},
+                }],
+            },
+        },
+        {
+            "fullUrl": "urn:uuid:medreq-9",
+            "resource": {
+                "resourceType": "MedicationRequest",
+                "id": "medreq-9",
+                "status": "active",
+                "medicationCodeableConcept": {"text": "Ibuprofen 200 MG"},
+                "requester": {"reference": "Practitioner/pr-1"},
+            },
+        },
+    ],
+}
+
+
+class TestReferenceTable(unittest.TestCase):
+
+    def setUp(self):
+        self.references = ReferenceTable()
+        self.references.add_bundle(MOCK_HOSPITAL_BUNDLE)
+        self.references.add_bundle(MOCK_PRACTITIONER_BUNDLE)
+
+    def test_reference_forms(self):
+        for reference in (
+            "Organization/org-1",
+            "urn:uuid:org-1",
+            "Organization?identifier=https://github.com/synthetichealth/synthea|org-1",
+            "Organization?identifier=org-1",
+            "Organization?identifier=http://other-system|org-1",
+        ):
+            self.assertEqual(self.references.display_name(reference), "BOSTON MEDICAL CENTER", reference)
+        self.assertEqual(self.references.display_name("Location/loc-1"), "BOSTON MEDICAL CENTER - MAIN")
+        self.assertIsNone(self.references.resolve("Organization/unknown"))
+        self.assertIsNone(self.references.display_name(None))
+
+    def test_practitioner_name(self):
+        self.assertEqual(self.references.display_name("Practitioner/pr-1"), "Dr. Saul Goodman")
+        self.assertEqual(format_practitioner_name({"name": [{"text": "Nurse Hatter"}]}), "Nurse Hatter")
+        self.assertIsNone(format_practitioner_name({}))
+
+    def test_is_shared_bundle_name(self):
+        self.assertTrue(is_shared_bundle_name("hospitalInformation1686845234935.json"))
+        self.assertTrue(is_shared_bundle_name("practitionerInformation1686845234935.json.gz"))
+        self.assertTrue(is_shared_bundle_name("drop.tar.gz:fhir/hospitalInformation1.json"))
+        self.assertFalse(is_shared_bundle_name("Walter_White_0f2b.json"))
+
+    def test_load_resolves_references_from_shared_bundles(self):
+        with tempfile.TemporaryDirectory() as data_directory:
+            for filename, bundle in (
+                ("hospitalInformation1686845234935.json", MOCK_HOSPITAL_BUNDLE),
+                ("practitionerInformation1686845234935.json", MOCK_PRACTITIONER_BUNDLE),
+                ("Mike_Ehrmantraut.json", MOCK_PATIENT_BUNDLE_BARE_REFERENCES),
+            ):
+                with open(os.path.join(data_directory, filename), "w", encoding="utf-8") as f:
+                    json.dump(bundle, f)
+            with self.assertNoLogs(level="WARNING"):
+                patients = load_all_patients_data(data_directory)
+        self.assertEqual(len(patients), 1)
+        patient = patients[0]
+        self.assertEqual(patient["pcp_name"], "Dr. Saul Goodman")
+        self.assertEqual(patient["recent_encounters"][0]["facility"], "BOSTON MEDICAL CENTER")
+        self.assertEqual(patient["recent_encounters"][0]["provider"], "Dr. Saul Goodman")
+        self.assertEqual(patient["medications"][0]["prescriber"], "Dr. Saul Goodman")
+
+    def test_archive_with_shared_bundles_after_patients(self):
+        # Name-sorted Synthea output: uppercase patient files come before the shared bundles
+        with tempfile.TemporaryDirectory() as data_directory:
+            with tarfile.open(os.path.join(data_directory, "synthea.tar.gz"), "w:gz") as archive:
+                for name, bundle in sorted([
+                    ("fhir/hospitalInformation1686845234935.json", MOCK_HOSPITAL_BUNDLE),
+                    ("fhir/practitionerInformation1686845234935.json", MOCK_PRACTITIONER_BUNDLE),
+                    ("fhir/Aaron_Smith.json", MOCK_PATIENT_BUNDLE_BARE_REFERENCES),
+                ]):
+                    data = json.dumps(bundle).encode("utf-8")
+                    info = tarfile.TarInfo(name)
+                    info.size = len(data)
+                    archive.addfile(info, io.BytesIO(data))
+            patients = load_all_patients_data(data_directory)
+        self.assertEqual(len(patients), 1)
+        self.assertEqual(patients[0]["pcp_name"], "Dr. Saul Goodman")
+        self.assertEqual(patients[0]["recent_encounters"][0]["facility"], "BOSTON MEDICAL CENTER")
+        self.assertEqual(patients[0]["recent_encounters"][0]["provider"], "Dr. Saul Goodman")
+
+
+# Bundle whose encounter diagnoses and medications are references only
+MOCK_PATIENT_BUNDLE_INTERNAL_REFERENCES = {
+    "resourceType": "Bundle",
+    "entry": [
+        {"fullUrl": "urn:uuid:patient-7", "resource": {"resourceType": "Patient", "id": "patient-7", "name": [{"family": "Fring"}]}},
+        {"fullUrl": "urn:uuid:cond-7", "resource": {
+            "resourceType": "Condition", "id": "cond-7",
+            "code": {"coding": [{"system": "http://snomed.info/sct", "code": "195662009", "display": "Acute viral pharyngitis (disorder)"}]},
+        }},
+        {"fullUrl": "urn:uuid:enc-7", "resource": {
+            "resourceType": "Encounter", "id": "enc-7",
+            "diagnosis": [{"condition": {"reference": "Condition/cond-7"}, "use": {"coding": [{"code": "AD"}]}}],
+        }},
+        {"resource": {"resourceType": "Medication", "id": "med-7", "code": {"text": "Amoxicillin 500 MG"}}},
+        {"resource": {
+            "resourceType": "MedicationRequest", "id": "medreq-7", "status": "active",
+            "medicationReference": {"reference": "Medication/med-7"},
+        }},
+        {"resource": {
+            "resourceType": "MedicationRequest", "id": "medreq-8", "status": "active",
+            "medicationReference": {"reference": "urn:uuid:cond-7", "display": "Wrong type reference"},
+        }},
+    ],
+}
+
+
+class TestBundleResolver(unittest.TestCase):
+
+    def test_resolves_both_reference_forms(self):
+        resolver = BundleResolver(MOCK_PATIENT_BUNDLE_INTERNAL_REFERENCES)
+        self.assertEqual(resolver.resolve("Condition/cond-7")["id"], "cond-7")
+        self.assertEqual(resolver.resolve("urn:uuid:cond-7")["id"], "cond-7")
+        self.assertIsNone(resolver.resolve("urn:uuid:cond-7", "Medication"))
+        self.assertEqual([r["id"] for r in resolver.resources_of_type("MedicationRequest")], ["medreq-7", "medreq-8"])
+
+    def test_falls_back_to_shared_table(self):
+        shared = ReferenceTable()
+        shared.add_bundle(MOCK_HOSPITAL_BUNDLE)
+        resolver = BundleResolver(MOCK_PATIENT_BUNDLE_INTERNAL_REFERENCES, shared=shared)
+        self.assertEqual(resolver.display_name("Organization/org-1"), "BOSTON MEDICAL CENTER")
+        self.assertIs(BundleResolver.for_bundle(MOCK_PATIENT_BUNDLE_INTERNAL_REFERENCES, resolver), resolver)
+
+    def test_parsers_use_resolved_resources(self):
+        parsed = parse_fhir_bundle(MOCK_PATIENT_BUNDLE_INTERNAL_REFERENCES)
+        self.assertEqual(parsed["recent_encounters"][0]["primary_diagnosis_text"], "Acute viral pharyngitis (disorder)")
+        self.assertEqual(parsed["medications"][0]["name"], "Amoxicillin 500 MG")
+        with self.assertLogs(level="WARNING"):
+            medications = parse_medications(MOCK_PATIENT_BUNDLE_INTERNAL_REFERENCES)
+        self.assertEqual(medications[1]["name"], "Wrong type reference")
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
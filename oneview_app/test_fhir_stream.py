@@ -0,0 +1,155 @@
+import unittest
+import io
+import json
+import os
+import tempfile
+from oneview_app.fhir_stream import BundleStream, read_bundle_stream, read_bundle_filtered
+from oneview_app.fhir_parser import (
+    load_all_patients_data, parse_fhir_bundle, parse_medications, parse_diagnoses,
+    resource_types_for, MEMBERS_BY_RESOURCE_TYPE, PARSED_RESOURCE_TYPES,
+)
+from oneview_app.test_fhir_parser import MOCK_PATIENT_BUNDLE_FULL
+from oneview_app.test_observation_series import MOCK_OBSERVATIONS
+
+# Bundle padded with resource types the parsers never read
+MOCK_BUNDLE_WITH_NOISE = {
+    "resourceType": "Bundle",
+    "type": "transaction",
+    "entry": [
+        {"fullUrl": "urn:uuid:report-1", "resource": {"resourceType": "DiagnosticReport", "id": "report-1", "conclusion": "Normal"}},
+        {"fullUrl": "urn:uuid:claim-1", "resource": {"resourceType": "Claim", "id": "claim-1", "item": [{"sequence": 1, "net": {"value": 129.16}}]}},
+    ] + MOCK_PATIENT_BUNDLE_FULL["entry"] + [
+        {"fullUrl": "urn:uuid:eob-1", "resource": {"resourceType": "ExplanationOfBenefit", "id": "eob-1", "contained": [{"resourceType": "Patient", "id": "contained-patient"}]}},
+    ],
+    "id": "noisy-bundle",
+}
+
+
+class TestBundleStream(unittest.TestCase):
+
+    def encode(self, bundle):
+        return json.dumps(bundle, indent=2).encode("utf-8")
+
+    def test_keep_all_matches_json_load(self):
+        raw = self.encode(MOCK_BUNDLE_WITH_NOISE)
+        for chunk_size in (1, 7, 4096):
+            bundle_data = read_bundle_stream(io.BytesIO(raw), chunk_size=chunk_size)
+            self.assertEqual(bundle_data, MOCK_BUNDLE_WITH_NOISE)
+
+    def test_skips_unrequested_resource_types(self):
+        raw = self.encode(MOCK_BUNDLE_WITH_NOISE)
+        stream = BundleStream(io.BytesIO(raw), keep_types=PARSED_RESOURCE_TYPES, chunk_size=16)
+        kept_types = {entry["resource"]["resourceType"] for entry in stream}
+        self.assertEqual(kept_types, {"Patient", "Coverage", "Encounter", "Condition", "MedicationRequest", "Medication"})
+        self.assertEqual(stream.stats["entries_seen"], len(MOCK_BUNDLE_WITH_NOISE["entry"]))
+        self.assertEqual(stream.stats["entries_kept"], len(MOCK_PATIENT_BUNDLE_FULL["entry"]))
+        self.assertLess(stream.stats["bytes_decoded"], len(raw))
+        self.assertEqual(stream.bundle_fields, {"resourceType": "Bundle", "type": "transaction", "id": "noisy-bundle"})
+
+    def test_contained_resource_type_does_not_leak(self):
+        # The EOB's contained Patient must not make the EOB entry look like a Patient
+        raw = self.encode(MOCK_BUNDLE_WITH_NOISE)
+        bundle_data = read_bundle_stream(io.BytesIO(raw), keep_types={"Patient"}, chunk_size=32)
+        self.assertEqual([e["resource"]["id"] for e in bundle_data["entry"]], ["patient-1"])
+
+    def test_parsed_result_matches_full_decode(self):
+        raw = self.encode(MOCK_BUNDLE_WITH_NOISE)
+        streamed = read_bundle_stream(io.BytesIO(raw), keep_types=PARSED_RESOURCE_TYPES)
+        self.assertEqual(parse_fhir_bundle(streamed), parse_fhir_bundle(MOCK_BUNDLE_WITH_NOISE))
+
+    def test_nesting_deeper_than_regex_skip(self):
+        deep = {"v": 1}
+        for _ in range(30):
+            deep = {"n": [deep, "]}"]}
+        bundle = {"entry": [{"resource": {"resourceType": "Claim", "deep": deep}}, {"resource": {"resourceType": "Patient", "deep": deep}}]}
+        raw = self.encode(bundle)
+        for chunk_size in (5, 4096):
+            bundle_data = read_bundle_stream(io.BytesIO(raw), keep_types={"Patient"}, chunk_size=chunk_size)
+            self.assertEqual(bundle_data["entry"], bundle["entry"][1:])
+
+    def test_top_level_containers_before_entry(self):
+        bundle = {
+            "resourceType": "Bundle",
+            "meta": {"lastUpdated": "2023-03-15T10:00:00Z", "tag": [{"code": "a"}]},
+            "link": [{"relation": "self", "url": "https://example.org/Bundle/1"}],
+            "entry": MOCK_PATIENT_BUNDLE_FULL["entry"],
+        }
+        raw = self.encode(bundle)
+        for chunk_size in (16, 65536):
+            self.assertEqual(read_bundle_stream(io.BytesIO(raw), chunk_size=chunk_size), bundle)
+        self.assertEqual(read_bundle_filtered(raw), bundle)
+        with tempfile.TemporaryDirectory() as data_directory:
+            with open(os.path.join(data_directory, "meta.json"), "wb") as f:
+                f.write(raw)
+            loaded = load_all_patients_data(data_directory)
+            self.assertEqual(len(loaded), 1)
+            for reader in ("stream", "filtered", "mmap"):
+                self.assertEqual(load_all_patients_data(data_directory, reader=reader), loaded, reader)
+
+    def test_escaped_strings_and_scalars(self):
+        raw = b'{"id": "a \\"quoted\\" \\\\ id", "total": -1.5e3, "flag": true, "entry": [ ]}'
+        self.assertEqual(read_bundle_stream(io.BytesIO(raw), chunk_size=3), json.loads(raw))
+
+    def test_truncated_bundle_raises_decode_error(self):
+        raw = self.encode(MOCK_BUNDLE_WITH_NOISE)[:-40]
+        with self.assertRaises(json.JSONDecodeError):
+            read_bundle_stream(io.BytesIO(raw), keep_types={"Patient"})
+
+    def test_filtered_in_memory_decode(self):
+        raw = self.encode(MOCK_BUNDLE_WITH_NOISE)
+        stream = BundleStream.from_buffer(raw, keep_types=PARSED_RESOURCE_TYPES)
+        entries = list(stream)
+        self.assertEqual(len(entries), len(MOCK_PATIENT_BUNDLE_FULL["entry"]))
+        self.assertEqual(stream.stats["bytes_read"], len(raw))
+        self.assertEqual(read_bundle_filtered(raw), MOCK_BUNDLE_WITH_NOISE)
+
+    def test_resource_types_for_parsers(self):
+        self.assertEqual(resource_types_for([parse_diagnoses]), {"Condition"})
+        self.assertEqual(resource_types_for([parse_medications]), {"MedicationRequest", "Medication"})
+        self.assertNotIn("Observation", PARSED_RESOURCE_TYPES)
+        self.assertNotIn("Claim", PARSED_RESOURCE_TYPES)
+        self.assertIn("valueQuantity", MEMBERS_BY_RESOURCE_TYPE["Observation"])
+
+    def test_observations_decode_only_their_read_members(self):
+        observations = [
+            {"fullUrl": f"urn:uuid:obs-{n}", "resource": dict(observation, id=f"obs-{n}", status="final",
+             subject={"reference": "urn:uuid:patient-1"}, category=[{"coding": [{"code": "laboratory"}]}])}
+            for n, observation in enumerate(MOCK_OBSERVATIONS)
+        ]
+        bundle = dict(MOCK_BUNDLE_WITH_NOISE, entry=MOCK_BUNDLE_WITH_NOISE["entry"] + observations)
+        deep = {"v": 1}
+        for _ in range(20):
+            deep = {"n": [deep]}
+        observations[0]["resource"]["extension"] = [deep]  # Deeper than the member regex follows
+        raw = self.encode(bundle)
+        expected = parse_fhir_bundle(bundle)
+        self.assertTrue(expected["observations"])
+        filtered = {}
+        self.assertEqual(parse_fhir_bundle(read_bundle_filtered(
+            raw, keep_types=PARSED_RESOURCE_TYPES, stats=filtered, member_types=MEMBERS_BY_RESOURCE_TYPE)), expected)
+        for chunk_size in (16, 65536):
+            stats = {}
+            streamed = read_bundle_stream(io.BytesIO(raw), keep_types=PARSED_RESOURCE_TYPES, chunk_size=chunk_size,
+                                          stats=stats, member_types=MEMBERS_BY_RESOURCE_TYPE)
+            self.assertEqual(parse_fhir_bundle(streamed), expected)
+            kept = [e["resource"] for e in streamed["entry"] if e["resource"]["resourceType"] == "Observation"]
+            self.assertEqual(len(kept), len(MOCK_OBSERVATIONS))
+            self.assertTrue(all(set(resource) <= MEMBERS_BY_RESOURCE_TYPE["Observation"] for resource in kept))
+            self.assertEqual(stats["bytes_decoded"], filtered["bytes_decoded"])
+        whole = {}
+        read_bundle_filtered(raw, keep_types=PARSED_RESOURCE_TYPES | {"Observation"}, stats=whole)
+        self.assertLess(filtered["bytes_decoded"], whole["bytes_decoded"])
+
+    def test_load_all_patients_data_readers_agree(self):
+        with tempfile.TemporaryDirectory() as data_directory:
+            with open(os.path.join(data_directory, "noisy.json"), "w", encoding="utf-8") as f:
+                json.dump(MOCK_BUNDLE_WITH_NOISE, f)
+            loaded = load_all_patients_data(data_directory)
+            for reader in ("stream", "filtered"):
+                parsed = load_all_patients_data(data_directory, reader=reader)
+                self.assertEqual(len(parsed), 1)
+                self.assertEqual(parsed, loaded)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
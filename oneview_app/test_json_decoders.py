@@ -0,0 +1,73 @@
+import unittest
+import json
+import os
+import tempfile
+from oneview_app import json_decoders
+from oneview_app.json_decoders import JSON_DECODERS, STDLIB_DECODER, available_decoders, get_decoder
+from oneview_app.fhir_parser import load_all_patients_data
+from oneview_app.test_fhir_parser import MOCK_PATIENT_BUNDLE_MINIMAL, MOCK_PATIENT_BUNDLE_NO_PCP_IN_ENCOUNTER
+
+
+class TestJsonDecoders(unittest.TestCase):
+
+    def test_stdlib_is_always_available(self):
+        self.assertIn(STDLIB_DECODER, available_decoders())
+        self.assertEqual(available_decoders()[-1], STDLIB_DECODER)
+        self.assertIs(get_decoder(STDLIB_DECODER), json.loads)
+
+    def test_auto_picks_the_first_available_decoder(self):
+        self.assertIs(get_decoder("auto"), JSON_DECODERS[available_decoders()[0]])
+        self.assertIs(get_decoder(None), get_decoder("auto"))
+
+    def test_unknown_decoder(self):
+        with self.assertRaises(ValueError):
+            get_decoder("yaml")
+
+    def test_every_decoder_reads_bytes_and_raises_json_decode_error(self):
+        payload = json.dumps(MOCK_PATIENT_BUNDLE_MINIMAL).encode("utf-8")
+        for name in available_decoders():
+            loads = get_decoder(name)
+            self.assertEqual(loads(payload), MOCK_PATIENT_BUNDLE_MINIMAL, name)
+            with self.assertRaises(json.JSONDecodeError, msg=name):
+                loads(b'{"resourceType": "Bundle", ')
+
+
+class TestLoadWithDecoders(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_directory = self._tmp.name
+        for filename, bundle in [("minimal.json", MOCK_PATIENT_BUNDLE_MINIMAL), ("alice.json", MOCK_PATIENT_BUNDLE_NO_PCP_IN_ENCOUNTER)]:
+            with open(os.path.join(self.data_directory, filename), "w") as f:
+                json.dump(bundle, f)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def load_sorted(self, **kwargs):
+        return sorted(load_all_patients_data(self.data_directory, **kwargs), key=lambda p: p["patient_id"])
+
+    def test_decoders_and_readers_agree(self):
+        expected = self.load_sorted(decoder=STDLIB_DECODER)
+        self.assertEqual([p["patient_id"] for p in expected], ["patient-2", "patient-3"])
+        for name in available_decoders():
+            for reader in ("json", "stream", "filtered"):
+                self.assertEqual(self.load_sorted(decoder=name, reader=reader), expected, (name, reader))
+
+    def test_stdlib_only_environment(self):
+        # Simulate an install without any optional decoder
+        original = dict(JSON_DECODERS)
+        JSON_DECODERS.clear()
+        JSON_DECODERS[STDLIB_DECODER] = json.loads
+        try:
+            self.assertEqual(available_decoders(), [STDLIB_DECODER])
+            self.assertIs(json_decoders.get_decoder(), json.loads)
+            patients = self.load_sorted()
+        finally:
+            JSON_DECODERS.clear()
+            JSON_DECODERS.update(original)
+        self.assertEqual([p["patient_id"] for p in patients], ["patient-2", "patient-3"])
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
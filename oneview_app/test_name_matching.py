@@ -0,0 +1,76 @@
+import unittest
+from oneview_app import app as app_module
+from oneview_app.name_matching import DeletionIndex, FuzzyNameIndex, edit_distance, name_tokens, soundex
+from oneview_app.patient_search import PatientSearchIndex
+
+MOCK_NAME_PATIENTS = [
+    {"patient_id": "p0", "full_name": "Jesse Bruce Pinkman", "dob": "1984-08-24"},
+    {"patient_id": "p1", "full_name": "Charles O'Malley", "dob": "1975-05-15"},
+    {"patient_id": "p2", "full_name": "Walter White", "dob": "1959-09-07"},
+    {"patient_id": "p3", "full_name": "Walter Whyte", "dob": "1980-01-01"},
+    {"patient_id": "p4", "full_name": "Skyler White (née Lambert)", "dob": "1970-08-11"},
+]
+
+
+def _ids(patients):
+    return [p["patient_id"] for p in patients]
+
+
+class TestNameMatching(unittest.TestCase):
+
+    def test_name_tokens(self):
+        self.assertEqual(name_tokens("Charles O'Malley"), ["charles", "omalley"])
+        self.assertEqual(name_tokens("Skyler White (née Lambert)"), ["skyler", "white", "nee", "lambert"])
+
+    def test_soundex(self):
+        self.assertEqual(soundex("robert"), "r163")
+        self.assertEqual(soundex("rupert"), "r163")
+        self.assertEqual(soundex("ashcraft"), "a261")
+        self.assertEqual(soundex("pinkmann"), soundex("pinkman"))
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("kitten", "sitting"), 3)
+        self.assertEqual(edit_distance("pinkmann", "pinkman"), 1)
+        self.assertEqual(edit_distance("abcdef", "a", limit=2), 3)
+
+    def test_deletion_index_matches_brute_force(self):
+        words = ["white", "whyte", "wait", "walter", "water", "waiter", "pinkman", "omalley", "malley"]
+        index = DeletionIndex(words)
+        for query in ("whit", "waters", "maley", "wlater"):
+            for limit in (1, 2):
+                expected = sorted((edit_distance(query, w), w) for w in words if edit_distance(query, w) <= limit)
+                self.assertEqual(sorted(index.search(query, limit)), expected, (query, limit))
+
+    def test_fuzzy_index(self):
+        index = FuzzyNameIndex(MOCK_NAME_PATIENTS)
+        self.assertEqual(set(index.match("Pinkmann")), {0})
+        self.assertEqual(set(index.match("Omalley")), {1})
+        self.assertEqual(index.match("Walter White"), {2: 0, 3: 1})
+        self.assertEqual(index.match("Zebediah"), {})
+
+
+class TestFuzzySearch(unittest.TestCase):
+
+    def setUp(self):
+        self.index = PatientSearchIndex(MOCK_NAME_PATIENTS)
+
+    def test_fuzzy_results_are_ranked(self):
+        self.assertEqual(_ids(self.index.search(text="Walter Whyte", fuzzy=True)), ["p3", "p2"])
+
+    def test_fuzzy_combines_with_other_fields(self):
+        self.assertEqual(_ids(self.index.search(text="Walter Whyte", dob="1959-09-07", fuzzy=True)), ["p2"])
+
+    def test_search_form_falls_back_to_fuzzy(self):
+        original = app_module.search_index
+        app_module.search_index = self.index
+        try:
+            app_module.app.config['TESTING'] = True
+            response = app_module.app.test_client().post('/', data={'search_query': 'Pinkmann'})
+        finally:
+            app_module.search_index = original
+        self.assertIn(b"Search Results (1 found)", response.data)
+        self.assertIn(b"showing similar names", response.data)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
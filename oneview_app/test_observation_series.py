@@ -0,0 +1,102 @@
+import math
+import unittest
+from oneview_app import app as app_module
+from oneview_app.fhir_parser import parse_fhir_bundle, parse_observations
+from oneview_app.observation_series import ObservationSeries, lttb_indices
+
+
+def _observation(code, display, value, date, unit="%", components=None):
+    observation = {
+        "resourceType": "Observation",
+        "code": {"coding": [{"system": "http://loinc.org", "code": code, "display": display}]},
+        "effectiveDateTime": date,
+    }
+    if value is not None:
+        observation["valueQuantity"] = {"value": value, "unit": unit}
+    if components:
+        observation["component"] = components
+    return observation
+
+
+def _component(code, display, value):
+    return {"code": {"coding": [{"system": "http://loinc.org", "code": code, "display": display}]}, "valueQuantity": {"value": value, "unit": "mm[Hg]"}}
+
+
+MOCK_OBSERVATIONS = [
+    _observation("4548-4", "Hemoglobin A1c", 7.9, "2021-06-01T09:00:00Z"),
+    _observation("4548-4", "Hemoglobin A1c", 6.8, "2020-01-15T09:00:00Z"),
+    _observation("85354-9", "Blood pressure panel", None, "2021-06-01T09:00:00Z",
+                 components=[_component("8480-6", "Systolic", 142), _component("8462-4", "Diastolic", 91)]),
+    {"resourceType": "Observation", "code": {"coding": [{"system": "http://loinc.org", "code": "72166-2", "display": "Tobacco smoking status"}]},
+     "effectiveDateTime": "2021-06-01", "valueCodeableConcept": {"text": "Never smoked"}},
+    _observation("4548-4", "Hemoglobin A1c", 9.9, None),  # Undated
+]
+
+
+class TestObservationParsing(unittest.TestCase):
+
+    def test_series_per_code_sorted_by_time(self):
+        series = parse_observations(MOCK_OBSERVATIONS)
+        self.assertEqual(sorted(series), ["4548-4", "8462-4", "8480-6"])
+        a1c = series["4548-4"]
+        self.assertEqual((a1c.display, a1c.unit, list(a1c.values)), ("Hemoglobin A1c", "%", [6.8, 7.9]))
+        self.assertEqual(a1c.timestamps.typecode, 'q')
+        self.assertEqual(list(series["8480-6"].values), [142.0])
+
+    def test_bundle_keeps_observations(self):
+        bundle = {"entry": [{"resource": {"resourceType": "Patient", "id": "p1"}}] + [{"resource": o} for o in MOCK_OBSERVATIONS]}
+        self.assertEqual(len(parse_fhir_bundle(bundle)["observations"]["4548-4"]), 2)
+
+
+class TestLttb(unittest.TestCase):
+
+    def setUp(self):
+        self.xs = list(range(1000))
+        self.ys = [math.sin(x / 50.0) for x in self.xs]
+        self.ys[437] = 25.0  # A spike a plain stride would step over
+
+    def test_keeps_endpoints_and_spike(self):
+        kept = lttb_indices(self.xs, self.ys, 50)
+        self.assertEqual(len(kept), 50)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertEqual(kept, sorted(set(kept)))
+        self.assertIn(437, kept)
+
+    def test_small_inputs(self):
+        self.assertEqual(lttb_indices(self.xs, self.ys, 2000), list(range(1000)))
+        self.assertEqual(lttb_indices(self.xs, self.ys, 2), [0, 999])
+        self.assertEqual(lttb_indices(self.xs, self.ys, 3, lo=10, hi=20)[::2], [10, 19])
+
+    def test_window_downsample(self):
+        series = ObservationSeries("x", "X", None, self.xs, self.ys)
+        points = series.downsample(10, start=400, end=499)
+        self.assertEqual((points[0][0], points[-1][0], len(points)), (400, 499, 10))
+        self.assertIn((437, 25.0), points)
+
+
+class TestObservationRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self._original = app_module.patients_by_id
+        app_module.patients_by_id = {"p1": {"patient_id": "p1", "observations": parse_observations(MOCK_OBSERVATIONS)}}
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.patients_by_id = self._original
+
+    def test_codes_and_series(self):
+        codes = self.client.get('/patients/p1/observations').get_json()
+        self.assertEqual([c["code"] for c in codes], ["8462-4", "4548-4", "8480-6"])
+        self.assertEqual(codes[1]["latest_value"], 7.9)
+        data = self.client.get('/patients/p1/observations/4548-4?points=100&from=2021-01-01').get_json()
+        self.assertEqual((data["total_points"], data["points"]), (1, [["2021-06-01T09:00:00Z", 7.9]]))
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/patients/p1/observations/0000-0').status_code, 404)
+        self.assertEqual(self.client.get('/patients/nobody/observations').status_code, 404)
+        self.assertEqual(self.client.get('/patients/p1/observations/4548-4?to=soon').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,76 @@
+import unittest
+from oneview_app import app as app_module
+from oneview_app.patient_search import PatientSearchIndex, normalize_phone
+
+MOCK_SEARCH_PATIENTS = [
+    {"patient_id": "p0", "full_name": "Walter White", "dob": "1959-09-07", "gender": "male", "contact_phone": "505-111-2222"},
+    {"patient_id": "p1", "full_name": "Walter White", "dob": "1971-01-01", "gender": "male", "contact_phone": "(505) 999-0000"},
+    {"patient_id": "p2", "full_name": "Skyler White", "dob": "1970-08-11", "gender": "female", "contact_phone": "+1 505 555 6666"},
+    {"patient_id": "p3", "full_name": "Charles O'Malley", "dob": "1959-09-07", "gender": "male", "contact_phone": None},
+    {"patient_id": "Walt", "full_name": "Jesse Bruce Pinkman", "dob": None, "gender": None, "contact_phone": "505-333-4444"},
+]
+
+
+def _ids(patients):
+    return [p["patient_id"] for p in patients]
+
+
+class TestPatientSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = PatientSearchIndex(MOCK_SEARCH_PATIENTS)
+
+    def test_name_substring_matches_like_the_scan(self):
+        self.assertEqual(_ids(self.index.search(text="white")), ["p0", "p1", "p2"])
+        self.assertEqual(_ids(self.index.search(text="inkma")), ["Walt"])
+        self.assertEqual(_ids(self.index.search(text="O'Mal")), ["p3"])
+        self.assertEqual(_ids(self.index.search(text="zz")), [])
+
+    def test_text_matches_patient_id_or_name(self):
+        self.assertEqual(_ids(self.index.search(text="Walt")), ["p0", "p1", "Walt"])
+
+    def test_name_with_dob_disambiguates(self):
+        self.assertEqual(_ids(self.index.search(text="Walter White", dob="1971-01-01")), ["p1"])
+        self.assertEqual(_ids(self.index.search(dob="1959-09-07", gender="MALE")), ["p0", "p3"])
+
+    def test_phone_is_normalized(self):
+        self.assertEqual(normalize_phone("+1 (505) 555-6666"), "5055556666")
+        self.assertEqual(_ids(self.index.search(phone="5055556666")), ["p2"])
+        self.assertEqual(_ids(self.index.search(phone="505 999 0000", text="walter")), ["p1"])
+
+    def test_planner_starts_with_most_selective_field(self):
+        plan = self.index.plan(text="white", dob="1971-01-01")
+        self.assertEqual([c.name for c in plan], ["dob", "text"])
+
+    def test_no_criteria(self):
+        self.assertEqual(self.index.search(), [])
+
+
+class TestSearchForm(unittest.TestCase):
+
+    def setUp(self):
+        self._original_index = app_module.search_index
+        app_module.search_index = PatientSearchIndex(MOCK_SEARCH_PATIENTS)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.search_index = self._original_index
+
+    def test_search_by_name_and_dob(self):
+        response = self.client.post('/', data={'search_query': 'Walter White', 'search_dob': '1959-09-07'})
+        self.assertIn(b"Search Results (1 found)", response.data)
+        self.assertIn(b"/?patient_id=p0", response.data)
+        self.assertIn(b'value="1959-09-07"', response.data)
+
+    def test_search_by_phone_only(self):
+        response = self.client.post('/', data={'search_query': '', 'search_phone': '505-333-4444'})
+        self.assertIn(b"Search Results (1 found)", response.data)
+
+    def test_no_results_message_lists_fields(self):
+        response = self.client.post('/', data={'search_query': 'Walter', 'search_gender': 'female'})
+        self.assertIn(b"No patients found matching: \"Walter, Gender female\"", response.data)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,64 @@
+import unittest
+from oneview_app.polypharmacy import medication_period, overlap_windows, polypharmacy_report
+
+
+def _med(name, start, end=None, status="stopped", supply_days=None):
+    return {"name": name, "authored_on": start, "period_end": end, "status": status, "supply_days": supply_days}
+
+
+# Five medications overlap from 2022-03-01 until the first one ends on 2022-04-01
+HEAVY = [
+    _med("A", "2022-01-01", "2022-03-31"),
+    _med("B", "2022-02-01", status="active"),
+    _med("C", "2022-02-15", supply_days=90),
+    _med("D", "2022-02-20", "2022-12-31"),
+    _med("E", "2022-03-01", status="active"),
+    _med("E", "2022-03-05", "2022-03-10"),  # Overlapping refill of E: still one medication
+]
+
+
+class TestPolypharmacy(unittest.TestCase):
+
+    def test_medication_period(self):
+        self.assertIsNone(medication_period(_med("A", "2022-01-01")))  # Stopped, no end on record
+        self.assertIsNone(medication_period(_med("A", None, "2022-01-01")))
+        start, end = medication_period(_med("A", "2022-01-01", supply_days=1))
+        self.assertEqual(end - start, 86400)
+
+    def test_sweep_finds_window(self):
+        peak, windows = overlap_windows(HEAVY, threshold=5)
+        self.assertEqual(peak, 5)
+        self.assertEqual(len(windows), 1)
+        start, end, count, names = windows[0]
+        self.assertEqual((count, names), (5, ["A", "B", "C", "D", "E"]))
+        self.assertEqual(end - start, 31 * 86400)  # 2022-03-01 up to the end of 2022-03-31
+
+    def test_back_to_back_periods_do_not_overlap(self):
+        meds = [_med("A", "2022-01-01", supply_days=10), _med("B", "2022-01-11", supply_days=10)]
+        self.assertEqual(overlap_windows(meds, threshold=2), (1, []))
+
+    def test_renewal_keeps_one_window(self):
+        # E is renewed the day after its first period ends: one continuous overlap
+        meds = [_med(name, "2020-01-01", "2020-12-31") for name in "ABCD"]
+        meds += [_med("E", "2020-01-01", "2020-06-30"), _med("E", "2020-07-01", "2020-12-31")]
+        peak, windows = overlap_windows(meds, threshold=5)
+        self.assertEqual(peak, 5)
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(windows[0][1] - windows[0][0], 366 * 86400)
+
+    def test_report_is_ranked_and_parallel_matches_inline(self):
+        patients = [
+            {"patient_id": "light", "full_name": "Light", "medications": HEAVY[:3]},
+            {"patient_id": "heavy", "full_name": "Heavy", "medications": HEAVY},
+            {"patient_id": "ongoing", "full_name": "Ongoing", "medications": HEAVY[1:2] + [_med("F", "2022-01-01", status="active"), _med("G", "2022-01-01", status="active")]},
+        ]
+        inline = polypharmacy_report(patients, threshold=3, workers=1)
+        self.assertEqual([e["patient_id"] for e in inline], ["heavy", "ongoing", "light"])
+        self.assertTrue(inline[1]["ongoing"])
+        self.assertIsNone(inline[1]["windows"][-1]["end"])
+        self.assertEqual(inline[0]["windows"][0]["start"], "2022-02-15T00:00:00Z")
+        self.assertEqual(polypharmacy_report(patients, threshold=3, workers=2, chunk_size=1), inline)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,76 @@
+import unittest
+from datetime import date
+from oneview_app import app as app_module
+from oneview_app.demographics import DobArray
+from oneview_app.population_aggregates import AGE_BANDS, PopulationAggregates
+
+TODAY = date(2024, 1, 1)
+
+MOCK_POPULATION = [
+    {"patient_id": "p0", "insurance": "Medicaid", "pcp_name": "Dr. Goodman", "gender": "male", "dob": "1959-09-07",
+     "diagnoses": [{"description": "Diabetes", "status": "active"}, {"description": "Diabetes", "status": "active"}]},
+    {"patient_id": "p1", "insurance": "Medicaid", "pcp_name": None, "gender": "male", "dob": "2010-01-01",
+     "diagnoses": [{"description": "Asthma", "status": "active"}, {"description": "Fracture", "status": "resolved"}]},
+    {"patient_id": "p2", "insurance": "Aetna", "pcp_name": "Dr. Goodman", "gender": "female", "dob": "1970-08-11",
+     "diagnoses": [{"description": "Diabetes", "status": "recurrence"}]},
+]
+
+
+class TestPopulationAggregates(unittest.TestCase):
+
+    def test_summary(self):
+        age_bands = DobArray(MOCK_POPULATION).age_band_counts(AGE_BANDS, TODAY)
+        summary = PopulationAggregates(MOCK_POPULATION).summary(age_band_counts=age_bands)
+        self.assertEqual(summary["patients"], 3)
+        self.assertEqual(summary["insurance"], [("Medicaid", 2), ("Aetna", 1)])
+        self.assertEqual(summary["pcp_name"], [("Dr. Goodman", 2), ("Unknown", 1)])
+        self.assertEqual(summary["age_band"], [("0-17", 1), ("50-64", 2)])
+        self.assertEqual(summary["top_conditions"], [("Diabetes", 2), ("Asthma", 1)])
+
+    def test_age_bands_follow_the_date(self):
+        # Counted at read time: p1 (born 2010-01-01) moves band on the day it turns 18
+        dobs = DobArray(MOCK_POPULATION + [{"patient_id": "p4", "dob": None}])
+        aggregates = PopulationAggregates(MOCK_POPULATION)
+        later = aggregates.summary(age_band_counts=dobs.age_band_counts(AGE_BANDS, date(2028, 1, 1)))
+        self.assertEqual(later["age_band"], [("18-34", 1), ("50-64", 1), ("65+", 1), ("Unknown", 1)])
+
+    def test_incremental_update_matches_rebuild(self):
+        aggregates = PopulationAggregates(MOCK_POPULATION)
+        reloaded = [
+            dict(MOCK_POPULATION[0], insurance="Aetna"),  # Changed
+            MOCK_POPULATION[2],                           # Unchanged; p1 removed
+            {"patient_id": "p3", "gender": "female", "dob": "1990-05-05", "diagnoses": []},  # Added
+        ]
+        changes = aggregates.update(reloaded)
+        self.assertEqual(changes, {"added": 1, "updated": 1, "removed": 1, "unchanged": 1})
+        self.assertEqual(aggregates.summary(), PopulationAggregates(reloaded).summary())
+        self.assertNotIn("Asthma", aggregates.conditions)
+
+
+class TestDashboardRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = app_module.population_aggregates, app_module.dob_array
+        app_module.population_aggregates = PopulationAggregates(MOCK_POPULATION)
+        app_module.dob_array = DobArray(MOCK_POPULATION)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.population_aggregates, app_module.dob_array = self._originals
+
+    def test_dashboard_page(self):
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Population Dashboard", response.data)
+        self.assertIn(b"<td>Medicaid</td>", response.data)
+
+    def test_dashboard_json(self):
+        data = self.client.get('/dashboard.json?top=1').get_json()
+        self.assertEqual(data["top_conditions"], [["Diabetes", 2]])
+        self.assertEqual(data["gender"], [["male", 2], ["female", 1]])
+        self.assertEqual(sum(count for _, count in data["age_band"]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,84 @@
+import unittest
+from urllib.parse import quote
+from oneview_app import app as app_module
+from oneview_app.provider_index import ProviderIndex
+
+MOCK_PANEL_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Walter White", "pcp_name": "Dr. Saul Goodman",
+        "recent_encounters": [
+            {"date": "2022-10-20", "facility": "Albuquerque General", "provider": "Dr. Saul Goodman"},
+            {"date": "2023-03-15T10:00:00Z", "facility": "Cancer Center", "provider": "Dr. Delcavoli"},
+            {"date": "Invalid Date String", "facility": "Cancer Center", "provider": "Dr. Delcavoli"},
+        ],
+    },
+    {
+        "patient_id": "p1", "full_name": "Jesse Pinkman", "pcp_name": "Dr. Saul Goodman",
+        "recent_encounters": [],
+    },
+    {
+        "patient_id": "p2", "full_name": "Skyler White", "pcp_name": "Dr. Marie Schrader",
+        "recent_encounters": [
+            {"date": "2023-01-15", "facility": "Albuquerque General", "provider": "Dr. Saul Goodman"},
+            {"date": "2021-06-01", "facility": "Albuquerque General", "provider": "Dr. Marie Schrader"},
+        ],
+    },
+]
+
+
+def _ids(page):
+    return [p["patient_id"] for p in page["patients"]]
+
+
+class TestProviderIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ProviderIndex(MOCK_PANEL_PATIENTS)
+
+    def test_panel_includes_assigned_and_seen_patients_by_recency(self):
+        page = self.index.providers.page("Dr. Saul Goodman")
+        self.assertEqual(_ids(page), ["p2", "p0", "p1"])
+        self.assertEqual([p["last_visit"] for p in page["patients"]], ["2023-01-15", "2022-10-20", None])
+
+    def test_roster_last_visit_ignores_bad_dates(self):
+        page = self.index.facilities.page("cancer center")
+        self.assertEqual(page["name"], "Cancer Center")
+        self.assertEqual(page["patients"][0]["last_visit"], "2023-03-15T10:00:00Z")
+
+    def test_sorting_and_pagination(self):
+        page = self.index.providers.page("Dr. Saul Goodman", sort="recency", order="asc")
+        self.assertEqual(_ids(page), ["p0", "p2", "p1"])
+        page = self.index.providers.page("Dr. Saul Goodman", sort="name", order="asc", page=2, per_page=2)
+        self.assertEqual((page["total"], page["pages"], _ids(page)), (3, 2, ["p0"]))
+
+    def test_names_and_unknown(self):
+        self.assertEqual(self.index.facilities.names(), [("Albuquerque General", 2), ("Cancer Center", 1)])
+        self.assertIsNone(self.index.providers.page("Dr. Nobody"))
+
+
+class TestPanelRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self._original_index = app_module.provider_index
+        app_module.provider_index = ProviderIndex(MOCK_PANEL_PATIENTS)
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.provider_index = self._original_index
+
+    def test_provider_panel(self):
+        response = self.client.get(f"/providers/{quote('Dr. Saul Goodman')}/panel?per_page=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["patients"][0]["patient_id"], "p2")
+        self.assertEqual(response.get_json()["pages"], 2)
+
+    def test_facility_roster_and_errors(self):
+        self.assertEqual(self.client.get(f"/facilities/{quote('Albuquerque General')}/roster").get_json()["total"], 2)
+        self.assertEqual(self.client.get("/facilities/Nowhere/roster").status_code, 404)
+        self.assertEqual(self.client.get("/facilities/Cancer%20Center/roster?sort=size").status_code, 400)
+        self.assertEqual(self.client.get("/providers").get_json()[0], {"name": "Dr. Saul Goodman", "patients": 3})
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,81 @@
+import unittest
+from oneview_app import app as app_module
+from oneview_app.readmissions import find_readmissions, inpatient_stays, readmission_report
+
+
+def _stay(start, end=None, encounter_class="IMP"):
+    return {"date": start, "end": end, "encounter_class": encounter_class}
+
+
+MOCK_READMISSION_PATIENTS = [
+    {
+        "patient_id": "p0", "full_name": "Walter White",
+        "recent_encounters": [
+            # Unsorted on purpose, as parsed
+            _stay("2023-03-20T08:00:00Z", "2023-03-25T12:00:00Z"),
+            _stay("2023-03-01T08:00:00Z", "2023-03-05T12:00:00Z"),
+            _stay("2023-03-10T00:00:00Z", None, "AMB"),           # Outpatient visit: not a stay
+            _stay("2023-06-01T08:00:00Z", "2023-06-02T08:00:00Z"),
+        ],
+    },
+    {
+        "patient_id": "p1", "full_name": "Jesse Pinkman",
+        "recent_encounters": [
+            _stay("2023-03-01T08:00:00Z", "2023-03-03T08:00:00Z"),
+            _stay("2023-03-02T20:00:00Z", "2023-03-04T08:00:00Z"),  # Transfer overlapping the first stay
+        ],
+    },
+    {"patient_id": "p2", "full_name": "Skyler White", "recent_encounters": [_stay("2023-01-01", None, "EMER")]},
+]
+
+
+class TestReadmissions(unittest.TestCase):
+
+    def test_stays_sorted_and_merged(self):
+        self.assertEqual(len(inpatient_stays(MOCK_READMISSION_PATIENTS[0]["recent_encounters"])), 3)
+        self.assertEqual(len(inpatient_stays(MOCK_READMISSION_PATIENTS[1]["recent_encounters"])), 1)
+
+    def test_window(self):
+        day = 86400
+        stays = [(0, day), (31 * day, 32 * day), (63 * day, 64 * day)]
+        self.assertEqual(find_readmissions(stays), [(day, 31 * day)])
+
+    def test_report(self):
+        report = readmission_report(MOCK_READMISSION_PATIENTS, workers=1)
+        summary = report["summary"]
+        self.assertEqual((summary["discharges"], summary["readmissions"], summary["patients_readmitted"]), (4, 1, 1))
+        self.assertEqual(summary["by_month"]["2023-03"], {"discharges": 3, "readmissions": 1, "rate": 0.3333})
+        walter = report["patients"][0]
+        self.assertEqual(walter["patient_id"], "p0")
+        self.assertEqual(walter["readmissions"][0]["days_between"], 14.8)
+        self.assertEqual(readmission_report(MOCK_READMISSION_PATIENTS, workers=2, chunk_size=1), report)
+
+
+class TestReadmissionViews(unittest.TestCase):
+
+    def setUp(self):
+        self._originals = (app_module.all_patients_data, app_module.patients_by_id, app_module.readmissions, app_module.readmissions_by_id)
+        app_module.all_patients_data = MOCK_READMISSION_PATIENTS
+        app_module.patients_by_id = {p["patient_id"]: p for p in MOCK_READMISSION_PATIENTS}
+        app_module.readmissions = readmission_report(MOCK_READMISSION_PATIENTS, workers=1)
+        app_module.readmissions_by_id = {e["patient_id"]: e for e in app_module.readmissions["patients"]}
+        app_module.app.config['TESTING'] = True
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.all_patients_data, app_module.patients_by_id, app_module.readmissions, app_module.readmissions_by_id = self._originals
+
+    def test_summary_route(self):
+        data = self.client.get('/readmissions').get_json()
+        self.assertEqual(data["summary"]["readmissions"], 1)
+        self.assertEqual([p["patient_id"] for p in data["patients"]], ["p0"])
+
+    def test_detail_page_flag(self):
+        self.assertIn(b"30-Day Readmission:</strong>", self.client.get('/?patient_id=p0').data)
+        self.assertIn(b"Yes (1 of 3 inpatient stays", self.client.get('/?patient_id=p0').data)
+        self.assertIn(b"No (1 inpatient stay)", self.client.get('/?patient_id=p1').data)
+        self.assertNotIn(b"30-Day Readmission", self.client.get('/?patient_id=p2').data)
+
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)